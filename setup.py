@@ -27,4 +27,5 @@ setup(
     keywords="aws, sqs",
     packages=find_packages(),
     install_requires=["boto3>=1.33.13", "pydantic>=2.5.2"],
+    extras_require={"msgpack": ["msgpack>=1.0.7"], "zstd": ["zstandard>=0.22.0"]},
 )
@@ -1 +1,33 @@
+import importlib
+from typing import Any, TYPE_CHECKING
+
 from sqsx.queue import Queue, RawQueue  # noqa
+
+if TYPE_CHECKING:
+    from sqsx.async_queue import AsyncQueue, AsyncRawQueue  # noqa
+    from sqsx.consumer import MultiQueueConsumer  # noqa
+    from sqsx.producer import BufferedProducer  # noqa
+    from sqsx.sharding import ShardedQueue  # noqa
+    from sqsx.supervisor import Supervisor  # noqa
+
+# the optional subsystems are imported on first access, so importing sqsx (or sqsx.aws_lambda) doesn't load
+# asyncio, multiprocessing and the modules that aren't used
+_lazy_imports = {
+    "AsyncQueue": "sqsx.async_queue",
+    "AsyncRawQueue": "sqsx.async_queue",
+    "BufferedProducer": "sqsx.producer",
+    "Supervisor": "sqsx.supervisor",
+    "MultiQueueConsumer": "sqsx.consumer",
+    "ShardedQueue": "sqsx.sharding",
+}
+
+__all__ = ["Queue", "RawQueue", *_lazy_imports]
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _lazy_imports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(_lazy_imports[name]), name)
+    globals()[name] = value
+    return value
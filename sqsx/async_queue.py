@@ -0,0 +1,276 @@
+import asyncio
+import logging
+import signal
+import time
+from typing import Any, Callable, Optional
+
+from pydantic import BaseModel, Field, PrivateAttr
+
+from sqsx.codec import decode_task_message, encode_task_body, TaskCodec
+from sqsx.exceptions import NoRetry, Retry
+from sqsx.helper import backoff_calculator_seconds
+from sqsx.idle import FixedIdleStrategy, IdleStrategy
+from sqsx.queue import queue_url_regex, RECEIVE_ERROR_MAX_BACKOFF_SECONDS, RECEIVE_ERROR_MIN_BACKOFF_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBaseQueueMixin:
+    url: str
+    sqs_client: Any
+    min_backoff_seconds: int
+    max_backoff_seconds: int
+    _consume_message: Any
+    _should_consume_tasks_stop: bool
+
+    async def consume_messages(
+        self,
+        max_messages: int = 10,
+        max_concurrency: int = 100,
+        wait_seconds: int = 10,
+        polling_wait_seconds: int = 10,
+        run_forever: bool = True,
+        enable_signal_to_exit_gracefully: bool = True,
+        receivers: int = 1,
+        idle_strategy: Optional[IdleStrategy] = None,
+    ) -> None:
+        logger.info(f"Starting consuming tasks, queue_url={self.url}")
+        idle_strategy = idle_strategy if idle_strategy is not None else FixedIdleStrategy(wait_seconds)
+
+        loop = asyncio.get_running_loop()
+        if enable_signal_to_exit_gracefully:
+            loop.add_signal_handler(signal.SIGINT, self.exit_gracefully)
+            loop.add_signal_handler(signal.SIGTERM, self.exit_gracefully)
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+        tasks: set[asyncio.Task] = set()
+        try:
+            await asyncio.gather(
+                *(
+                    self._receive_messages_loop(
+                        semaphore, tasks, max_messages, idle_strategy, polling_wait_seconds, run_forever
+                    )
+                    for _ in range(receivers)
+                )
+            )
+            while tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            if enable_signal_to_exit_gracefully:
+                loop.remove_signal_handler(signal.SIGINT)
+                loop.remove_signal_handler(signal.SIGTERM)
+
+        if self._should_consume_tasks_stop:
+            logger.info(f"Stopping consuming tasks, queue_url={self.url}")
+
+    def exit_gracefully(self) -> None:
+        logger.info(f"Starting graceful shutdown process, queue_url={self.url}")
+        self._should_consume_tasks_stop = True
+
+    async def _receive_messages_loop(
+        self,
+        semaphore: asyncio.Semaphore,
+        tasks: set[asyncio.Task],
+        max_messages: int,
+        idle_strategy: IdleStrategy,
+        polling_wait_seconds: int,
+        run_forever: bool,
+    ) -> None:
+        empty_receives = 0
+        receive_errors = 0
+        while not self._should_consume_tasks_stop:
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout=1)
+            except asyncio.TimeoutError:
+                continue
+            slots = 1
+            while slots < min(max_messages, 10) and not semaphore.locked():
+                await semaphore.acquire()
+                slots += 1
+
+            try:
+                response = await self.sqs_client.receive_message(
+                    QueueUrl=self.url,
+                    AttributeNames=["All"],
+                    MaxNumberOfMessages=slots,
+                    MessageAttributeNames=["All"],
+                    WaitTimeSeconds=polling_wait_seconds,
+                )
+            except asyncio.CancelledError:
+                for _ in range(slots):
+                    semaphore.release()
+                raise
+            except Exception:
+                # a receiver never dies holding its slots, it backs off and polls again
+                for _ in range(slots):
+                    semaphore.release()
+                receive_errors += 1
+                wait_seconds = min(
+                    RECEIVE_ERROR_MIN_BACKOFF_SECONDS * 2 ** (receive_errors - 1),
+                    RECEIVE_ERROR_MAX_BACKOFF_SECONDS,
+                )
+                logger.exception(
+                    f"Error while receiving messages, wait_seconds={wait_seconds}, queue_url={self.url}"
+                )
+                await self._sleep_unless_stopped(wait_seconds)
+                continue
+            receive_errors = 0
+
+            sqs_messages = response.get("Messages", [])
+            for _ in range(slots - len(sqs_messages)):
+                semaphore.release()
+            if not sqs_messages:
+                empty_receives += 1
+                wait_seconds = idle_strategy.seconds(empty_receives)
+                logger.debug(
+                    f"Waiting some seconds because no message was received, wait_seconds={wait_seconds}, "
+                    f"polling_wait_seconds={polling_wait_seconds}, queue_url={self.url}"
+                )
+                await self._sleep_unless_stopped(wait_seconds)
+                continue
+            empty_receives = 0
+
+            for sqs_message in sqs_messages:
+                task = asyncio.create_task(self._consume_message(sqs_message))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                task.add_done_callback(lambda _: semaphore.release())
+
+            if not run_forever:
+                break
+
+    async def _sleep_unless_stopped(self, seconds: float) -> None:
+        deadline = time.monotonic() + seconds
+        while not self._should_consume_tasks_stop:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(min(remaining, 1))
+
+    async def _message_ack(self, sqs_message: dict) -> None:
+        receipt_handle = sqs_message["ReceiptHandle"]
+        await self.sqs_client.delete_message(QueueUrl=self.url, ReceiptHandle=receipt_handle)
+
+    async def _message_nack(
+        self,
+        sqs_message: dict,
+        min_backoff_seconds: Optional[int] = None,
+        max_backoff_seconds: Optional[int] = None,
+    ) -> None:
+        min_backoff_seconds = min_backoff_seconds if min_backoff_seconds else self.min_backoff_seconds
+        max_backoff_seconds = max_backoff_seconds if max_backoff_seconds else self.max_backoff_seconds
+        receipt_handle = sqs_message["ReceiptHandle"]
+        receive_count = int(sqs_message["Attributes"]["ApproximateReceiveCount"]) - 1
+        timeout = backoff_calculator_seconds(receive_count, min_backoff_seconds, max_backoff_seconds)
+        await self.sqs_client.change_message_visibility(
+            QueueUrl=self.url, ReceiptHandle=receipt_handle, VisibilityTimeout=timeout
+        )
+
+
+class AsyncQueue(BaseModel, AsyncBaseQueueMixin):
+    url: str = Field(pattern=queue_url_regex)
+    sqs_client: Any
+    min_backoff_seconds: int = Field(default=30)
+    max_backoff_seconds: int = Field(default=900)
+    codec: Optional[TaskCodec] = Field(default=None)
+    _handlers: dict[str, Callable] = PrivateAttr(default={})
+    _should_consume_tasks_stop: bool = PrivateAttr(default=False)
+
+    async def add_task(self, task_name: str, **task_kwargs) -> dict:
+        message_body, codec_name = encode_task_body({"kwargs": task_kwargs}, self.codec)
+        message_attributes = {"TaskName": {"DataType": "String", "StringValue": task_name}}
+        if codec_name is not None:
+            message_attributes["Codec"] = {"DataType": "String", "StringValue": codec_name}
+        return await self.sqs_client.send_message(
+            QueueUrl=self.url, MessageAttributes=message_attributes, MessageBody=message_body
+        )
+
+    def add_task_handler(self, task_name: str, task_handler_function: Callable) -> None:
+        self._handlers.update({task_name: task_handler_function})
+
+    async def _consume_message(self, sqs_message: dict) -> None:
+        message_id = sqs_message["MessageId"]
+        task_name_attribute = sqs_message["MessageAttributes"].get("TaskName")
+        if task_name_attribute is None:
+            logger.warning(f"Message without TaskName attribute, message_id={message_id}")
+            return await self._message_nack(sqs_message)
+
+        task_name = task_name_attribute["StringValue"]
+        task_handler_function = self._handlers.get(task_name)
+        if task_handler_function is None:
+            logger.warning(f"Task handler not found, message_id={message_id}, task_name={task_name}")
+            return await self._message_nack(sqs_message)
+
+        try:
+            message_data = decode_task_message(sqs_message)
+        except Exception:
+            logger.exception(f"Invalid message body, message_id={message_id}, task_name={task_name}")
+            return await self._message_nack(sqs_message)
+
+        kwargs = message_data["kwargs"]
+        context = {
+            "queue_url": self.url,
+            "task_name": task_name,
+            "sqs_message": sqs_message,
+        }
+
+        try:
+            await task_handler_function(context, **kwargs)
+        except Retry as exc:
+            logger.info(
+                f"Received an sqsx.Retry, setting a custom backoff policy, message_id={message_id}, task_name={task_name}"
+            )
+            return await self._message_nack(
+                sqs_message,
+                min_backoff_seconds=exc.min_backoff_seconds,
+                max_backoff_seconds=exc.max_backoff_seconds,
+            )
+        except NoRetry:
+            logger.info(
+                f"Received an sqsx.NoRetry, removing the task, message_id={message_id}, task_name={task_name}"
+            )
+            return await self._message_ack(sqs_message)
+        except Exception:
+            logger.exception(f"Error while processing, message_id={message_id}, task_name={task_name}")
+            return await self._message_nack(sqs_message)
+
+        await self._message_ack(sqs_message)
+
+
+class AsyncRawQueue(BaseModel, AsyncBaseQueueMixin):
+    url: str = Field(pattern=queue_url_regex)
+    message_handler_function: Callable
+    sqs_client: Any
+    min_backoff_seconds: int = Field(default=30)
+    max_backoff_seconds: int = Field(default=900)
+    _should_consume_tasks_stop: bool = PrivateAttr(default=False)
+
+    async def add_message(self, message_body: str, message_attributes: Optional[dict] = None) -> dict:
+        if message_attributes is None:
+            message_attributes = {}
+        return await self.sqs_client.send_message(
+            QueueUrl=self.url,
+            MessageAttributes=message_attributes,
+            MessageBody=message_body,
+        )
+
+    async def _consume_message(self, sqs_message: dict) -> None:
+        message_id = sqs_message["MessageId"]
+
+        try:
+            await self.message_handler_function(self.url, sqs_message)
+        except Retry as exc:
+            logger.info(f"Received an sqsx.Retry, setting a custom backoff policy, message_id={message_id}")
+            return await self._message_nack(
+                sqs_message,
+                min_backoff_seconds=exc.min_backoff_seconds,
+                max_backoff_seconds=exc.max_backoff_seconds,
+            )
+        except NoRetry:
+            logger.info(f"Received an sqsx.NoRetry, removing the message, message_id={message_id}")
+            return await self._message_ack(sqs_message)
+        except Exception:
+            logger.exception(f"Error while processing, message_id={message_id}")
+            return await self._message_nack(sqs_message)
+
+        await self._message_ack(sqs_message)
@@ -0,0 +1,124 @@
+import base64
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Union
+
+from sqsx.queue import Queue, RawQueue
+
+logger = logging.getLogger(__name__)
+
+
+class BatchItemRecorder:
+    """
+    Stand-in for the sqs client used while handling a Lambda event, recording the acked messages instead of
+    deleting them, so Lambda deletes the successful records and retries the others
+    """
+
+    def __init__(self) -> None:
+        self.acked_receipt_handles: set[str] = set()
+        self._lock = threading.Lock()
+
+    def delete_message(self, QueueUrl: str, ReceiptHandle: str) -> None:
+        with self._lock:
+            self.acked_receipt_handles.add(ReceiptHandle)
+
+    def change_message_visibility(self, QueueUrl: str, ReceiptHandle: str, VisibilityTimeout: int) -> None:
+        with self._lock:
+            self.acked_receipt_handles.discard(ReceiptHandle)
+
+
+def record_to_sqs_message(record: dict) -> dict:
+    message_attributes = {}
+    for name, attribute in record.get("messageAttributes", {}).items():
+        message_attribute: dict[str, Any] = {"DataType": attribute["dataType"]}
+        if attribute.get("stringValue") is not None:
+            message_attribute["StringValue"] = attribute["stringValue"]
+        if attribute.get("binaryValue") is not None:
+            message_attribute["BinaryValue"] = base64.b64decode(attribute["binaryValue"])
+        message_attributes[name] = message_attribute
+
+    return {
+        "MessageId": record["messageId"],
+        "ReceiptHandle": record["receiptHandle"],
+        "MD5OfBody": record.get("md5OfBody"),
+        "Body": record["body"],
+        "Attributes": record.get("attributes", {}),
+        "MessageAttributes": message_attributes,
+    }
+
+
+def handle_sqs_event(queue: Union[Queue, RawQueue], event: dict, max_threads: int = 1) -> dict:
+    """
+    Dispatch the records of a Lambda SQS event through the queue handlers and return the batchItemFailures
+    response, the messages of a FIFO queue are processed in order and a failure fails the rest of its group
+    """
+    recorder = BatchItemRecorder()
+    lambda_queue = queue.model_copy(update={"sqs_client": recorder})
+    if isinstance(lambda_queue, Queue):
+        # a record is deleted by Lambda after the invocation, a retried batch still needs the blobs
+        lambda_queue._delete_acked_blobs = False
+    sqs_messages = [record_to_sqs_message(record) for record in event.get("Records", [])]
+
+    sqs_messages_by_group: dict[str, list[dict]] = {}
+    sqs_messages_by_task_name: dict[str, list[dict]] = {}
+    single_sqs_messages = []
+    for sqs_message in sqs_messages:
+        task_name_attribute = sqs_message["MessageAttributes"].get("TaskName")
+        if queue.fifo:
+            message_group_id = sqs_message["Attributes"].get("MessageGroupId", "")
+            sqs_messages_by_group.setdefault(message_group_id, []).append(sqs_message)
+        elif (
+            isinstance(lambda_queue, Queue)
+            and task_name_attribute is not None
+            and task_name_attribute["StringValue"] in lambda_queue._batch_handlers
+        ):
+            sqs_messages_by_task_name.setdefault(task_name_attribute["StringValue"], []).append(sqs_message)
+        else:
+            single_sqs_messages.append(sqs_message)
+
+    with ThreadPoolExecutor(max_workers=max_threads) as executor:
+        for group_sqs_messages in sqs_messages_by_group.values():
+            executor.submit(_consume_group_messages, lambda_queue, recorder, group_sqs_messages)
+        if isinstance(lambda_queue, Queue):
+            for task_name, task_sqs_messages in sqs_messages_by_task_name.items():
+                executor.submit(_consume_message_batch, lambda_queue, task_name, task_sqs_messages)
+        for sqs_message in single_sqs_messages:
+            executor.submit(_consume_message, lambda_queue, sqs_message)
+
+    batch_item_failures = [
+        {"itemIdentifier": sqs_message["MessageId"]}
+        for sqs_message in sqs_messages
+        if sqs_message["ReceiptHandle"] not in recorder.acked_receipt_handles
+    ]
+    logger.info(
+        f"Lambda event processed, queue_url={queue.url}, records={len(sqs_messages)}, "
+        f"failures={len(batch_item_failures)}"
+    )
+    return {"batchItemFailures": batch_item_failures}
+
+
+def _consume_message(queue: Union[Queue, RawQueue], sqs_message: dict) -> None:
+    try:
+        queue._consume_message(sqs_message)
+    except Exception:
+        logger.exception(f"Error while consuming message, message_id={sqs_message['MessageId']}")
+
+
+def _consume_message_batch(queue: Queue, task_name: str, sqs_messages: list[dict]) -> None:
+    try:
+        queue._consume_message_batch(task_name, sqs_messages)
+    except Exception:
+        logger.exception(f"Error while consuming message batch, task_name={task_name}")
+
+
+def _consume_group_messages(
+    queue: Union[Queue, RawQueue], recorder: BatchItemRecorder, sqs_messages: list[dict]
+) -> None:
+    for sqs_message in sqs_messages:
+        _consume_message(queue, sqs_message)
+        if sqs_message["ReceiptHandle"] not in recorder.acked_receipt_handles:
+            logger.info(
+                f"Message failed, failing the next messages of the group, message_id={sqs_message['MessageId']}"
+            )
+            return
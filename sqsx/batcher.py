@@ -0,0 +1,148 @@
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MessageBatcher(ABC):
+    """
+    Accumulate entries and send them in batch calls, flushing on size, on linger time and on close
+    """
+
+    max_batch_size = 10
+
+    def __init__(
+        self,
+        sqs_client: Any,
+        queue_url: str,
+        linger_seconds: float = 0.5,
+        on_sent: Optional[Callable[[list[dict]], None]] = None,
+    ):
+        self.sqs_client = sqs_client
+        self.queue_url = queue_url
+        self.linger_seconds = linger_seconds
+        self.on_sent = on_sent
+        self._entries: list[dict] = []
+        self._oldest_entry_at: Optional[float] = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flush_thread.start()
+
+    def add(self, entry: dict) -> None:
+        with self._condition:
+            if self._closed:
+                entries = [entry]
+            else:
+                self._entries.append(entry)
+                if self._oldest_entry_at is None:
+                    self._oldest_entry_at = time.monotonic()
+                    self._condition.notify_all()
+                if len(self._entries) < self.max_batch_size:
+                    return
+                entries = self._take_entries()
+        self._send(entries)
+
+    def flush(self) -> None:
+        with self._condition:
+            entries = self._take_entries()
+        self.send(entries)
+
+    def send(self, entries: list[dict]) -> None:
+        # sent from the calling thread, without waiting in the linger buffer
+        for index in range(0, len(entries), self.max_batch_size):
+            self._send(entries[index : index + self.max_batch_size])
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._flush_thread.join()
+        self.flush()
+
+    def _take_entries(self) -> list[dict]:
+        entries = self._entries
+        self._entries = []
+        self._oldest_entry_at = None
+        return entries
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._condition:
+                if self._closed:
+                    return
+                if self._oldest_entry_at is None:
+                    self._condition.wait()
+                    continue
+                linger_remaining = self._oldest_entry_at + self.linger_seconds - time.monotonic()
+                if linger_remaining > 0:
+                    self._condition.wait(linger_remaining)
+                    continue
+                entries = self._take_entries()
+            self._send(entries)
+
+    def _send(self, entries: list[dict]) -> None:
+        if not entries:
+            return
+
+        batch_entries = [{"Id": str(index), **entry} for index, entry in enumerate(entries)]
+        try:
+            response = self._send_batch(batch_entries)
+        except Exception:
+            logger.exception(
+                f"Error while sending batch, retrying each entry, queue_url={self.queue_url}, "
+                f"entries={len(entries)}"
+            )
+            failed_indexes = set(range(len(entries)))
+        else:
+            failed_indexes = {int(failed["Id"]) for failed in response.get("Failed", [])}
+
+        failed_entries = [entries[index] for index in sorted(failed_indexes)]
+        sent_entries = [entry for index, entry in enumerate(entries) if index not in failed_indexes]
+        for entry in failed_entries:
+            try:
+                self._send_entry(entry)
+            except Exception:
+                logger.exception(
+                    f"Error while sending entry, queue_url={self.queue_url}, "
+                    f"receipt_handle={entry['ReceiptHandle']}"
+                )
+            else:
+                sent_entries.append(entry)
+
+        if self.on_sent is not None and sent_entries:
+            try:
+                self.on_sent(sent_entries)
+            except Exception:
+                logger.exception(f"Error while handling the sent entries, queue_url={self.queue_url}")
+
+    @abstractmethod
+    def _send_batch(self, entries: list[dict]) -> dict:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _send_entry(self, entry: dict) -> None:
+        raise NotImplementedError
+
+
+class DeleteMessageBatcher(MessageBatcher):
+    def _send_batch(self, entries: list[dict]) -> dict:
+        return self.sqs_client.delete_message_batch(QueueUrl=self.queue_url, Entries=entries)
+
+    def _send_entry(self, entry: dict) -> None:
+        self.sqs_client.delete_message(QueueUrl=self.queue_url, ReceiptHandle=entry["ReceiptHandle"])
+
+
+class ChangeMessageVisibilityBatcher(MessageBatcher):
+    def _send_batch(self, entries: list[dict]) -> dict:
+        return self.sqs_client.change_message_visibility_batch(QueueUrl=self.queue_url, Entries=entries)
+
+    def _send_entry(self, entry: dict) -> None:
+        self.sqs_client.change_message_visibility(
+            QueueUrl=self.queue_url,
+            ReceiptHandle=entry["ReceiptHandle"],
+            VisibilityTimeout=entry["VisibilityTimeout"],
+        )
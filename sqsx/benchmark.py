@@ -0,0 +1,172 @@
+import argparse
+import itertools
+import math
+import threading
+import time
+from typing import Literal, Optional, Union
+
+from pydantic import BaseModel
+
+from sqsx.helper import MAX_BATCH_ENTRIES
+from sqsx.idle import FixedIdleStrategy
+from sqsx.queue import Queue, RawQueue
+from sqsx.testing import FakeSQSClient
+
+LATENCY_PROFILES = {
+    "none": 0.0,
+    "local": 0.001,
+    "same-region": 0.005,
+    "cross-region": 0.05,
+}
+
+
+class BenchmarkResult(BaseModel):
+    queue_type: str
+    messages: int
+    max_messages: int
+    max_threads: int
+    receivers: int
+    handler_seconds: float
+    latency_profile: str
+    elapsed_seconds: float
+    messages_per_second: float
+    p50_latency_seconds: float
+    p99_latency_seconds: float
+
+
+def _percentile(sorted_values: list[float], quantile: float) -> float:
+    return sorted_values[max(math.ceil(quantile * len(sorted_values)) - 1, 0)]
+
+
+def run_benchmark(
+    queue_type: Literal["queue", "raw_queue"] = "queue",
+    messages: int = 1000,
+    max_messages: int = 10,
+    max_threads: int = 10,
+    receivers: int = 1,
+    handler_seconds: float = 0,
+    latency_profile: str = "none",
+    batch_linger_seconds: Optional[float] = None,
+) -> BenchmarkResult:
+    sqs_client = FakeSQSClient(latency_seconds=LATENCY_PROFILES[latency_profile])
+    queue_url = sqs_client.create_queue(QueueName="benchmark")["QueueUrl"]
+    latencies: list[float] = []
+    lock = threading.Lock()
+    finished_at = 0.0
+
+    def handle(sent_at: float) -> None:
+        nonlocal finished_at
+        if handler_seconds:
+            time.sleep(handler_seconds)
+        with lock:
+            latencies.append(time.perf_counter() - sent_at)
+            if len(latencies) == messages:
+                finished_at = time.perf_counter()
+                queue.exit_gracefully()
+
+    queue: Union[Queue, RawQueue]
+    if queue_type == "queue":
+        queue = Queue(url=queue_url, sqs_client=sqs_client)
+        queue.add_task_handler("benchmark", lambda context, sent_at: handle(sent_at))
+    else:
+        queue = RawQueue(
+            url=queue_url,
+            sqs_client=sqs_client,
+            message_handler_function=lambda queue_url, sqs_message: handle(float(sqs_message["Body"])),
+        )
+
+    def produce() -> None:
+        remaining = messages
+        while remaining:
+            count = min(remaining, MAX_BATCH_ENTRIES)
+            if isinstance(queue, Queue):
+                queue.add_tasks([("benchmark", {"sent_at": time.perf_counter()})] * count)
+            else:
+                queue.add_messages([(str(time.perf_counter()), None)] * count)
+            remaining -= count
+
+    producer_thread = threading.Thread(target=produce, daemon=True)
+    started_at = time.perf_counter()
+    producer_thread.start()
+    queue.consume_messages(
+        max_messages=max_messages,
+        max_threads=max_threads,
+        polling_wait_seconds=1,
+        enable_signal_to_exit_gracefully=False,
+        receivers=receivers,
+        idle_strategy=FixedIdleStrategy(0),
+        batch_linger_seconds=batch_linger_seconds,
+    )
+    producer_thread.join()
+    elapsed_seconds = finished_at - started_at
+
+    sorted_latencies = sorted(latencies)
+    return BenchmarkResult(
+        queue_type=queue_type,
+        messages=messages,
+        max_messages=max_messages,
+        max_threads=max_threads,
+        receivers=receivers,
+        handler_seconds=handler_seconds,
+        latency_profile=latency_profile,
+        elapsed_seconds=elapsed_seconds,
+        messages_per_second=messages / elapsed_seconds,
+        p50_latency_seconds=_percentile(sorted_latencies, 0.5),
+        p99_latency_seconds=_percentile(sorted_latencies, 0.99),
+    )
+
+
+def _csv(value_type: type):
+    return lambda value: [value_type(item) for item in value.split(",")]
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Measure the sqsx throughput against an in-memory SQS")
+    parser.add_argument("--queue-types", type=_csv(str), default=["queue", "raw_queue"])
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--max-messages", type=_csv(int), default=[10])
+    parser.add_argument("--max-threads", type=_csv(int), default=[1, 10])
+    parser.add_argument("--receivers", type=_csv(int), default=[1])
+    parser.add_argument("--handler-seconds", type=_csv(float), default=[0.0])
+    parser.add_argument("--latency-profiles", type=_csv(str), default=["none", "same-region"])
+    parser.add_argument("--batch-linger-seconds", type=float, default=None)
+    args = parser.parse_args(argv)
+
+    header = f"{'queue':<10} {'profile':<13} {'threads':>7} {'buffer':>6} {'recv':>4} {'handler':>8} "
+    header += f"{'msg/s':>10} {'p50 ms':>9} {'p99 ms':>9}"
+    print(header)
+    for (
+        queue_type,
+        latency_profile,
+        max_threads,
+        max_messages,
+        receivers,
+        handler_seconds,
+    ) in itertools.product(
+        args.queue_types,
+        args.latency_profiles,
+        args.max_threads,
+        args.max_messages,
+        args.receivers,
+        args.handler_seconds,
+    ):
+        result = run_benchmark(
+            queue_type=queue_type,
+            messages=args.messages,
+            max_messages=max_messages,
+            max_threads=max_threads,
+            receivers=receivers,
+            handler_seconds=handler_seconds,
+            latency_profile=latency_profile,
+            batch_linger_seconds=args.batch_linger_seconds,
+        )
+        print(
+            f"{result.queue_type:<10} {result.latency_profile:<13} {result.max_threads:>7} "
+            f"{result.max_messages:>6} {result.receivers:>4} {result.handler_seconds:>8} "
+            f"{result.messages_per_second:>10.1f} {result.p50_latency_seconds * 1000:>9.2f} "
+            f"{result.p99_latency_seconds * 1000:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any
+
+from pydantic import BaseModel, Field, PrivateAttr
+
+
+class BlobStore(BaseModel, ABC):
+    """
+    Storage used to keep the message bodies that are too large to be sent to SQS
+    """
+
+    @abstractmethod
+    def put(self, key: str, data: bytes) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, key: str) -> bytes:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+
+class LocalBlobStore(BlobStore):
+    directory: str
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(self.directory, exist_ok=True)
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(file_descriptor, "wb") as blob_file:
+            blob_file.write(data)
+        os.replace(temporary_path, path)
+
+    def get(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as blob_file:
+            return blob_file.read()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _path(self, key: str) -> str:
+        # the key comes from a message attribute, so it must not point outside of the directory
+        if key in ("", ".", "..") or os.path.basename(key) != key:
+            raise ValueError(f"Invalid blob key, key={key!r}")
+        return os.path.join(self.directory, key)
+
+
+class S3BlobStore(BlobStore):
+    s3_client: Any
+    bucket: str
+    prefix: str = Field(default="sqsx/")
+
+    def put(self, key: str, data: bytes) -> None:
+        self.s3_client.put_object(Bucket=self.bucket, Key=f"{self.prefix}{key}", Body=data)
+
+    def get(self, key: str) -> bytes:
+        return self.s3_client.get_object(Bucket=self.bucket, Key=f"{self.prefix}{key}")["Body"].read()
+
+    def delete(self, key: str) -> None:
+        self.s3_client.delete_object(Bucket=self.bucket, Key=f"{self.prefix}{key}")
+
+
+class CachedBlobStore(BlobStore):
+    blob_store: BlobStore
+    max_size: int = Field(default=128, gt=0)
+    _cache: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def put(self, key: str, data: bytes) -> None:
+        self.blob_store.put(key, data)
+
+    def get(self, key: str) -> bytes:
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        data = self.blob_store.get(key)
+        with self._lock:
+            self._cache[key] = data
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return data
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._cache.pop(key, None)
+        self.blob_store.delete(key)
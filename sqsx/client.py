@@ -0,0 +1,32 @@
+from typing import Any, Optional
+
+from pydantic import BaseModel, Field
+
+DEFAULT_MAX_POOL_CONNECTIONS = 10
+
+
+class SQSClientFactory(BaseModel):
+    """
+    Build boto3 sqs clients with a connection pool sized for the concurrency that will use them
+    """
+
+    client_kwargs: dict = Field(default_factory=dict)
+    config: Optional[Any] = Field(default=None)
+    session: Optional[Any] = Field(default=None)
+
+    def create(self, max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS) -> Any:
+        # imported here to keep boto3 out of the import time of sqsx
+        import boto3  # type: ignore
+        from botocore.config import Config  # type: ignore
+
+        config = Config(max_pool_connections=max_pool_connections)
+        if self.config is not None:
+            config = self.config.merge(config)
+        session = self.session if self.session is not None else boto3.session.Session()
+        return session.client("sqs", config=config, **self.client_kwargs)
+
+
+def pool_connections(sqs_client: Any) -> Optional[int]:
+    # None when the client is not a boto3 client, like the FakeSQSClient or a mock
+    value = getattr(getattr(getattr(sqs_client, "meta", None), "config", None), "max_pool_connections", None)
+    return value if isinstance(value, int) else None
@@ -0,0 +1,89 @@
+import base64
+import json
+import zlib
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+
+from sqsx.helper import base64_to_dict, dict_to_base64
+
+
+def serialize(data: dict, serializer: str) -> bytes:
+    if serializer == "json":
+        return json.dumps(data, separators=(",", ":")).encode()
+    if serializer == "msgpack":
+        import msgpack  # type: ignore
+
+        return msgpack.packb(data)
+    raise ValueError(f"Unknown serializer, serializer={serializer}")
+
+
+def deserialize(payload: bytes, serializer: str) -> dict:
+    if serializer == "json":
+        return json.loads(payload)
+    if serializer == "msgpack":
+        import msgpack  # type: ignore
+
+        return msgpack.unpackb(payload)
+    raise ValueError(f"Unknown serializer, serializer={serializer}")
+
+
+def compress(payload: bytes, compression: str) -> bytes:
+    if compression == "zlib":
+        return zlib.compress(payload)
+    if compression == "zstd":
+        import zstandard  # type: ignore
+
+        return zstandard.ZstdCompressor().compress(payload)
+    raise ValueError(f"Unknown compression, compression={compression}")
+
+
+def decompress(payload: bytes, compression: str) -> bytes:
+    if compression == "zlib":
+        return zlib.decompress(payload)
+    if compression == "zstd":
+        import zstandard  # type: ignore
+
+        return zstandard.ZstdDecompressor().decompress(payload)
+    raise ValueError(f"Unknown compression, compression={compression}")
+
+
+def encode_task_body(data: dict, codec: Optional["TaskCodec"]) -> tuple[str, Optional[str]]:
+    if codec is None:
+        return dict_to_base64(data), None
+    return codec.encode(data)
+
+
+def decode_task_message(sqs_message: dict, message_body: Optional[str] = None) -> dict:
+    codec_attribute = sqs_message.get("MessageAttributes", {}).get("Codec")
+    codec_name = codec_attribute["StringValue"] if codec_attribute is not None else None
+    return decode_task_body(message_body if message_body is not None else sqs_message["Body"], codec_name)
+
+
+def decode_task_body(body: str, codec_name: Optional[str]) -> dict:
+    if codec_name is None:
+        return base64_to_dict(body)
+
+    serializer, _, compression = codec_name.partition("+")
+    if serializer == "json" and not compression:
+        return json.loads(body)
+
+    payload = base64.b85decode(body)
+    if compression:
+        payload = decompress(payload, compression)
+    return deserialize(payload, serializer)
+
+
+class TaskCodec(BaseModel):
+    serializer: Literal["json", "msgpack"] = Field(default="json")
+    compression: Optional[Literal["zlib", "zstd"]] = Field(default=None)
+    compression_threshold_bytes: int = Field(default=1024, ge=0)
+
+    def encode(self, data: dict) -> tuple[str, str]:
+        payload = serialize(data, self.serializer)
+        if self.compression is not None and len(payload) >= self.compression_threshold_bytes:
+            compressed_payload = compress(payload, self.compression)
+            return base64.b85encode(compressed_payload).decode(), f"{self.serializer}+{self.compression}"
+        if self.serializer == "json":
+            return payload.decode(), self.serializer
+        return base64.b85encode(payload).decode(), self.serializer
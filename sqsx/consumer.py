@@ -0,0 +1,112 @@
+import logging
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import FrameType
+from typing import Any, Optional
+
+from pydantic import BaseModel, Field, model_validator, PrivateAttr
+
+from sqsx.heartbeat import MAX_VISIBILITY_TIMEOUT_SECONDS
+from sqsx.helper import PriorityInFlightLimiter
+from sqsx.idle import FixedIdleStrategy, IdleStrategy
+from sqsx.ratelimit import AdaptiveConcurrencyLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class MultiQueueConsumer(BaseModel):
+    queues: list[Any] = Field(min_length=1)
+    weights: Optional[list[int]] = Field(default=None)
+    strict_priority: bool = Field(default=False)
+    _should_consume_tasks_stop: bool = PrivateAttr(default=False)
+
+    @model_validator(mode="after")
+    def check_weights(self) -> "MultiQueueConsumer":
+        if self.weights is not None:
+            if len(self.weights) != len(self.queues):
+                raise ValueError("weights must have one weight for each queue")
+            if any(weight <= 0 for weight in self.weights):
+                raise ValueError("weights must be greater than zero")
+        return self
+
+    def consume_messages(
+        self,
+        max_messages: int = 1,
+        max_threads: int = 1,
+        wait_seconds: int = 10,
+        polling_wait_seconds: int = 10,
+        run_forever: bool = True,
+        enable_signal_to_exit_gracefully: bool = True,
+        idle_strategy: Optional[IdleStrategy] = None,
+        batch_linger_seconds: Optional[float] = None,
+        heartbeat_visibility_timeout_seconds: Optional[int] = None,
+        heartbeat_max_extension_seconds: int = MAX_VISIBILITY_TIMEOUT_SECONDS,
+        rate_limit_per_second: Optional[float] = None,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        drain_timeout_seconds: Optional[float] = None,
+    ) -> None:
+        queue_urls = [queue.url for queue in self.queues]
+        logger.info(f"Starting consuming tasks, queue_urls={queue_urls}")
+        idle_strategy = idle_strategy if idle_strategy is not None else FixedIdleStrategy(wait_seconds)
+        weights = self.weights if self.weights is not None else [1] * len(self.queues)
+
+        if enable_signal_to_exit_gracefully:
+            signal.signal(signal.SIGINT, self._exit_gracefully_from_signal)
+            signal.signal(signal.SIGTERM, self._exit_gracefully_from_signal)
+
+        in_flight_limiter = PriorityInFlightLimiter(
+            max_threads + max_messages, weights, strict_priority=self.strict_priority
+        )
+        executor = ThreadPoolExecutor(max_workers=max_threads)
+        try:
+            for queue in self.queues:
+                # the shared workers may all handle messages of the same queue
+                queue._prepare_sqs_clients(
+                    max_threads, 1, batch_linger_seconds, heartbeat_visibility_timeout_seconds
+                )
+                queue._start_background_threads(
+                    batch_linger_seconds,
+                    heartbeat_visibility_timeout_seconds,
+                    heartbeat_max_extension_seconds,
+                    rate_limit_per_second,
+                    concurrency_limiter,
+                    drain_timeout_seconds,
+                )
+            receiver_threads = [
+                threading.Thread(
+                    target=queue._receive_messages_loop,
+                    args=(
+                        executor,
+                        in_flight_limiter.limiter(index),
+                        max_messages,
+                        idle_strategy,
+                        polling_wait_seconds,
+                        run_forever,
+                    ),
+                    daemon=True,
+                )
+                for index, queue in enumerate(self.queues)
+            ]
+            for receiver_thread in receiver_threads:
+                receiver_thread.start()
+            for receiver_thread in receiver_threads:
+                receiver_thread.join()
+        finally:
+            for queue in self.queues:
+                queue._drain_messages()
+            executor.shutdown()
+            for queue in self.queues:
+                queue._stop_background_threads()
+
+        if self._should_consume_tasks_stop:
+            logger.info(f"Stopping consuming tasks, queue_urls={queue_urls}")
+
+    def exit_gracefully(self) -> None:
+        logger.info("Starting graceful shutdown process")
+        self._should_consume_tasks_stop = True
+        for queue in self.queues:
+            queue.exit_gracefully()
+
+    def _exit_gracefully_from_signal(self, signal: int, frame: Optional[FrameType]):
+        self.exit_gracefully()
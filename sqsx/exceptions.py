@@ -14,3 +14,11 @@ class NoRetry(Exception):
     """
 
     pass
+
+
+class BufferFullError(Exception):
+    """
+    This exception is raised by the sqsx.BufferedProducer when the buffer is full and it must not block
+    """
+
+    pass
@@ -0,0 +1,94 @@
+import logging
+import threading
+import time
+from typing import Any, Optional
+
+from sqsx.batcher import ChangeMessageVisibilityBatcher
+
+logger = logging.getLogger(__name__)
+
+MAX_VISIBILITY_TIMEOUT_SECONDS = 43200
+
+
+class VisibilityHeartbeat:
+    """
+    Keep extending the visibility timeout of the in-flight messages until they are acked or nacked
+    """
+
+    def __init__(
+        self,
+        sqs_client: Any,
+        queue_url: str,
+        visibility_timeout_seconds: int,
+        max_extension_seconds: int = MAX_VISIBILITY_TIMEOUT_SECONDS,
+        interval_seconds: Optional[float] = None,
+    ):
+        self.queue_url = queue_url
+        self.visibility_timeout_seconds = visibility_timeout_seconds
+        self.max_extension_seconds = min(max_extension_seconds, MAX_VISIBILITY_TIMEOUT_SECONDS)
+        self.interval_seconds = (
+            interval_seconds if interval_seconds is not None else visibility_timeout_seconds / 3
+        )
+        self._batcher = ChangeMessageVisibilityBatcher(
+            sqs_client, queue_url, linger_seconds=self.interval_seconds
+        )
+        self._messages: dict[str, list[float]] = {}
+        self._sending: set[str] = set()
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        self._heartbeat_thread.start()
+
+    @property
+    def tracked_messages(self) -> int:
+        return len(self._messages)
+
+    def track(self, sqs_message: dict) -> None:
+        now = time.monotonic()
+        with self._condition:
+            self._messages[sqs_message["ReceiptHandle"]] = [now, now + self.visibility_timeout_seconds]
+
+    def untrack(self, sqs_message: dict) -> None:
+        # waits for an extension already being sent, so the ack or nack that follows always lands after it
+        receipt_handle = sqs_message["ReceiptHandle"]
+        with self._condition:
+            self._messages.pop(receipt_handle, None)
+            self._condition.wait_for(lambda: receipt_handle not in self._sending)
+
+    def beat(self) -> None:
+        now = time.monotonic()
+        entries = []
+        with self._condition:
+            for receipt_handle, (tracked_at, visible_until) in list(self._messages.items()):
+                if visible_until - now > self.interval_seconds * 2:
+                    continue
+
+                extension_remaining = tracked_at + self.max_extension_seconds - now
+                visibility_timeout = int(min(self.visibility_timeout_seconds, extension_remaining))
+                if visibility_timeout <= 0:
+                    logger.warning(
+                        f"Max visibility extension reached, queue_url={self.queue_url}, "
+                        f"receipt_handle={receipt_handle}"
+                    )
+                    del self._messages[receipt_handle]
+                    continue
+
+                self._messages[receipt_handle][1] = now + visibility_timeout
+                self._sending.add(receipt_handle)
+                entries.append({"ReceiptHandle": receipt_handle, "VisibilityTimeout": visibility_timeout})
+
+        try:
+            self._batcher.send(entries)
+        finally:
+            with self._condition:
+                self._sending.clear()
+                self._condition.notify_all()
+
+    def close(self) -> None:
+        self._stopped.set()
+        self._heartbeat_thread.join()
+        self._batcher.close()
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stopped.wait(self.interval_seconds):
+            self.beat()
@@ -1,5 +1,14 @@
 import base64
+import hashlib
 import json
+import threading
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from typing import Any, Literal, Optional
+
+MAX_BATCH_ENTRIES = 10
+MAX_BATCH_PAYLOAD_BYTES = 262144
 
 
 def dict_to_base64(data: dict) -> str:
@@ -13,3 +22,301 @@ def base64_to_dict(data: str) -> dict:
 def backoff_calculator_seconds(retries: int, minimum: int, maximum: int) -> int:
     maximum = min(maximum, 43200)
     return min(minimum * 2**retries, maximum)
+
+
+def message_entry_size(entry: dict) -> int:
+    size = len(entry["MessageBody"].encode())
+    for name, attribute in entry.get("MessageAttributes", {}).items():
+        value = attribute.get("StringValue", attribute.get("BinaryValue", b""))
+        size += len(name.encode()) + len(attribute["DataType"].encode())
+        size += len(value.encode()) if isinstance(value, str) else len(value)
+    return size
+
+
+def chunk_message_entries(
+    entries: Iterable[dict],
+    max_entries: int = MAX_BATCH_ENTRIES,
+    max_payload_bytes: int = MAX_BATCH_PAYLOAD_BYTES,
+) -> Iterator[list[dict]]:
+    chunk: list[dict] = []
+    chunk_size = 0
+    for entry in entries:
+        entry_size = message_entry_size(entry)
+        if chunk and (len(chunk) == max_entries or chunk_size + entry_size > max_payload_bytes):
+            yield chunk
+            chunk = []
+            chunk_size = 0
+        chunk.append(entry)
+        chunk_size += entry_size
+    if chunk:
+        yield chunk
+
+
+def error_code(exc: Exception) -> str:
+    # botocore.exceptions.ClientError keeps the SQS error code in its response
+    return getattr(exc, "response", {}).get("Error", {}).get("Code") or type(exc).__name__
+
+
+def deduplication_id(data: Any) -> str:
+    payload = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class InFlightLimiter:
+    """
+    Thread safe counter used to bound how many messages are held locally (running or buffered)
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self, maximum: int, timeout: Optional[float] = None) -> int:
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._in_flight < self.limit, timeout=timeout):
+                return 0
+            slots = min(maximum, self.limit - self._in_flight)
+            self._in_flight += slots
+            return slots
+
+    def release(self, slots: int = 1) -> None:
+        if slots <= 0:
+            return
+        with self._condition:
+            self._in_flight -= slots
+            self._condition.notify_all()
+
+
+class PriorityInFlightLimiter:
+    """
+    Thread safe counter shared by many queues, granting the free slots to the waiting queues by weight or priority
+    """
+
+    def __init__(self, limit: int, weights: list[int], strict_priority: bool = False):
+        self.limit = limit
+        self.weights = weights
+        self.strict_priority = strict_priority
+        self._in_flight = 0
+        self._waiting = [0] * len(weights)
+        self._current_weights = [0] * len(weights)
+        self._turn: Optional[int] = None
+        self._condition = threading.Condition()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def limiter(self, index: int) -> "QueueInFlightLimiter":
+        return QueueInFlightLimiter(self, index)
+
+    def acquire(self, index: int, maximum: int, timeout: Optional[float] = None) -> int:
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._condition:
+            self._waiting[index] += 1
+            try:
+                while True:
+                    if self._in_flight < self.limit:
+                        if self._turn is None:
+                            self._turn = self._next_index()
+                        if self._turn == index:
+                            self._turn = None
+                            slots = min(maximum, self.limit - self._in_flight)
+                            self._in_flight += slots
+                            self._condition.notify_all()
+                            return slots
+
+                    remaining = deadline - time.monotonic() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        return 0
+                    self._condition.wait(remaining)
+            finally:
+                self._waiting[index] -= 1
+                if self._turn == index and not self._waiting[index]:
+                    self._turn = None
+                    self._condition.notify_all()
+
+    def release(self, slots: int = 1) -> None:
+        if slots <= 0:
+            return
+        with self._condition:
+            self._in_flight -= slots
+            self._condition.notify_all()
+
+    def _next_index(self) -> int:
+        waiting_indexes = [index for index, waiting in enumerate(self._waiting) if waiting]
+        if self.strict_priority:
+            return waiting_indexes[0]
+
+        # smooth weighted round-robin, the same used by nginx upstreams
+        total_weight = 0
+        for index in waiting_indexes:
+            self._current_weights[index] += self.weights[index]
+            total_weight += self.weights[index]
+        next_index = max(waiting_indexes, key=lambda index: self._current_weights[index])
+        self._current_weights[next_index] -= total_weight
+        return next_index
+
+
+class QueueInFlightLimiter(InFlightLimiter):
+    """
+    View of a PriorityInFlightLimiter used by the receivers of a single queue
+    """
+
+    def __init__(self, priority_limiter: PriorityInFlightLimiter, index: int):
+        self.limit = priority_limiter.limit
+        self.priority_limiter = priority_limiter
+        self.index = index
+
+    @property
+    def in_flight(self) -> int:
+        return self.priority_limiter.in_flight
+
+    def acquire(self, maximum: int, timeout: Optional[float] = None) -> int:
+        return self.priority_limiter.acquire(self.index, maximum, timeout=timeout)
+
+    def release(self, slots: int = 1) -> None:
+        self.priority_limiter.release(slots)
+
+
+class TaskConcurrencyLimiter:
+    """
+    Thread safe counter used to bound how many tasks run at the same time, keeping up to max_waiting of the
+    exceeding ones in order and rejecting the others
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._running = 0
+        self._waiting: deque = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiting)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._running >= self.limit:
+                return False
+            self._running += 1
+            return True
+
+    def acquire_or_wait(
+        self, item: Any, max_waiting: Optional[int] = None
+    ) -> Literal["acquired", "waiting", "rejected"]:
+        with self._lock:
+            if self._running < self.limit:
+                self._running += 1
+                return "acquired"
+            if max_waiting is not None and len(self._waiting) >= max_waiting:
+                return "rejected"
+            self._waiting.append(item)
+            return "waiting"
+
+    def release_or_next(self) -> Any:
+        with self._lock:
+            if self._waiting:
+                return self._waiting.popleft()
+            self._running -= 1
+            return None
+
+
+class MessageGroupLimiter:
+    """
+    Thread safe registry allowing a single running message per message group, keeping the others in order
+    """
+
+    def __init__(self) -> None:
+        self._waiting: dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def running_groups(self) -> int:
+        return len(self._waiting)
+
+    def acquire_or_wait(self, message_group_id: str, item: Any, next_items: Iterable = ()) -> bool:
+        # next_items wait in the same call, so the group can't be released before they are queued
+        with self._lock:
+            if message_group_id in self._waiting:
+                self._waiting[message_group_id].append(item)
+                self._waiting[message_group_id].extend(next_items)
+                return False
+            self._waiting[message_group_id] = deque(next_items)
+            return True
+
+    def release_or_next(self, message_group_id: str) -> Any:
+        with self._lock:
+            waiting = self._waiting[message_group_id]
+            if waiting:
+                return waiting.popleft()
+            del self._waiting[message_group_id]
+            return None
+
+
+class MessageDrain:
+    """
+    Thread safe registry of the received messages not finished yet, used to release them on a graceful drain
+    """
+
+    def __init__(self, timeout_seconds: float):
+        self.timeout_seconds = timeout_seconds
+        self._draining_since: Optional[float] = None
+        self._messages: dict[str, dict] = {}
+        self._released_messages: list[dict] = []
+        self._released_receipt_handles: set[str] = set()
+        self._condition = threading.Condition()
+
+    @property
+    def draining(self) -> bool:
+        return self._draining_since is not None
+
+    def start(self) -> None:
+        with self._condition:
+            if self._draining_since is None:
+                self._draining_since = time.monotonic()
+
+    def track(self, sqs_messages: list[dict]) -> None:
+        with self._condition:
+            for sqs_message in sqs_messages:
+                self._messages[sqs_message["ReceiptHandle"]] = sqs_message
+
+    def untrack(self, sqs_messages: list[dict]) -> None:
+        with self._condition:
+            for sqs_message in sqs_messages:
+                self._messages.pop(sqs_message["ReceiptHandle"], None)
+            self._condition.notify_all()
+
+    def release(self, sqs_messages: list[dict]) -> None:
+        with self._condition:
+            for sqs_message in sqs_messages:
+                if self._messages.pop(sqs_message["ReceiptHandle"], None) is not None:
+                    self._released_messages.append(sqs_message)
+            self._condition.notify_all()
+
+    def wait(self) -> list[dict]:
+        # returns the released messages and the ones still running when the timeout expires
+        with self._condition:
+            draining_since = self._draining_since if self._draining_since is not None else time.monotonic()
+            deadline = draining_since + self.timeout_seconds
+            self._condition.wait_for(lambda: not self._messages, timeout=max(deadline - time.monotonic(), 0))
+            sqs_messages = self._released_messages + list(self._messages.values())
+            self._released_messages = []
+            self._messages = {}
+            self._released_receipt_handles.update(
+                sqs_message["ReceiptHandle"] for sqs_message in sqs_messages
+            )
+            return sqs_messages
+
+    def released(self, sqs_message: dict) -> bool:
+        # the handlers still running after the deadline must not ack or nack their released messages
+        with self._condition:
+            return sqs_message["ReceiptHandle"] in self._released_receipt_handles
@@ -0,0 +1,106 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any
+
+from pydantic import BaseModel, Field, PrivateAttr
+
+
+class IdempotencyStore(BaseModel, ABC):
+    """
+    Storage used to remember the completed tasks, so their duplicated deliveries are skipped
+    """
+
+    @abstractmethod
+    def is_completed(self, key: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def mark_completed(self, key: str) -> None:
+        raise NotImplementedError
+
+
+class MemoryIdempotencyStore(IdempotencyStore):
+    max_size: int = Field(default=10000, gt=0)
+    ttl_seconds: float = Field(default=3600, gt=0)
+    _completed: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def is_completed(self, key: str) -> bool:
+        with self._lock:
+            expires_at = self._completed.get(key)
+            if expires_at is None:
+                return False
+            if expires_at <= time.monotonic():
+                del self._completed[key]
+                return False
+            self._completed.move_to_end(key)
+            return True
+
+    def mark_completed(self, key: str) -> None:
+        with self._lock:
+            self._completed[key] = time.monotonic() + self.ttl_seconds
+            self._completed.move_to_end(key)
+            while len(self._completed) > self.max_size:
+                self._completed.popitem(last=False)
+
+
+class SQLiteIdempotencyStore(IdempotencyStore):
+    path: str
+    ttl_seconds: float = Field(default=86400, gt=0)
+    _connection: Any = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def model_post_init(self, __context) -> None:
+        # imported here to keep sqlite3 out of the import time of sqsx
+        import sqlite3
+
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS sqsx_completed_tasks (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS sqsx_completed_tasks_expires_at ON sqsx_completed_tasks (expires_at)"
+        )
+
+    def is_completed(self, key: str) -> bool:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT expires_at FROM sqsx_completed_tasks WHERE key = ?", (key,)
+            ).fetchone()
+        return row is not None and row[0] > time.time()
+
+    def mark_completed(self, key: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO sqsx_completed_tasks (key, expires_at) VALUES (?, ?)",
+                (key, now + self.ttl_seconds),
+            )
+            self._connection.execute("DELETE FROM sqsx_completed_tasks WHERE expires_at <= ?", (now,))
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class CachedIdempotencyStore(IdempotencyStore):
+    idempotency_store: IdempotencyStore
+    max_size: int = Field(default=10000, gt=0)
+    ttl_seconds: float = Field(default=3600, gt=0)
+    _cache: MemoryIdempotencyStore = PrivateAttr()
+
+    def model_post_init(self, __context) -> None:
+        self._cache = MemoryIdempotencyStore(max_size=self.max_size, ttl_seconds=self.ttl_seconds)
+
+    def is_completed(self, key: str) -> bool:
+        if self._cache.is_completed(key):
+            return True
+        if self.idempotency_store.is_completed(key):
+            self._cache.mark_completed(key)
+            return True
+        return False
+
+    def mark_completed(self, key: str) -> None:
+        self.idempotency_store.mark_completed(key)
+        self._cache.mark_completed(key)
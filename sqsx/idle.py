@@ -0,0 +1,42 @@
+import random
+from abc import ABC, abstractmethod
+
+
+class IdleStrategy(ABC):
+    """
+    Decide how long a receiver waits after consecutive receive calls without messages
+    """
+
+    @abstractmethod
+    def seconds(self, empty_receives: int) -> float:
+        raise NotImplementedError
+
+
+class FixedIdleStrategy(IdleStrategy):
+    def __init__(self, wait_seconds: float = 10):
+        self.wait_seconds = wait_seconds
+
+    def seconds(self, empty_receives: int) -> float:
+        return self.wait_seconds
+
+
+class ExponentialIdleStrategy(IdleStrategy):
+    def __init__(
+        self,
+        min_seconds: float = 0.1,
+        max_seconds: float = 60,
+        multiplier: float = 2,
+        jitter: bool = True,
+    ):
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.multiplier = multiplier
+        self.jitter = jitter
+
+    def seconds(self, empty_receives: int) -> float:
+        if empty_receives <= 0:
+            return 0
+        seconds = min(self.min_seconds * self.multiplier ** (empty_receives - 1), self.max_seconds)
+        if self.jitter:
+            seconds = random.uniform(seconds / 2, seconds)
+        return seconds
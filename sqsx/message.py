@@ -0,0 +1,92 @@
+from collections.abc import Iterator, Mapping
+from typing import Any, Optional
+
+
+class Message(Mapping):
+    """
+    Read-only view of a received boto3 message, the message attributes are decoded on first access and the raw
+    dict keys are still available, so message["Body"] keeps working
+    """
+
+    __slots__ = ("raw", "_message_attributes")
+
+    def __init__(self, raw: dict):
+        self.raw = raw
+        self._message_attributes: Optional[dict[str, Any]] = None
+
+    @property
+    def message_id(self) -> str:
+        return self.raw["MessageId"]
+
+    @property
+    def receipt_handle(self) -> str:
+        return self.raw["ReceiptHandle"]
+
+    @property
+    def body(self) -> str:
+        return self.raw["Body"]
+
+    @property
+    def attributes(self) -> dict[str, str]:
+        return self.raw.get("Attributes", {})
+
+    @property
+    def receive_count(self) -> int:
+        return int(self.attributes.get("ApproximateReceiveCount", 1))
+
+    @property
+    def message_attributes(self) -> dict[str, Any]:
+        if self._message_attributes is None:
+            self._message_attributes = {
+                name: attribute["StringValue"] if "StringValue" in attribute else attribute.get("BinaryValue")
+                for name, attribute in self.raw.get("MessageAttributes", {}).items()
+            }
+        return self._message_attributes
+
+    def __getitem__(self, key: str) -> Any:
+        return self.raw[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.raw)
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def __repr__(self) -> str:
+        return f"Message(message_id={self.message_id!r})"
+
+
+class TaskContext(Mapping):
+    """
+    Context given to the task handlers of a lean sqsx.Queue, keeping the keys of the context dict, the
+    sqs_message view is only created when the handler reads it
+    """
+
+    __slots__ = ("queue_url", "task_name", "_raw", "_sqs_message")
+    _keys = ("queue_url", "task_name", "sqs_message")
+
+    def __init__(self, queue_url: str, task_name: str, raw: dict):
+        self.queue_url = queue_url
+        self.task_name = task_name
+        self._raw = raw
+        self._sqs_message: Optional[Message] = None
+
+    @property
+    def sqs_message(self) -> Message:
+        if self._sqs_message is None:
+            self._sqs_message = Message(self._raw)
+        return self._sqs_message
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._keys:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __repr__(self) -> str:
+        return f"TaskContext(queue_url={self.queue_url!r}, task_name={self.task_name!r})"
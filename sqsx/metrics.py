@@ -0,0 +1,123 @@
+import math
+import threading
+from collections import deque
+from typing import Optional
+
+from pydantic import BaseModel, Field, PrivateAttr
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _escape_label_value(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in labels) + "}"
+
+
+class Metrics(BaseModel):
+    """
+    Receive the measurements taken while consuming messages, every method does nothing by default
+    """
+
+    def increment(self, name: str, labels: dict, value: float = 1) -> None:
+        pass
+
+    def observe(self, name: str, labels: dict, value: float) -> None:
+        pass
+
+    def set_gauge(self, name: str, labels: dict, value: float) -> None:
+        pass
+
+
+class InMemoryMetrics(Metrics):
+    """
+    Thread safe aggregator keeping counters, gauges and the last max_samples observations of each histogram
+    """
+
+    max_samples: int = Field(default=1024, gt=0)
+    _counters: dict[str, dict[tuple, float]] = PrivateAttr(default_factory=dict)
+    _gauges: dict[str, dict[tuple, float]] = PrivateAttr(default_factory=dict)
+    _histograms: dict[str, dict[tuple, list]] = PrivateAttr(default_factory=dict)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def increment(self, name: str, labels: dict, value: float = 1) -> None:
+        key = _labels_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, labels: dict, value: float) -> None:
+        key = _labels_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                # samples, count and sum
+                series[key] = [deque(maxlen=self.max_samples), 0, 0.0]
+            histogram = series[key]
+            histogram[0].append(value)
+            histogram[1] += 1
+            histogram[2] += value
+
+    def set_gauge(self, name: str, labels: dict, value: float) -> None:
+        with self._lock:
+            self._gauges.setdefault(name, {})[_labels_key(labels)] = value
+
+    def counter(self, name: str, labels: Optional[dict] = None) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_labels_key(labels or {}), 0)
+
+    def gauge(self, name: str, labels: Optional[dict] = None) -> Optional[float]:
+        with self._lock:
+            return self._gauges.get(name, {}).get(_labels_key(labels or {}))
+
+    def count(self, name: str, labels: Optional[dict] = None) -> int:
+        with self._lock:
+            histogram = self._histograms.get(name, {}).get(_labels_key(labels or {}))
+            return histogram[1] if histogram is not None else 0
+
+    def percentile(self, name: str, quantile: float, labels: Optional[dict] = None) -> Optional[float]:
+        with self._lock:
+            histogram = self._histograms.get(name, {}).get(_labels_key(labels or {}))
+            samples = sorted(histogram[0]) if histogram is not None else []
+        return self._percentile(samples, quantile)
+
+    def prometheus_text(self, quantiles: tuple = (0.5, 0.9, 0.99)) -> str:
+        lines = []
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            gauges = {name: dict(series) for name, series in self._gauges.items()}
+            histograms = {
+                name: {
+                    key: (sorted(samples), count, total) for key, (samples, count, total) in series.items()
+                }
+                for name, series in self._histograms.items()
+            }
+
+        for name, series in sorted(counters.items()):
+            lines.append(f"# TYPE {name} counter")
+            lines.extend(f"{name}{_format_labels(key)} {value}" for key, value in sorted(series.items()))
+        for name, series in sorted(gauges.items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(f"{name}{_format_labels(key)} {value}" for key, value in sorted(series.items()))
+        for name, histogram_series in sorted(histograms.items()):
+            lines.append(f"# TYPE {name} summary")
+            for key, (samples, count, total) in sorted(histogram_series.items()):
+                for quantile in quantiles:
+                    quantile_labels = _format_labels(key + (("quantile", str(quantile)),))
+                    lines.append(f"{name}{quantile_labels} {self._percentile(samples, quantile)}")
+                lines.append(f"{name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _percentile(sorted_samples: list, quantile: float) -> Optional[float]:
+        if not sorted_samples:
+            return None
+        index = max(math.ceil(quantile * len(sorted_samples)) - 1, 0)
+        return sorted_samples[index]
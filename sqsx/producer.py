@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Optional, Union
+
+from sqsx.exceptions import BufferFullError
+from sqsx.helper import chunk_message_entries, MAX_BATCH_ENTRIES
+from sqsx.queue import Queue, RawQueue
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedProducer:
+    """
+    Buffer the messages in memory and send them with send_message_batch calls from a background thread
+    """
+
+    def __init__(
+        self,
+        queue: Union[Queue, RawQueue],
+        max_buffer_size: int = 1000,
+        linger_seconds: float = 0.1,
+        block_when_full: bool = True,
+        max_retries: int = 3,
+    ):
+        self.queue = queue
+        self.max_buffer_size = max_buffer_size
+        self.linger_seconds = linger_seconds
+        self.block_when_full = block_when_full
+        self.max_retries = max_retries
+        self._entries: deque[tuple[float, dict]] = deque()
+        self._sending = 0
+        self._flush_requested = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._send_thread = threading.Thread(target=self._send_loop, daemon=True)
+        self._send_thread.start()
+
+    def __enter__(self) -> "BufferedProducer":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def add_task(self, task_name: str, **task_kwargs) -> None:
+        if not isinstance(self.queue, Queue):
+            raise TypeError("add_task requires a sqsx.Queue")
+        self._add_entry(self.queue._task_message_entry(task_name, task_kwargs))
+
+    def add_message(self, message_body: str, message_attributes: Optional[dict] = None) -> None:
+        if not isinstance(self.queue, RawQueue):
+            raise TypeError("add_message requires a sqsx.RawQueue")
+        self._add_entry(self.queue._message_entry(message_body, message_attributes))
+
+    def flush(self) -> None:
+        with self._condition:
+            self._flush_requested = True
+            self._condition.notify_all()
+            self._condition.wait_for(lambda: not self._entries and not self._sending)
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._send_thread.join()
+
+    def _add_entry(self, entry: dict) -> None:
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("BufferedProducer is closed")
+            if len(self._entries) >= self.max_buffer_size:
+                if not self.block_when_full:
+                    raise BufferFullError(f"Buffer is full, queue_url={self.queue.url}")
+                # a close while waiting may stop the send thread, the entry would never be sent
+                self._condition.wait_for(lambda: self._closed or len(self._entries) < self.max_buffer_size)
+                if self._closed:
+                    raise RuntimeError("BufferedProducer is closed")
+            self._entries.append((time.monotonic(), entry))
+            self._condition.notify_all()
+
+    def _should_send(self) -> bool:
+        if not self._entries:
+            return False
+        if self._closed or self._flush_requested or len(self._entries) >= MAX_BATCH_ENTRIES:
+            return True
+        return time.monotonic() - self._entries[0][0] >= self.linger_seconds
+
+    def _send_loop(self) -> None:
+        while True:
+            with self._condition:
+                while not self._should_send():
+                    if self._closed and not self._entries:
+                        return
+                    timeout = (
+                        self._entries[0][0] + self.linger_seconds - time.monotonic()
+                        if self._entries
+                        else None
+                    )
+                    self._condition.wait(timeout)
+
+                entries = [
+                    self._entries.popleft()[1] for _ in range(min(MAX_BATCH_ENTRIES, len(self._entries)))
+                ]
+                if not self._entries:
+                    self._flush_requested = False
+                self._sending += 1
+                self._condition.notify_all()
+
+            try:
+                self._send_entries(entries)
+            finally:
+                with self._condition:
+                    self._sending -= 1
+                    self._condition.notify_all()
+
+    def _send_entries(self, entries: list[dict]) -> None:
+        for chunk in chunk_message_entries(entries):
+            batch_entries = [{"Id": str(index), **entry} for index, entry in enumerate(chunk)]
+            try:
+                results = self.queue._send_message_batch(batch_entries, self.max_retries)
+            except Exception:
+                logger.exception(f"Error while sending buffered messages, queue_url={self.queue.url}")
+                continue
+
+            for result in results:
+                if not result.success:
+                    logger.error(
+                        f"Error while sending buffered message, queue_url={self.queue.url}, "
+                        f"error_code={result.error_code}, error_message={result.error_message}"
+                    )
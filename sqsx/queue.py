@@ -1,25 +1,115 @@
+import contextlib
+import functools
 import logging
+import random
 import signal
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, wait
+import uuid
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
 from types import FrameType
 from typing import Any, Callable, Optional
 
-from pydantic import BaseModel, Field, PrivateAttr
+from pydantic import BaseModel, Field, model_validator, PrivateAttr
 
+from sqsx.batcher import ChangeMessageVisibilityBatcher, DeleteMessageBatcher
+from sqsx.blob import BlobStore
+from sqsx.client import pool_connections, SQSClientFactory
+from sqsx.codec import decode_task_message, encode_task_body, TaskCodec
 from sqsx.exceptions import NoRetry, Retry
-from sqsx.helper import backoff_calculator_seconds, base64_to_dict, dict_to_base64
+from sqsx.heartbeat import MAX_VISIBILITY_TIMEOUT_SECONDS, VisibilityHeartbeat
+from sqsx.helper import (
+    backoff_calculator_seconds,
+    chunk_message_entries,
+    deduplication_id,
+    error_code,
+    InFlightLimiter,
+    MAX_BATCH_PAYLOAD_BYTES,
+    message_entry_size,
+    MessageDrain,
+    MessageGroupLimiter,
+    TaskConcurrencyLimiter,
+)
+from sqsx.idempotency import IdempotencyStore
+from sqsx.idle import FixedIdleStrategy, IdleStrategy
+from sqsx.message import Message, TaskContext
+from sqsx.metrics import Metrics
+from sqsx.ratelimit import AdaptiveConcurrencyLimiter, TokenBucket
 
 logger = logging.getLogger(__name__)
 queue_url_regex = r"(http|https)[:][\/]{2}[a-zA-Z0-9-_:.]+[\/][0-9]{12}[\/]{1}[a-zA-Z0-9-_]{0,80}"
+RECEIVE_ERROR_MIN_BACKOFF_SECONDS = 1
+RECEIVE_ERROR_MAX_BACKOFF_SECONDS = 30
+SEND_RETRY_MIN_BACKOFF_SECONDS = 0.1
+SEND_RETRY_MAX_BACKOFF_SECONDS = 5
+DEFAULT_SATURATED_VISIBILITY_TIMEOUT_SECONDS = 5
+
+
+class SendMessageResult(BaseModel):
+    index: int
+    success: bool
+    message_id: Optional[str] = None
+    error_code: Optional[str] = None
+    error_message: Optional[str] = None
+
+
+class TaskHandlerOptions(BaseModel):
+    max_concurrency: Optional[int] = Field(default=None, gt=0)
+    max_waiting: Optional[int] = Field(default=None, ge=0)
+    dedicated_pool: bool = Field(default=False)
+    saturated_visibility_timeout_seconds: Optional[int] = Field(default=None, ge=0)
+    rate_limit_per_second: Optional[float] = Field(default=None, gt=0)
+
+    @model_validator(mode="after")
+    def check_max_concurrency(self) -> "TaskHandlerOptions":
+        if self.max_concurrency is None and (
+            self.dedicated_pool
+            or self.saturated_visibility_timeout_seconds is not None
+            or self.max_waiting is not None
+        ):
+            raise ValueError(
+                "max_concurrency is required to use a dedicated pool, max_waiting or a saturated visibility timeout"
+            )
+        return self
+
+    @property
+    def waiting_limit(self) -> Optional[int]:
+        # with a saturated visibility timeout and no max_waiting the exceeding messages are released at once,
+        # None waits up to the size of the in-flight buffer of the consumption
+        if self.max_waiting is not None:
+            return self.max_waiting
+        if self.saturated_visibility_timeout_seconds is not None:
+            return 0
+        return None
 
 
 class BaseQueueMixin:
     url: str
     sqs_client: Any
+    sqs_client_factory: Optional[SQSClientFactory]
+    dedicated_sqs_clients: bool
     min_backoff_seconds: int
     max_backoff_seconds: int
     _consume_message: Any
+    _ack_batcher: Optional[DeleteMessageBatcher]
+    _nack_batcher: Optional[ChangeMessageVisibilityBatcher]
+    _batcher_sqs_client: Any
+    _heartbeat: Optional[VisibilityHeartbeat]
+    metrics: Optional[Metrics]
+    lean: bool
+    attribute_names: list[str]
+    message_attribute_names: list[str]
+    _message_group_limiter: MessageGroupLimiter
+    _consume_state: threading.local
+    _rate_limiter: Optional[TokenBucket]
+    _concurrency_limiter: Optional[AdaptiveConcurrencyLimiter]
+    _drain: Optional[MessageDrain]
+    _messages_done_callback: Optional[Callable[[int], None]]
+
+    @property
+    def fifo(self) -> bool:
+        return self.url.endswith(".fifo")
 
     def consume_messages(
         self,
@@ -29,53 +119,519 @@ class BaseQueueMixin:
         polling_wait_seconds: int = 10,
         run_forever: bool = True,
         enable_signal_to_exit_gracefully: bool = True,
+        receivers: int = 1,
+        idle_strategy: Optional[IdleStrategy] = None,
+        batch_linger_seconds: Optional[float] = None,
+        heartbeat_visibility_timeout_seconds: Optional[int] = None,
+        heartbeat_max_extension_seconds: int = MAX_VISIBILITY_TIMEOUT_SECONDS,
+        rate_limit_per_second: Optional[float] = None,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        drain_timeout_seconds: Optional[float] = None,
     ) -> None:
         logger.info(f"Starting consuming tasks, queue_url={self.url}")
+        idle_strategy = idle_strategy if idle_strategy is not None else FixedIdleStrategy(wait_seconds)
 
         if enable_signal_to_exit_gracefully:
             signal.signal(signal.SIGINT, self._exit_gracefully_from_signal)
             signal.signal(signal.SIGTERM, self._exit_gracefully_from_signal)
 
-        while True:
-            if self._should_consume_tasks_stop:
-                logger.info(f"Stopping consuming tasks, queue_url={self.url}")
-                break
+        self._prepare_sqs_clients(
+            max_threads, receivers, batch_linger_seconds, heartbeat_visibility_timeout_seconds
+        )
+        self._start_background_threads(
+            batch_linger_seconds,
+            heartbeat_visibility_timeout_seconds,
+            heartbeat_max_extension_seconds,
+            rate_limit_per_second,
+            concurrency_limiter,
+            drain_timeout_seconds,
+        )
+        in_flight_limiter = InFlightLimiter(max_threads + max_messages)
+        executor = ThreadPoolExecutor(max_workers=max_threads)
+        try:
+            receive_loop_args = (
+                executor,
+                in_flight_limiter,
+                max_messages,
+                idle_strategy,
+                polling_wait_seconds,
+                run_forever,
+            )
+            receiver_threads = [
+                threading.Thread(target=self._receive_messages_loop, args=receive_loop_args, daemon=True)
+                for _ in range(receivers - 1)
+            ]
+            for receiver_thread in receiver_threads:
+                receiver_thread.start()
+            self._receive_messages_loop(*receive_loop_args)
+            for receiver_thread in receiver_threads:
+                receiver_thread.join()
+        finally:
+            self._drain_messages()
+            executor.shutdown()
+            self._stop_background_threads()
+
+        if self._should_consume_tasks_stop:
+            logger.info(f"Stopping consuming tasks, queue_url={self.url}")
+
+    def _create_sqs_client(self) -> None:
+        if self.sqs_client is None:
+            if self.sqs_client_factory is None:
+                raise ValueError("sqs_client or sqs_client_factory is required")
+            self.sqs_client = self.sqs_client_factory.create()
+        if self.dedicated_sqs_clients and self.sqs_client_factory is None:
+            raise ValueError("sqs_client_factory is required to use dedicated sqs clients")
+
+    def _prepare_sqs_clients(
+        self,
+        max_threads: int,
+        receivers: int,
+        batch_linger_seconds: Optional[float],
+        heartbeat_visibility_timeout_seconds: Optional[int],
+    ) -> None:
+        # every thread calling sqs at the same time needs a connection, otherwise the pool discards them
+        required_connections = max_threads + self._dedicated_pool_threads()
+        self._batcher_sqs_client = None
+        if (
+            self.dedicated_sqs_clients
+            and batch_linger_seconds is not None
+            and self.sqs_client_factory is not None
+        ):
+            # the full batches are sent by the handler threads and the lingering ones by the flusher threads
+            self._batcher_sqs_client = self.sqs_client_factory.create(required_connections + 2)
+        if not self.dedicated_sqs_clients:
+            required_connections += receivers + (2 if batch_linger_seconds is not None else 0)
+        if heartbeat_visibility_timeout_seconds is not None:
+            required_connections += 1
 
-            response = self.sqs_client.receive_message(
-                QueueUrl=self.url,
-                AttributeNames=["All"],
-                MaxNumberOfMessages=min(max_messages, 10),
-                MessageAttributeNames=["All"],
-                WaitTimeSeconds=polling_wait_seconds,
+        max_pool_connections = pool_connections(self.sqs_client)
+        if max_pool_connections is None or max_pool_connections >= required_connections:
+            return
+        if self.sqs_client_factory is not None:
+            logger.info(
+                f"Resizing the sqs client connection pool, max_pool_connections={required_connections}, "
+                f"queue_url={self.url}"
             )
+            self.sqs_client = self.sqs_client_factory.create(required_connections)
+            return
+        logger.warning(
+            f"The sqs client connection pool is smaller than the consumption concurrency, "
+            f"max_pool_connections={max_pool_connections}, required_connections={required_connections}, "
+            f"queue_url={self.url}"
+        )
+
+    def _dedicated_pool_threads(self) -> int:
+        return 0
+
+    def _receiver_sqs_client(self) -> Any:
+        if self.dedicated_sqs_clients and self.sqs_client_factory is not None:
+            return self.sqs_client_factory.create(1)
+        return self.sqs_client
+
+    def _start_background_threads(
+        self,
+        batch_linger_seconds: Optional[float],
+        heartbeat_visibility_timeout_seconds: Optional[int],
+        heartbeat_max_extension_seconds: int,
+        rate_limit_per_second: Optional[float] = None,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        drain_timeout_seconds: Optional[float] = None,
+    ) -> None:
+        if rate_limit_per_second is not None:
+            self._rate_limiter = TokenBucket(rate_limit_per_second)
+        self._concurrency_limiter = concurrency_limiter
+        if drain_timeout_seconds is not None:
+            self._drain = MessageDrain(drain_timeout_seconds)
+        if batch_linger_seconds is not None:
+            batcher_sqs_client = (
+                self._batcher_sqs_client if self._batcher_sqs_client is not None else self.sqs_client
+            )
+            self._ack_batcher = DeleteMessageBatcher(
+                batcher_sqs_client, self.url, batch_linger_seconds, on_sent=self._messages_deleted
+            )
+            self._nack_batcher = ChangeMessageVisibilityBatcher(
+                batcher_sqs_client, self.url, batch_linger_seconds
+            )
+        if heartbeat_visibility_timeout_seconds is not None:
+            self._heartbeat = VisibilityHeartbeat(
+                self.sqs_client,
+                self.url,
+                visibility_timeout_seconds=heartbeat_visibility_timeout_seconds,
+                max_extension_seconds=heartbeat_max_extension_seconds,
+            )
+
+    def _messages_deleted(self, entries: list[dict]) -> None:
+        return None
+
+    def _stop_background_threads(self) -> None:
+        self._rate_limiter = None
+        self._batcher_sqs_client = None
+        self._concurrency_limiter = None
+        self._drain = None
+        if self._heartbeat is not None:
+            self._heartbeat.close()
+            self._heartbeat = None
+        if self._ack_batcher is not None:
+            self._ack_batcher.close()
+            self._ack_batcher = None
+        if self._nack_batcher is not None:
+            self._nack_batcher.close()
+            self._nack_batcher = None
+
+    def _receive_messages_loop(
+        self,
+        executor: ThreadPoolExecutor,
+        in_flight_limiter: InFlightLimiter,
+        max_messages: int,
+        idle_strategy: IdleStrategy,
+        polling_wait_seconds: int,
+        run_forever: bool,
+    ) -> None:
+        sqs_client = self._receiver_sqs_client()
+        attribute_names, message_attribute_names = self._receive_attribute_names()
+        empty_receives = 0
+        receive_errors = 0
+        while not self._should_consume_tasks_stop:
+            slots = in_flight_limiter.acquire(min(max_messages, 10), timeout=1)
+            if not slots:
+                continue
+
+            receive_message_kwargs = {}
+            if self._heartbeat is not None:
+                receive_message_kwargs["VisibilityTimeout"] = self._heartbeat.visibility_timeout_seconds
+            started_at = time.perf_counter()
+            try:
+                response = sqs_client.receive_message(
+                    QueueUrl=self.url,
+                    AttributeNames=attribute_names,
+                    MaxNumberOfMessages=slots,
+                    MessageAttributeNames=message_attribute_names,
+                    WaitTimeSeconds=polling_wait_seconds,
+                    **receive_message_kwargs,
+                )
+            except Exception:
+                # a receiver never dies holding its slots, it backs off and polls again
+                in_flight_limiter.release(slots)
+                receive_errors += 1
+                wait_seconds = min(
+                    RECEIVE_ERROR_MIN_BACKOFF_SECONDS * 2 ** (receive_errors - 1),
+                    RECEIVE_ERROR_MAX_BACKOFF_SECONDS,
+                )
+                logger.exception(
+                    f"Error while receiving messages, wait_seconds={wait_seconds}, queue_url={self.url}"
+                )
+                self._sleep_unless_stopped(wait_seconds)
+                continue
+            receive_errors = 0
 
             sqs_messages = response.get("Messages", [])
+            in_flight_limiter.release(slots - len(sqs_messages))
+            if self.metrics is not None:
+                labels = {"queue_url": self.url}
+                self.metrics.observe(
+                    "sqsx_receive_duration_seconds", labels, time.perf_counter() - started_at
+                )
+                self.metrics.observe("sqsx_received_messages", labels, len(sqs_messages))
+                self.metrics.set_gauge("sqsx_in_flight_messages", labels, in_flight_limiter.in_flight)
+                self.metrics.set_gauge("sqsx_in_flight_limit", labels, in_flight_limiter.limit)
+                if self._concurrency_limiter is not None:
+                    self.metrics.set_gauge("sqsx_concurrency_limit", labels, self._concurrency_limiter.limit)
             if not sqs_messages:
+                empty_receives += 1
+                wait_seconds = idle_strategy.seconds(empty_receives)
                 logger.debug(
                     f"Waiting some seconds because no message was received, wait_seconds={wait_seconds}, "
                     f"polling_wait_seconds={polling_wait_seconds}, queue_url={self.url}"
                 )
-                time.sleep(wait_seconds)
+                self._sleep_unless_stopped(wait_seconds)
                 continue
+            empty_receives = 0
 
-            with ThreadPoolExecutor(max_workers=max_threads) as executor:
-                futures = []
+            if self._drain is not None:
+                self._drain.track(sqs_messages)
+                if self._release_if_draining(sqs_messages):
+                    in_flight_limiter.release(len(sqs_messages))
+                    break
+            if self._heartbeat is not None:
                 for sqs_message in sqs_messages:
-                    futures.append(executor.submit(self._consume_message, sqs_message))
-                wait(futures)
+                    self._heartbeat.track(sqs_message)
+            self._submit_messages(executor, in_flight_limiter, sqs_messages)
 
             if not run_forever:
                 break
 
+    def _receive_attribute_names(self) -> tuple[list[str], list[str]]:
+        if not self.lean:
+            return ["All"], ["All"]
+        attribute_names = ["ApproximateReceiveCount"]
+        if self.fifo:
+            attribute_names.append("MessageGroupId")
+        attribute_names.extend(name for name in self.attribute_names if name not in attribute_names)
+        message_attribute_names = self._used_message_attribute_names()
+        message_attribute_names.extend(
+            name for name in self.message_attribute_names if name not in message_attribute_names
+        )
+        return attribute_names, message_attribute_names
+
+    def _used_message_attribute_names(self) -> list[str]:
+        return []
+
+    def _submit_messages(
+        self, executor: ThreadPoolExecutor, in_flight_limiter: InFlightLimiter, sqs_messages: list[dict]
+    ) -> None:
+        if self.fifo:
+            sqs_messages_by_group: dict[str, list[dict]] = {}
+            for sqs_message in sqs_messages:
+                sqs_messages_by_group.setdefault(sqs_message["Attributes"]["MessageGroupId"], []).append(
+                    sqs_message
+                )
+            for message_group_id, group_sqs_messages in sqs_messages_by_group.items():
+                if self._message_group_limiter.acquire_or_wait(
+                    message_group_id, group_sqs_messages[0], group_sqs_messages[1:]
+                ):
+                    executor.submit(
+                        self._consume_group_messages,
+                        in_flight_limiter,
+                        message_group_id,
+                        group_sqs_messages[0],
+                    )
+            return
+
+        for sqs_message in sqs_messages:
+            future = executor.submit(self._consume_message_unless_draining, sqs_message)
+            future.add_done_callback(functools.partial(self._message_done, in_flight_limiter, [sqs_message]))
+
+    def _consume_group_messages(
+        self, in_flight_limiter: InFlightLimiter, message_group_id: str, sqs_message: dict
+    ) -> None:
+        next_sqs_message: Optional[dict] = sqs_message
+        group_released = False
+        while next_sqs_message is not None:
+            try:
+                if group_released:
+                    self._change_message_visibility(next_sqs_message, 0)
+                elif not self._release_if_draining([next_sqs_message]):
+                    self._consume_state.message_released = False
+                    try:
+                        self._consume_message(next_sqs_message)
+                    except Exception:
+                        logger.exception(
+                            f"Error while consuming message, message_id={next_sqs_message['MessageId']}"
+                        )
+                    if self._consume_state.message_released:
+                        logger.info(
+                            f"Message released, releasing the next messages of the group, "
+                            f"message_id={next_sqs_message['MessageId']}, message_group_id={message_group_id}"
+                        )
+                        group_released = True
+            except Exception:
+                logger.exception(
+                    f"Error while releasing message, message_id={next_sqs_message['MessageId']}, "
+                    f"message_group_id={message_group_id}"
+                )
+            # the group must always move on, otherwise its next messages would wait locally forever
+            try:
+                self._message_done(in_flight_limiter, [next_sqs_message])
+            finally:
+                next_sqs_message = self._message_group_limiter.release_or_next(message_group_id)
+
+    def _message_done(
+        self,
+        in_flight_limiter: Optional[InFlightLimiter],
+        sqs_messages: list[dict],
+        future: Optional[Future] = None,
+    ) -> None:
+        if self._heartbeat is not None:
+            for sqs_message in sqs_messages:
+                self._heartbeat.untrack(sqs_message)
+        if self._drain is not None:
+            self._drain.untrack(sqs_messages)
+        if in_flight_limiter is not None:
+            in_flight_limiter.release(len(sqs_messages))
+        if self._messages_done_callback is not None:
+            self._messages_done_callback(len(sqs_messages))
+
+    def _consume_message_unless_draining(self, sqs_message: dict) -> None:
+        if not self._release_if_draining([sqs_message]):
+            self._consume_message(sqs_message)
+
+    def _release_if_draining(self, sqs_messages: list[dict]) -> bool:
+        if self._drain is None or not self._drain.draining:
+            return False
+        self._drain.release(sqs_messages)
+        return True
+
+    def _drain_messages(self) -> None:
+        if self._drain is None or not self._drain.draining:
+            return
+        sqs_messages = self._drain.wait()
+        logger.info(
+            f"Releasing the messages not finished, queue_url={self.url}, messages={len(sqs_messages)}"
+        )
+        if not sqs_messages:
+            return
+
+        if self._heartbeat is not None:
+            for sqs_message in sqs_messages:
+                self._heartbeat.untrack(sqs_message)
+        visibility_batcher = ChangeMessageVisibilityBatcher(self.sqs_client, self.url)
+        for sqs_message in sqs_messages:
+            visibility_batcher.add({"ReceiptHandle": sqs_message["ReceiptHandle"], "VisibilityTimeout": 0})
+        visibility_batcher.close()
+
+    def _released_by_drain(self, sqs_message: dict) -> bool:
+        return self._drain is not None and self._drain.released(sqs_message)
+
+    @contextlib.contextmanager
+    def _handler_capacity(self, task_name: Optional[str], tasks: int = 1) -> Iterator[None]:
+        self._wait_rate_limits(task_name, tasks)
+        if self._concurrency_limiter is None:
+            yield
+            return
+
+        concurrency_limiter = self._concurrency_limiter
+        concurrency_limiter.acquire()
+        started_at = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except NoRetry:
+            raise
+        except Exception:
+            failed = True
+            raise
+        finally:
+            concurrency_limiter.release()
+            concurrency_limiter.record(time.perf_counter() - started_at, failed)
+
+    def _wait_rate_limits(self, task_name: Optional[str], tasks: int) -> None:
+        if self._rate_limiter is not None:
+            self._rate_limiter.acquire(tasks)
+
+    def _sleep_unless_stopped(self, seconds: float) -> None:
+        deadline = time.monotonic() + seconds
+        while not self._should_consume_tasks_stop:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(min(remaining, 1))
+
     def exit_gracefully(self) -> None:
         logger.info(f"Starting graceful shutdown process, queue_url={self.url}")
         self._should_consume_tasks_stop = True
+        if self._drain is not None:
+            self._drain.start()
 
     def _exit_gracefully_from_signal(self, signal: int, frame: Optional[FrameType]):
         self.exit_gracefully()
 
+    def _send_messages(
+        self, entries: Iterable[dict], max_threads: int, max_retries: int
+    ) -> list[SendMessageResult]:
+        indexed_entries = ({"Id": str(index), **entry} for index, entry in enumerate(entries))
+        in_flight_limiter = InFlightLimiter(max_threads * 2)
+        futures = []
+        with ThreadPoolExecutor(max_workers=max_threads) as executor:
+            for chunk in chunk_message_entries(indexed_entries):
+                in_flight_limiter.acquire(1)
+                future = executor.submit(self._send_message_batch, chunk, max_retries)
+                future.add_done_callback(lambda _: in_flight_limiter.release())
+                futures.append(future)
+
+        results = [result for future in futures for result in future.result()]
+        return sorted(results, key=lambda result: result.index)
+
+    def _send_message_batch(self, entries: list[dict], max_retries: int) -> list[SendMessageResult]:
+        results = []
+        pending_entries = []
+        for entry in entries:
+            if message_entry_size(entry) > MAX_BATCH_PAYLOAD_BYTES:
+                results.append(
+                    SendMessageResult(
+                        index=int(entry["Id"]),
+                        success=False,
+                        error_code="MessageTooLong",
+                        error_message=f"Message must be shorter than {MAX_BATCH_PAYLOAD_BYTES} bytes",
+                    )
+                )
+            else:
+                pending_entries.append(entry)
+
+        for attempt in range(max_retries + 1):
+            if not pending_entries:
+                break
+            if attempt > 0:
+                # the retried entries are throttled or failed on the server side, give sqs time to recover
+                backoff_seconds = min(
+                    SEND_RETRY_MIN_BACKOFF_SECONDS * 2 ** (attempt - 1), SEND_RETRY_MAX_BACKOFF_SECONDS
+                )
+                time.sleep(random.uniform(backoff_seconds / 2, backoff_seconds))
+
+            try:
+                response = self.sqs_client.send_message_batch(QueueUrl=self.url, Entries=pending_entries)
+            except Exception as exc:
+                logger.exception(
+                    f"Error while sending message batch, queue_url={self.url}, entries={len(pending_entries)}, "
+                    f"attempt={attempt}"
+                )
+                failed_entries = [
+                    {"Id": entry["Id"], "SenderFault": False, "Code": error_code(exc), "Message": str(exc)}
+                    for entry in pending_entries
+                ]
+            else:
+                for successful_entry in response.get("Successful", []):
+                    results.append(
+                        SendMessageResult(
+                            index=int(successful_entry["Id"]),
+                            success=True,
+                            message_id=successful_entry["MessageId"],
+                        )
+                    )
+                failed_entries = response.get("Failed", [])
+
+            entries_by_id = {entry["Id"]: entry for entry in pending_entries}
+            pending_entries = []
+            for failed_entry in failed_entries:
+                if failed_entry["SenderFault"] or attempt == max_retries:
+                    results.append(
+                        SendMessageResult(
+                            index=int(failed_entry["Id"]),
+                            success=False,
+                            error_code=failed_entry["Code"],
+                            error_message=failed_entry.get("Message"),
+                        )
+                    )
+                else:
+                    pending_entries.append(entries_by_id[failed_entry["Id"]])
+
+        return results
+
+    def _record_task(
+        self, task_name: Optional[str], outcome: str, started_at: Optional[float] = None
+    ) -> None:
+        if self.metrics is None:
+            return
+        labels = {"queue_url": self.url}
+        if task_name is not None:
+            labels["task_name"] = task_name
+        if started_at is not None:
+            self.metrics.observe("sqsx_task_duration_seconds", labels, time.perf_counter() - started_at)
+        self.metrics.increment("sqsx_tasks_total", {**labels, "outcome": outcome})
+
     def _message_ack(self, sqs_message: dict) -> None:
+        if self._released_by_drain(sqs_message):
+            logger.warning(
+                f"Message already released by the drain, skipping the ack, message_id={sqs_message['MessageId']}, "
+                f"queue_url={self.url}"
+            )
+            return
+        if self.metrics is not None:
+            self.metrics.increment("sqsx_acks_total", {"queue_url": self.url})
+        if self._heartbeat is not None:
+            self._heartbeat.untrack(sqs_message)
         receipt_handle = sqs_message["ReceiptHandle"]
+        if self._ack_batcher is not None:
+            return self._ack_batcher.add({"ReceiptHandle": receipt_handle})
         self.sqs_client.delete_message(QueueUrl=self.url, ReceiptHandle=receipt_handle)
 
     def _message_nack(
@@ -84,63 +640,464 @@ class BaseQueueMixin:
         min_backoff_seconds: Optional[int] = None,
         max_backoff_seconds: Optional[int] = None,
     ) -> None:
+        if self.metrics is not None:
+            self.metrics.increment("sqsx_nacks_total", {"queue_url": self.url})
         min_backoff_seconds = min_backoff_seconds if min_backoff_seconds else self.min_backoff_seconds
         max_backoff_seconds = max_backoff_seconds if max_backoff_seconds else self.max_backoff_seconds
-        receipt_handle = sqs_message["ReceiptHandle"]
         receive_count = int(sqs_message["Attributes"]["ApproximateReceiveCount"]) - 1
         timeout = backoff_calculator_seconds(receive_count, min_backoff_seconds, max_backoff_seconds)
+        self._change_message_visibility(sqs_message, timeout)
+
+    def _change_message_visibility(self, sqs_message: dict, visibility_timeout: int) -> None:
+        self._consume_state.message_released = True
+        if self._released_by_drain(sqs_message):
+            logger.warning(
+                f"Message already released by the drain, skipping the nack, message_id={sqs_message['MessageId']}, "
+                f"queue_url={self.url}"
+            )
+            return
+        if self._heartbeat is not None:
+            self._heartbeat.untrack(sqs_message)
+        receipt_handle = sqs_message["ReceiptHandle"]
+        if self._nack_batcher is not None:
+            return self._nack_batcher.add(
+                {"ReceiptHandle": receipt_handle, "VisibilityTimeout": visibility_timeout}
+            )
         self.sqs_client.change_message_visibility(
-            QueueUrl=self.url, ReceiptHandle=receipt_handle, VisibilityTimeout=timeout
+            QueueUrl=self.url, ReceiptHandle=receipt_handle, VisibilityTimeout=visibility_timeout
         )
 
 
 class Queue(BaseModel, BaseQueueMixin):
     url: str = Field(pattern=queue_url_regex)
-    sqs_client: Any
+    sqs_client: Any = Field(default=None)
+    sqs_client_factory: Optional[SQSClientFactory] = Field(default=None)
+    dedicated_sqs_clients: bool = Field(default=False)
     min_backoff_seconds: int = Field(default=30)
     max_backoff_seconds: int = Field(default=900)
+    codec: Optional[TaskCodec] = Field(default=None)
+    blob_store: Optional[BlobStore] = Field(default=None)
+    blob_threshold_bytes: int = Field(default=MAX_BATCH_PAYLOAD_BYTES, ge=0)
+    message_group_id_function: Optional[Callable[[str, dict], str]] = Field(default=None)
+    message_deduplication_id_function: Optional[Callable[[str, dict], str]] = Field(default=None)
+    idempotency_store: Optional[IdempotencyStore] = Field(default=None)
+    idempotency_key_function: Optional[Callable[[str, dict], Optional[str]]] = Field(default=None)
+    metrics: Optional[Metrics] = Field(default=None)
+    lean: bool = Field(default=False)
+    attribute_names: list[str] = Field(default_factory=list)
+    message_attribute_names: list[str] = Field(default_factory=list)
     _handlers: dict[str, Callable] = PrivateAttr(default={})
+    _batch_handlers: dict[str, Callable] = PrivateAttr(default={})
+    _handler_options: dict[str, TaskHandlerOptions] = PrivateAttr(default={})
+    _task_limiters: dict[str, TaskConcurrencyLimiter] = PrivateAttr(default={})
+    _task_executors: dict[str, ThreadPoolExecutor] = PrivateAttr(default={})
+    _task_rate_limiters: dict[str, TokenBucket] = PrivateAttr(default={})
+    _acked_blob_keys: dict[str, str] = PrivateAttr(default_factory=dict)
+    _blob_keys_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    # False while handling a Lambda event, Lambda deletes the records only after the invocation returns
+    _delete_acked_blobs: bool = PrivateAttr(default=True)
     _should_consume_tasks_stop: bool = PrivateAttr(default=False)
+    _ack_batcher: Optional[DeleteMessageBatcher] = PrivateAttr(default=None)
+    _nack_batcher: Optional[ChangeMessageVisibilityBatcher] = PrivateAttr(default=None)
+    _batcher_sqs_client: Any = PrivateAttr(default=None)
+    _heartbeat: Optional[VisibilityHeartbeat] = PrivateAttr(default=None)
+    _message_group_limiter: MessageGroupLimiter = PrivateAttr(default_factory=MessageGroupLimiter)
+    _consume_state: threading.local = PrivateAttr(default_factory=threading.local)
+    _rate_limiter: Optional[TokenBucket] = PrivateAttr(default=None)
+    _concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = PrivateAttr(default=None)
+    _drain: Optional[MessageDrain] = PrivateAttr(default=None)
+    _messages_done_callback: Optional[Callable[[int], None]] = PrivateAttr(default=None)
+
+    @model_validator(mode="after")
+    def check_sqs_client(self) -> "Queue":
+        self._create_sqs_client()
+        return self
 
     def add_task(self, task_name: str, **task_kwargs) -> dict:
         return self.sqs_client.send_message(
-            QueueUrl=self.url,
-            MessageAttributes={"TaskName": {"DataType": "String", "StringValue": task_name}},
-            MessageBody=dict_to_base64({"kwargs": task_kwargs}),
+            QueueUrl=self.url, **self._task_message_entry(task_name, task_kwargs)
         )
 
-    def add_task_handler(self, task_name: str, task_handler_function: Callable) -> None:
+    def add_tasks(
+        self, tasks: Iterable[tuple[str, dict]], max_threads: int = 1, max_retries: int = 3
+    ) -> list[SendMessageResult]:
+        entries = (self._task_message_entry(task_name, task_kwargs) for task_name, task_kwargs in tasks)
+        return self._send_messages(entries, max_threads=max_threads, max_retries=max_retries)
+
+    def add_task_handler(
+        self,
+        task_name: str,
+        task_handler_function: Callable,
+        max_concurrency: Optional[int] = None,
+        dedicated_pool: bool = False,
+        saturated_visibility_timeout_seconds: Optional[int] = None,
+        rate_limit_per_second: Optional[float] = None,
+        max_waiting: Optional[int] = None,
+    ) -> None:
+        options = TaskHandlerOptions(
+            max_concurrency=max_concurrency,
+            max_waiting=max_waiting,
+            dedicated_pool=dedicated_pool,
+            saturated_visibility_timeout_seconds=saturated_visibility_timeout_seconds,
+            rate_limit_per_second=rate_limit_per_second,
+        )
         self._handlers.update({task_name: task_handler_function})
+        self._handler_options.update({task_name: options})
+        if options.max_concurrency is not None:
+            self._task_limiters.update({task_name: TaskConcurrencyLimiter(options.max_concurrency)})
+        else:
+            self._task_limiters.pop(task_name, None)
+        if options.rate_limit_per_second is not None:
+            self._task_rate_limiters.update({task_name: TokenBucket(options.rate_limit_per_second)})
+        else:
+            self._task_rate_limiters.pop(task_name, None)
+
+    def add_batch_task_handler(self, task_name: str, batch_task_handler_function: Callable) -> None:
+        self._batch_handlers.update({task_name: batch_task_handler_function})
+
+    def _task_message_entry(self, task_name: str, task_kwargs: dict) -> dict:
+        message_body, codec_name = encode_task_body({"kwargs": task_kwargs}, self.codec)
+        message_attributes = {"TaskName": {"DataType": "String", "StringValue": task_name}}
+        if codec_name is not None:
+            message_attributes["Codec"] = {"DataType": "String", "StringValue": codec_name}
+        entry = {"MessageAttributes": message_attributes, "MessageBody": message_body}
+        if self.blob_store is not None and message_entry_size(entry) > self.blob_threshold_bytes:
+            blob_key = uuid.uuid4().hex
+            self.blob_store.put(blob_key, message_body.encode())
+            message_attributes["BlobKey"] = {"DataType": "String", "StringValue": blob_key}
+            entry["MessageBody"] = blob_key
+        if self.fifo:
+            entry["MessageGroupId"] = (
+                self.message_group_id_function(task_name, task_kwargs)
+                if self.message_group_id_function is not None
+                else task_name
+            )
+            entry["MessageDeduplicationId"] = (
+                self.message_deduplication_id_function(task_name, task_kwargs)
+                if self.message_deduplication_id_function is not None
+                else deduplication_id([task_name, task_kwargs])
+            )
+        return entry
+
+    def _used_message_attribute_names(self) -> list[str]:
+        return ["TaskName", "Codec", "BlobKey"]
+
+    def _decode_task_message(self, sqs_message: dict) -> dict:
+        blob_key_attribute = sqs_message.get("MessageAttributes", {}).get("BlobKey")
+        if blob_key_attribute is None:
+            return decode_task_message(sqs_message)
+        if self.blob_store is None:
+            raise ValueError("Message body is stored in a blob store, but the queue has no blob_store")
+        message_body = self.blob_store.get(blob_key_attribute["StringValue"]).decode()
+        return decode_task_message(sqs_message, message_body)
+
+    def _message_ack(self, sqs_message: dict) -> None:
+        # the blob is deleted only after sqs deleted the message, a redelivered message still needs its body
+        blob_key_attribute = sqs_message.get("MessageAttributes", {}).get("BlobKey")
+        if (
+            blob_key_attribute is None
+            or self.blob_store is None
+            or not self._delete_acked_blobs
+            or self._released_by_drain(sqs_message)
+        ):
+            return super()._message_ack(sqs_message)
+        if self._ack_batcher is not None:
+            with self._blob_keys_lock:
+                self._acked_blob_keys[sqs_message["ReceiptHandle"]] = blob_key_attribute["StringValue"]
+            return super()._message_ack(sqs_message)
+        super()._message_ack(sqs_message)
+        self._delete_blob(blob_key_attribute["StringValue"])
+
+    def _messages_deleted(self, entries: list[dict]) -> None:
+        with self._blob_keys_lock:
+            blob_keys = [self._acked_blob_keys.pop(entry["ReceiptHandle"], None) for entry in entries]
+        for blob_key in blob_keys:
+            if blob_key is not None:
+                self._delete_blob(blob_key)
+
+    def _delete_blob(self, blob_key: str) -> None:
+        if self.blob_store is None:
+            return
+        try:
+            self.blob_store.delete(blob_key)
+        except Exception:
+            logger.exception(f"Error while deleting blob, queue_url={self.url}, blob_key={blob_key}")
+
+    def _submit_messages(
+        self, executor: ThreadPoolExecutor, in_flight_limiter: InFlightLimiter, sqs_messages: list[dict]
+    ) -> None:
+        if self.fifo:
+            return super()._submit_messages(executor, in_flight_limiter, sqs_messages)
+
+        sqs_messages_by_task_name: dict[str, list[dict]] = {}
+        single_sqs_messages = []
+        for sqs_message in sqs_messages:
+            task_name_attribute = sqs_message.get("MessageAttributes", {}).get("TaskName")
+            if task_name_attribute is not None and task_name_attribute["StringValue"] in self._batch_handlers:
+                sqs_messages_by_task_name.setdefault(task_name_attribute["StringValue"], []).append(
+                    sqs_message
+                )
+            elif (
+                task_name_attribute is not None and task_name_attribute["StringValue"] in self._task_limiters
+            ):
+                self._submit_limited_message(
+                    executor, in_flight_limiter, task_name_attribute["StringValue"], sqs_message
+                )
+            else:
+                single_sqs_messages.append(sqs_message)
+
+        for task_name, task_sqs_messages in sqs_messages_by_task_name.items():
+            future = executor.submit(
+                self._consume_message_batch_unless_draining, task_name, task_sqs_messages
+            )
+            future.add_done_callback(
+                functools.partial(self._message_done, in_flight_limiter, task_sqs_messages)
+            )
+        super()._submit_messages(executor, in_flight_limiter, single_sqs_messages)
+
+    def _submit_limited_message(
+        self,
+        executor: ThreadPoolExecutor,
+        in_flight_limiter: InFlightLimiter,
+        task_name: str,
+        sqs_message: dict,
+    ) -> None:
+        task_limiter = self._task_limiters[task_name]
+        options = self._handler_options[task_name]
+        max_waiting = options.waiting_limit if options.waiting_limit is not None else in_flight_limiter.limit
+        admission = task_limiter.acquire_or_wait(sqs_message, max_waiting)
+        if admission == "waiting":
+            # the waiting messages have their own max_waiting bound, their slots go back to the other tasks
+            return in_flight_limiter.release()
+        if admission == "rejected":
+            saturated_visibility_timeout_seconds = options.saturated_visibility_timeout_seconds
+            if saturated_visibility_timeout_seconds is None:
+                saturated_visibility_timeout_seconds = DEFAULT_SATURATED_VISIBILITY_TIMEOUT_SECONDS
+            logger.info(
+                f"Task concurrency limit reached, releasing the message, message_id={sqs_message['MessageId']}, "
+                f"task_name={task_name}"
+            )
+            try:
+                self._change_message_visibility(sqs_message, saturated_visibility_timeout_seconds)
+            except Exception:
+                # the receiver thread keeps running, the message is visible again after its visibility timeout
+                logger.exception(
+                    f"Error while releasing message, message_id={sqs_message['MessageId']}, task_name={task_name}"
+                )
+            finally:
+                self._message_done(in_flight_limiter, [sqs_message])
+            return
+
+        task_executor = self._task_executors.get(task_name, executor)
+        task_executor.submit(self._consume_limited_messages, in_flight_limiter, task_limiter, sqs_message)
+
+    def _consume_limited_messages(
+        self, in_flight_limiter: InFlightLimiter, task_limiter: TaskConcurrencyLimiter, sqs_message: dict
+    ) -> None:
+        # only the first message holds an in-flight slot, the waiting ones released theirs
+        message_in_flight_limiter: Optional[InFlightLimiter] = in_flight_limiter
+        next_sqs_message: Optional[dict] = sqs_message
+        while next_sqs_message is not None:
+            try:
+                self._consume_message_unless_draining(next_sqs_message)
+            except Exception:
+                logger.exception(f"Error while consuming message, message_id={next_sqs_message['MessageId']}")
+            self._message_done(message_in_flight_limiter, [next_sqs_message])
+            message_in_flight_limiter = None
+            next_sqs_message = task_limiter.release_or_next()
+
+    def _start_background_threads(
+        self,
+        batch_linger_seconds: Optional[float],
+        heartbeat_visibility_timeout_seconds: Optional[int],
+        heartbeat_max_extension_seconds: int,
+        rate_limit_per_second: Optional[float] = None,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        drain_timeout_seconds: Optional[float] = None,
+    ) -> None:
+        super()._start_background_threads(
+            batch_linger_seconds,
+            heartbeat_visibility_timeout_seconds,
+            heartbeat_max_extension_seconds,
+            rate_limit_per_second,
+            concurrency_limiter,
+            drain_timeout_seconds,
+        )
+        self._task_executors = {
+            task_name: ThreadPoolExecutor(max_workers=options.max_concurrency, thread_name_prefix=task_name)
+            for task_name, options in self._handler_options.items()
+            if options.dedicated_pool
+        }
+
+    def _dedicated_pool_threads(self) -> int:
+        return sum(
+            options.max_concurrency or 0
+            for options in self._handler_options.values()
+            if options.dedicated_pool
+        )
+
+    def _wait_rate_limits(self, task_name: Optional[str], tasks: int) -> None:
+        task_rate_limiter = self._task_rate_limiters.get(task_name) if task_name is not None else None
+        if task_rate_limiter is not None:
+            task_rate_limiter.acquire(tasks)
+        super()._wait_rate_limits(task_name, tasks)
+
+    def _stop_background_threads(self) -> None:
+        for task_executor in self._task_executors.values():
+            task_executor.shutdown()
+        self._task_executors = {}
+        super()._stop_background_threads()
+
+    def _consume_message_batch_unless_draining(self, task_name: str, sqs_messages: list[dict]) -> None:
+        if not self._release_if_draining(sqs_messages):
+            self._consume_message_batch(task_name, sqs_messages)
+
+    def _consume_message_batch(self, task_name: str, sqs_messages: list[dict]) -> None:
+        batch_task_handler_function = self._batch_handlers[task_name]
+        tasks = []
+        idempotency_keys = []
+        for sqs_message in sqs_messages:
+            idempotency_key = None
+            if self.idempotency_key_function is None:
+                idempotency_key = self._idempotency_key(sqs_message, task_name, {})
+                if self._ack_if_task_completed(sqs_message, task_name, idempotency_key):
+                    continue
+            try:
+                message_data = self._decode_task_message(sqs_message)
+            except Exception:
+                logger.exception(
+                    f"Invalid message body, message_id={sqs_message['MessageId']}, task_name={task_name}"
+                )
+                self._record_task(task_name, "invalid")
+                self._message_nack(sqs_message)
+                continue
+            if self.idempotency_key_function is not None:
+                idempotency_key = self._idempotency_key(sqs_message, task_name, message_data["kwargs"])
+                if self._ack_if_task_completed(sqs_message, task_name, idempotency_key):
+                    continue
+            tasks.append({"sqs_message": sqs_message, "kwargs": message_data["kwargs"]})
+            idempotency_keys.append(idempotency_key)
+
+        if not tasks:
+            return
+
+        context = {"queue_url": self.url, "task_name": task_name}
+        try:
+            with self._handler_capacity(task_name, len(tasks)):
+                started_at = time.perf_counter()
+                outcomes = batch_task_handler_function(context, tasks)
+        except (Retry, NoRetry) as exc:
+            outcomes = [exc] * len(tasks)
+        except Exception as exc:
+            logger.exception(f"Error while processing batch, task_name={task_name}, tasks={len(tasks)}")
+            outcomes = [exc] * len(tasks)
+
+        if outcomes is None:
+            outcomes = [None] * len(tasks)
+        if not isinstance(outcomes, (list, tuple)):
+            logger.warning(
+                f"Batch task handler returned invalid outcomes, task_name={task_name}, tasks={len(tasks)}, "
+                f"outcomes_type={type(outcomes).__name__}"
+            )
+            outcomes = [Exception("Invalid outcomes")] * len(tasks)
+        elif len(outcomes) != len(tasks):
+            logger.warning(
+                f"Batch task handler returned an invalid number of outcomes, task_name={task_name}, "
+                f"tasks={len(tasks)}, outcomes={len(outcomes)}"
+            )
+            outcomes = [Exception("Invalid number of outcomes")] * len(tasks)
+        if self.metrics is not None:
+            self.metrics.observe(
+                "sqsx_batch_duration_seconds",
+                {"queue_url": self.url, "task_name": task_name},
+                time.perf_counter() - started_at,
+            )
+
+        for task, idempotency_key, outcome in zip(tasks, idempotency_keys, outcomes):
+            if outcome is None:
+                self._mark_task_completed(idempotency_key)
+            self._finish_task(task["sqs_message"], task_name, outcome)
+
+    def _finish_task(self, sqs_message: dict, task_name: str, outcome: Optional[Exception]) -> None:
+        message_id = sqs_message["MessageId"]
+        if outcome is None:
+            self._record_task(task_name, "success")
+            return self._message_ack(sqs_message)
+        if isinstance(outcome, Retry):
+            self._record_task(task_name, "retry")
+            logger.info(
+                f"Received an sqsx.Retry, setting a custom backoff policy, message_id={message_id}, task_name={task_name}"
+            )
+            return self._message_nack(
+                sqs_message,
+                min_backoff_seconds=outcome.min_backoff_seconds,
+                max_backoff_seconds=outcome.max_backoff_seconds,
+            )
+        if isinstance(outcome, NoRetry):
+            self._record_task(task_name, "no_retry")
+            logger.info(
+                f"Received an sqsx.NoRetry, removing the task, message_id={message_id}, task_name={task_name}"
+            )
+            return self._message_ack(sqs_message)
+        self._record_task(task_name, "error")
+        logger.warning(
+            f"Task failed in batch, message_id={message_id}, task_name={task_name}, error={outcome!r}"
+        )
+        return self._message_nack(sqs_message)
 
     def _consume_message(self, sqs_message: dict) -> None:
         message_id = sqs_message["MessageId"]
-        task_name_attribute = sqs_message["MessageAttributes"].get("TaskName")
+        task_name_attribute = sqs_message.get("MessageAttributes", {}).get("TaskName")
         if task_name_attribute is None:
             logger.warning(f"Message without TaskName attribute, message_id={message_id}")
+            self._record_task(None, "invalid")
             return self._message_nack(sqs_message)
 
         task_name = task_name_attribute["StringValue"]
         task_handler_function = self._handlers.get(task_name)
+        if task_handler_function is None and task_name in self._batch_handlers:
+            return self._consume_message_batch(task_name, [sqs_message])
         if task_handler_function is None:
             logger.warning(f"Task handler not found, message_id={message_id}, task_name={task_name}")
+            self._record_task(task_name, "invalid")
             return self._message_nack(sqs_message)
 
+        # keyed by the MessageId a duplicate is skipped before fetching its body, the first ack deleted its blob
+        idempotency_key = None
+        if self.idempotency_key_function is None:
+            idempotency_key = self._idempotency_key(sqs_message, task_name, {})
+            if self._ack_if_task_completed(sqs_message, task_name, idempotency_key):
+                return
+
         try:
-            message_data = base64_to_dict(sqs_message["Body"])
+            message_data = self._decode_task_message(sqs_message)
         except Exception:
             logger.exception(f"Invalid message body, message_id={message_id}, task_name={task_name}")
+            self._record_task(task_name, "invalid")
             return self._message_nack(sqs_message)
 
         kwargs = message_data["kwargs"]
-        context = {
-            "queue_url": self.url,
-            "task_name": task_name,
-            "sqs_message": sqs_message,
-        }
+        context: Mapping[str, Any]
+        if self.lean:
+            context = TaskContext(self.url, task_name, sqs_message)
+        else:
+            context = {
+                "queue_url": self.url,
+                "task_name": task_name,
+                "sqs_message": sqs_message,
+            }
+
+        if self.idempotency_key_function is not None:
+            idempotency_key = self._idempotency_key(sqs_message, task_name, kwargs)
+            if self._ack_if_task_completed(sqs_message, task_name, idempotency_key):
+                return
 
         try:
-            task_handler_function(context, **kwargs)
+            with self._handler_capacity(task_name):
+                started_at = time.perf_counter()
+                task_handler_function(context, **kwargs)
         except Retry as exc:
+            self._record_task(task_name, "retry", started_at)
             logger.info(
                 f"Received an sqsx.Retry, setting a custom backoff policy, message_id={message_id}, task_name={task_name}"
             )
@@ -150,40 +1107,139 @@ class Queue(BaseModel, BaseQueueMixin):
                 max_backoff_seconds=exc.max_backoff_seconds,
             )
         except NoRetry:
+            self._record_task(task_name, "no_retry", started_at)
             logger.info(
                 f"Received an sqsx.NoRetry, removing the task, message_id={message_id}, task_name={task_name}"
             )
             return self._message_ack(sqs_message)
         except Exception:
+            self._record_task(task_name, "error", started_at)
             logger.exception(f"Error while processing, message_id={message_id}, task_name={task_name}")
             return self._message_nack(sqs_message)
 
+        self._record_task(task_name, "success", started_at)
+        self._mark_task_completed(idempotency_key)
         self._message_ack(sqs_message)
 
+    def _idempotency_key(self, sqs_message: dict, task_name: str, task_kwargs: dict) -> Optional[str]:
+        if self.idempotency_store is None:
+            return None
+        if self.idempotency_key_function is not None:
+            idempotency_key = self.idempotency_key_function(task_name, task_kwargs)
+            if idempotency_key is not None:
+                return idempotency_key
+        return sqs_message["MessageId"]
+
+    def _ack_if_task_completed(
+        self, sqs_message: dict, task_name: str, idempotency_key: Optional[str]
+    ) -> bool:
+        if not self._is_task_completed(idempotency_key):
+            return False
+        logger.info(
+            f"Task already completed, removing the duplicated task, message_id={sqs_message['MessageId']}, "
+            f"task_name={task_name}, idempotency_key={idempotency_key}"
+        )
+        self._record_task(task_name, "duplicate")
+        self._message_ack(sqs_message)
+        return True
+
+    def _is_task_completed(self, idempotency_key: Optional[str]) -> bool:
+        if idempotency_key is None or self.idempotency_store is None:
+            return False
+        try:
+            return self.idempotency_store.is_completed(idempotency_key)
+        except Exception:
+            logger.exception(f"Error while checking the idempotency store, idempotency_key={idempotency_key}")
+            return False
+
+    def _mark_task_completed(self, idempotency_key: Optional[str]) -> None:
+        if idempotency_key is None or self.idempotency_store is None:
+            return
+        try:
+            self.idempotency_store.mark_completed(idempotency_key)
+        except Exception:
+            logger.exception(f"Error while updating the idempotency store, idempotency_key={idempotency_key}")
+
 
 class RawQueue(BaseModel, BaseQueueMixin):
     url: str = Field(pattern=queue_url_regex)
     message_handler_function: Callable
-    sqs_client: Any
+    sqs_client: Any = Field(default=None)
+    sqs_client_factory: Optional[SQSClientFactory] = Field(default=None)
+    dedicated_sqs_clients: bool = Field(default=False)
     min_backoff_seconds: int = Field(default=30)
     max_backoff_seconds: int = Field(default=900)
+    message_group_id_function: Optional[Callable[[str, dict], str]] = Field(default=None)
+    message_deduplication_id_function: Optional[Callable[[str, dict], str]] = Field(default=None)
+    metrics: Optional[Metrics] = Field(default=None)
+    lean: bool = Field(default=False)
+    attribute_names: list[str] = Field(default_factory=list)
+    message_attribute_names: list[str] = Field(default_factory=list)
     _should_consume_tasks_stop: bool = PrivateAttr(default=False)
+    _ack_batcher: Optional[DeleteMessageBatcher] = PrivateAttr(default=None)
+    _nack_batcher: Optional[ChangeMessageVisibilityBatcher] = PrivateAttr(default=None)
+    _batcher_sqs_client: Any = PrivateAttr(default=None)
+    _heartbeat: Optional[VisibilityHeartbeat] = PrivateAttr(default=None)
+    _message_group_limiter: MessageGroupLimiter = PrivateAttr(default_factory=MessageGroupLimiter)
+    _consume_state: threading.local = PrivateAttr(default_factory=threading.local)
+    _rate_limiter: Optional[TokenBucket] = PrivateAttr(default=None)
+    _concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = PrivateAttr(default=None)
+    _drain: Optional[MessageDrain] = PrivateAttr(default=None)
+    _messages_done_callback: Optional[Callable[[int], None]] = PrivateAttr(default=None)
 
-    def add_message(self, message_body: str, message_attributes: Optional[dict] = None) -> dict:
-        if message_attributes is None:
-            message_attributes = {}
-        return self.sqs_client.send_message(
-            QueueUrl=self.url,
-            MessageAttributes=message_attributes,
-            MessageBody=message_body,
+    @model_validator(mode="after")
+    def check_sqs_client(self) -> "RawQueue":
+        self._create_sqs_client()
+        return self
+
+    def add_message(
+        self,
+        message_body: str,
+        message_attributes: Optional[dict] = None,
+        message_group_id: Optional[str] = None,
+        message_deduplication_id: Optional[str] = None,
+    ) -> dict:
+        entry = self._message_entry(message_body, message_attributes)
+        if message_group_id is not None:
+            entry["MessageGroupId"] = message_group_id
+        if message_deduplication_id is not None:
+            entry["MessageDeduplicationId"] = message_deduplication_id
+        return self.sqs_client.send_message(QueueUrl=self.url, **entry)
+
+    def add_messages(
+        self, messages: Iterable[tuple[str, Optional[dict]]], max_threads: int = 1, max_retries: int = 3
+    ) -> list[SendMessageResult]:
+        entries = (
+            self._message_entry(message_body, message_attributes)
+            for message_body, message_attributes in messages
         )
+        return self._send_messages(entries, max_threads=max_threads, max_retries=max_retries)
+
+    def _message_entry(self, message_body: str, message_attributes: Optional[dict] = None) -> dict:
+        message_attributes = message_attributes or {}
+        entry = {"MessageAttributes": message_attributes, "MessageBody": message_body}
+        if self.fifo:
+            entry["MessageGroupId"] = (
+                self.message_group_id_function(message_body, message_attributes)
+                if self.message_group_id_function is not None
+                else "default"
+            )
+            entry["MessageDeduplicationId"] = (
+                self.message_deduplication_id_function(message_body, message_attributes)
+                if self.message_deduplication_id_function is not None
+                else deduplication_id([message_body, message_attributes])
+            )
+        return entry
 
     def _consume_message(self, sqs_message: dict) -> None:
         message_id = sqs_message["MessageId"]
 
         try:
-            self.message_handler_function(self.url, sqs_message)
+            with self._handler_capacity(None):
+                started_at = time.perf_counter()
+                self.message_handler_function(self.url, Message(sqs_message) if self.lean else sqs_message)
         except Retry as exc:
+            self._record_task(None, "retry", started_at)
             logger.info(f"Received an sqsx.Retry, setting a custom backoff policy, message_id={message_id}")
             return self._message_nack(
                 sqs_message,
@@ -191,10 +1247,13 @@ class RawQueue(BaseModel, BaseQueueMixin):
                 max_backoff_seconds=exc.max_backoff_seconds,
             )
         except NoRetry:
+            self._record_task(None, "no_retry", started_at)
             logger.info(f"Received an sqsx.NoRetry, removing the message, message_id={message_id}")
             return self._message_ack(sqs_message)
         except Exception:
+            self._record_task(None, "error", started_at)
             logger.exception(f"Error while processing, message_id={message_id}")
             return self._message_nack(sqs_message)
 
+        self._record_task(None, "success", started_at)
         self._message_ack(sqs_message)
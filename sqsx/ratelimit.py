@@ -0,0 +1,126 @@
+import logging
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket allowing rate_per_second acquisitions with bursts of up to burst tokens
+    """
+
+    def __init__(self, rate_per_second: float, burst: Optional[float] = None):
+        if rate_per_second <= 0:
+            raise ValueError("rate_per_second must be greater than zero")
+        self.rate_per_second = rate_per_second
+        self.burst = burst if burst is not None else max(rate_per_second, 1)
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        # more tokens than the burst are taken as a debt paid by the next acquisitions
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate_per_second)
+                self._updated_at = now
+                required_tokens = min(tokens, self.burst)
+                if self._tokens >= required_tokens:
+                    self._tokens -= tokens
+                    return True
+                wait_seconds = (required_tokens - self._tokens) / self.rate_per_second
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait_seconds = min(wait_seconds, remaining)
+            time.sleep(wait_seconds)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Thread safe AIMD controller of how many handlers run at the same time, the limit grows by one after each
+    healthy window of window_size calls and is multiplied by decrease_ratio when the window has more errors
+    than max_error_rate or an average latency above target_latency_seconds
+    """
+
+    def __init__(
+        self,
+        max_limit: int,
+        min_limit: int = 1,
+        initial_limit: Optional[int] = None,
+        target_latency_seconds: Optional[float] = None,
+        max_error_rate: float = 0.1,
+        decrease_ratio: float = 0.5,
+        window_size: int = 20,
+    ):
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError("min_limit must be between 1 and max_limit")
+        if not 0 < decrease_ratio < 1:
+            raise ValueError("decrease_ratio must be between 0 and 1")
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.target_latency_seconds = target_latency_seconds
+        self.max_error_rate = max_error_rate
+        self.decrease_ratio = decrease_ratio
+        self.window_size = window_size
+        self._limit = float(initial_limit if initial_limit is not None else max_limit)
+        self._running = 0
+        self._calls = 0
+        self._errors = 0
+        self._total_latency_seconds = 0.0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._running < int(self._limit), timeout=timeout):
+                return False
+            self._running += 1
+            return True
+
+    def release(self) -> None:
+        with self._condition:
+            self._running -= 1
+            self._condition.notify_all()
+
+    def record(self, latency_seconds: float, failed: bool) -> None:
+        with self._condition:
+            self._calls += 1
+            self._errors += failed
+            self._total_latency_seconds += latency_seconds
+            if self._calls < self.window_size:
+                return
+
+            error_rate = self._errors / self._calls
+            average_latency_seconds = self._total_latency_seconds / self._calls
+            self._calls = 0
+            self._errors = 0
+            self._total_latency_seconds = 0.0
+            previous_limit = int(self._limit)
+            if error_rate > self.max_error_rate or (
+                self.target_latency_seconds is not None
+                and average_latency_seconds > self.target_latency_seconds
+            ):
+                self._limit = max(self.min_limit, self._limit * self.decrease_ratio)
+            else:
+                self._limit = min(self.max_limit, self._limit + 1)
+                self._condition.notify_all()
+            limit = int(self._limit)
+
+        if limit != previous_limit:
+            logger.info(
+                f"Concurrency limit changed, limit={limit}, previous_limit={previous_limit}, "
+                f"error_rate={error_rate:.2f}, average_latency_seconds={average_latency_seconds:.3f}"
+            )
@@ -0,0 +1,140 @@
+import hashlib
+import itertools
+import logging
+import threading
+import time
+from collections.abc import Iterable
+from typing import Any, Callable, Literal, Optional
+
+from pydantic import BaseModel, Field, model_validator, PrivateAttr
+
+from sqsx.consumer import MultiQueueConsumer
+from sqsx.helper import error_code
+from sqsx.queue import Queue, SendMessageResult
+
+logger = logging.getLogger(__name__)
+THROTTLING_ERROR_CODES = frozenset(["RequestThrottled", "ThrottlingException", "Throttling", "KmsThrottled"])
+
+
+class ShardedQueue(BaseModel):
+    """
+    Spread the tasks over many queues (shards) and consume all of them with a shared pool of workers
+    """
+
+    queues: list[Queue] = Field(min_length=1)
+    strategy: Literal["round_robin", "hash", "least_throttled"] = Field(default="round_robin")
+    routing_key_function: Optional[Callable[[str, dict], str]] = Field(default=None)
+    # None fails over with every strategy but hash, where it would move the routing keys to other shards
+    failover: Optional[bool] = Field(default=None)
+    throttle_cooldown_seconds: float = Field(default=1, ge=0)
+    _throttled_at: list[float] = PrivateAttr(default_factory=list)
+    _counter: Any = PrivateAttr(default_factory=itertools.count)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _consumer: Optional[MultiQueueConsumer] = PrivateAttr(default=None)
+
+    @model_validator(mode="after")
+    def check_failover(self) -> "ShardedQueue":
+        if self.strategy == "hash" and self.failover and any(queue.fifo for queue in self.queues):
+            raise ValueError("failover can't be used with the hash strategy on FIFO shards")
+        return self
+
+    def model_post_init(self, __context) -> None:
+        self._throttled_at = [float("-inf")] * len(self.queues)
+
+    def add_task(self, task_name: str, **task_kwargs) -> dict:
+        shard_indexes = self._shard_indexes(task_name, task_kwargs)
+        for shard_index in shard_indexes[:-1]:
+            try:
+                return self.queues[shard_index].add_task(task_name, **task_kwargs)
+            except Exception as exc:
+                if error_code(exc) not in THROTTLING_ERROR_CODES:
+                    raise
+                self._mark_throttled(shard_index)
+        return self.queues[shard_indexes[-1]].add_task(task_name, **task_kwargs)
+
+    def add_tasks(
+        self, tasks: Iterable[tuple[str, dict]], max_threads: int = 1, max_retries: int = 3
+    ) -> list[SendMessageResult]:
+        pending_tasks = [
+            (index, task_name, task_kwargs, self._shard_indexes(task_name, task_kwargs))
+            for index, (task_name, task_kwargs) in enumerate(tasks)
+        ]
+        results = []
+        while pending_tasks:
+            tasks_by_shard: dict[int, list[tuple]] = {}
+            for pending_task in pending_tasks:
+                tasks_by_shard.setdefault(pending_task[3][0], []).append(pending_task)
+
+            pending_tasks = []
+            for shard_index, shard_tasks in tasks_by_shard.items():
+                shard_results = self.queues[shard_index].add_tasks(
+                    [(task_name, task_kwargs) for _, task_name, task_kwargs, _ in shard_tasks],
+                    max_threads=max_threads,
+                    max_retries=max_retries,
+                )
+                throttled = False
+                for result in shard_results:
+                    index, task_name, task_kwargs, shard_indexes = shard_tasks[result.index]
+                    if result.error_code in THROTTLING_ERROR_CODES and len(shard_indexes) > 1:
+                        throttled = True
+                        pending_tasks.append((index, task_name, task_kwargs, shard_indexes[1:]))
+                        continue
+                    results.append(result.model_copy(update={"index": index}))
+                if throttled:
+                    self._mark_throttled(shard_index)
+
+        return sorted(results, key=lambda result: result.index)
+
+    def add_task_handler(self, task_name: str, task_handler_function: Callable, **options) -> None:
+        for queue in self.queues:
+            queue.add_task_handler(task_name, task_handler_function, **options)
+
+    def add_batch_task_handler(self, task_name: str, batch_task_handler_function: Callable) -> None:
+        for queue in self.queues:
+            queue.add_batch_task_handler(task_name, batch_task_handler_function)
+
+    def consume_messages(self, **consume_messages_kwargs) -> None:
+        self._consumer = MultiQueueConsumer(queues=self.queues)
+        self._consumer.consume_messages(**consume_messages_kwargs)
+
+    def exit_gracefully(self) -> None:
+        if self._consumer is not None:
+            self._consumer.exit_gracefully()
+
+    def _shard_indexes(self, task_name: str, task_kwargs: dict) -> list[int]:
+        # the preferred shard first, followed by the failover ones with the throttled shards at the end
+        if self.strategy == "hash":
+            routing_key = (
+                self.routing_key_function(task_name, task_kwargs)
+                if self.routing_key_function is not None
+                else task_name
+            )
+            shard_indexes = sorted(
+                range(len(self.queues)),
+                key=lambda shard_index: self._rendezvous_score(routing_key, shard_index),
+                reverse=True,
+            )
+        else:
+            start = next(self._counter) % len(self.queues)
+            shard_indexes = [(start + offset) % len(self.queues) for offset in range(len(self.queues))]
+            if self.strategy == "least_throttled":
+                shard_indexes.sort(key=lambda shard_index: self._throttled_at[shard_index])
+
+        failover = self.failover if self.failover is not None else self.strategy != "hash"
+        if not failover:
+            return shard_indexes[:1]
+        throttled_since = time.monotonic() - self.throttle_cooldown_seconds
+        return sorted(
+            shard_indexes, key=lambda shard_index: self._throttled_at[shard_index] > throttled_since
+        )
+
+    def _rendezvous_score(self, routing_key: str, shard_index: int) -> int:
+        digest = hashlib.sha256(f"{routing_key}:{self.queues[shard_index].url}".encode()).digest()
+        return int.from_bytes(digest[:8], "big")
+
+    def _mark_throttled(self, shard_index: int) -> None:
+        logger.warning(
+            f"Shard throttled, failing over to the next shard, queue_url={self.queues[shard_index].url}"
+        )
+        with self._lock:
+            self._throttled_at[shard_index] = time.monotonic()
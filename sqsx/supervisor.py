@@ -0,0 +1,108 @@
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from multiprocessing.process import BaseProcess
+from types import FrameType
+from typing import Any, Callable, Optional
+
+from pydantic import BaseModel, Field, PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+
+class TaskCounter:
+    """
+    Count the messages a worker finished, from all its threads, and stop the queue after max_tasks
+    """
+
+    def __init__(self, queue: Any, max_tasks: int):
+        self.queue = queue
+        self.max_tasks = max_tasks
+        self.consumed_tasks = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, tasks: int) -> None:
+        with self._lock:
+            self.consumed_tasks += tasks
+            max_tasks_reached = self.consumed_tasks >= self.max_tasks
+        if max_tasks_reached:
+            self.queue.exit_gracefully()
+
+
+def run_worker(queue_factory: Callable, consume_messages_kwargs: dict, max_tasks: Optional[int]) -> None:
+    # a forked worker inherits the handlers of the supervisor until consume_messages installs its own
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    queue = queue_factory()
+    if max_tasks is not None:
+        queue._messages_done_callback = TaskCounter(queue, max_tasks)
+    queue.consume_messages(**consume_messages_kwargs)
+
+
+class Supervisor(BaseModel):
+    queue_factory: Callable
+    workers: int = Field(default_factory=lambda: os.cpu_count() or 1, gt=0)
+    max_tasks_per_worker: Optional[int] = Field(default=None, gt=0)
+    consume_messages_kwargs: dict = Field(default_factory=dict)
+    check_interval_seconds: float = Field(default=1)
+    restart_delay_seconds: float = Field(default=1)
+    _processes: list[Optional[BaseProcess]] = PrivateAttr(default=[])
+    _should_stop: bool = PrivateAttr(default=False)
+
+    def run(self, enable_signal_to_exit_gracefully: bool = True) -> None:
+        logger.info(f"Starting supervisor, workers={self.workers}")
+
+        if enable_signal_to_exit_gracefully:
+            signal.signal(signal.SIGINT, self._exit_gracefully_from_signal)
+            signal.signal(signal.SIGTERM, self._exit_gracefully_from_signal)
+
+        self._processes = [None] * self.workers
+        while not self._should_stop:
+            for index, process in enumerate(self._processes):
+                if process is not None and process.is_alive():
+                    continue
+                if process is not None:
+                    if process.exitcode == 0:
+                        logger.info(f"Worker finished, starting a new one, pid={process.pid}")
+                    else:
+                        logger.warning(
+                            f"Worker crashed, starting a new one, pid={process.pid}, exitcode={process.exitcode}"
+                        )
+                        time.sleep(self.restart_delay_seconds)
+                    if self._should_stop:
+                        break
+                self._processes[index] = self._start_worker()
+            time.sleep(self.check_interval_seconds)
+
+        self._terminate_workers()
+        for process in self._processes:
+            if process is not None:
+                process.join()
+
+        logger.info("Stopping supervisor")
+
+    def exit_gracefully(self) -> None:
+        logger.info("Starting graceful shutdown process, forwarding SIGTERM to the workers")
+        self._should_stop = True
+        self._terminate_workers()
+
+    def _terminate_workers(self) -> None:
+        for process in self._processes:
+            if process is not None and process.is_alive() and process.pid is not None:
+                os.kill(process.pid, signal.SIGTERM)
+
+    def _exit_gracefully_from_signal(self, signal: int, frame: Optional[FrameType]):
+        self.exit_gracefully()
+
+    def _start_worker(self) -> BaseProcess:
+        consume_messages_kwargs = {**self.consume_messages_kwargs, "enable_signal_to_exit_gracefully": True}
+        process = multiprocessing.get_context().Process(
+            target=run_worker,
+            args=(self.queue_factory, consume_messages_kwargs, self.max_tasks_per_worker),
+        )
+        process.start()
+        logger.info(f"Worker started, pid={process.pid}")
+        return process
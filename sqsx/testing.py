@@ -0,0 +1,376 @@
+import hashlib
+import struct
+import threading
+import time
+import uuid
+from typing import Any, Callable, Optional, Union
+
+from botocore.exceptions import ClientError  # type: ignore
+
+from sqsx.helper import MAX_BATCH_ENTRIES, MAX_BATCH_PAYLOAD_BYTES, message_entry_size
+
+
+def md5_of_message_attributes(message_attributes: dict) -> str:
+    def encode(value: bytes) -> bytes:
+        return struct.pack("!I", len(value)) + value
+
+    payload = b""
+    for name, attribute in sorted(message_attributes.items()):
+        payload += encode(name.encode()) + encode(attribute["DataType"].encode())
+        if "BinaryValue" in attribute:
+            payload += b"\x02" + encode(attribute["BinaryValue"])
+        else:
+            payload += b"\x01" + encode(attribute["StringValue"].encode())
+    return hashlib.md5(payload).hexdigest()
+
+
+class FakeQueue:
+    def __init__(self, url: str, attributes: dict):
+        self.url = url
+        self.attributes = attributes
+        self.fifo = attributes.get("FifoQueue") == "true"
+        self.visibility_timeout = int(attributes.get("VisibilityTimeout", 30))
+        self.messages: dict[str, dict] = {}
+        self.deduplication_ids: dict[str, float] = {}
+        self.sequence_number = 0
+
+
+class FakeSQSClient:
+    """
+    In-process stand-in for the boto3 SQS client, with visibility timeouts, receive counts, long polling and FIFO queues
+    """
+
+    def __init__(
+        self,
+        latency_seconds: Union[float, Callable[[], float]] = 0,
+        endpoint_url: str = "http://localhost:9324",
+        account_id: str = "000000000000",
+    ):
+        self.latency_seconds = latency_seconds
+        self.endpoint_url = endpoint_url
+        self.account_id = account_id
+        self._queues: dict[str, FakeQueue] = {}
+        self._condition = threading.Condition()
+
+    def create_queue(self, QueueName: str, Attributes: Optional[dict] = None, **kwargs) -> dict:
+        self._wait_latency()
+        attributes = dict(Attributes or {})
+        if QueueName.endswith(".fifo"):
+            attributes.setdefault("FifoQueue", "true")
+        url = f"{self.endpoint_url}/{self.account_id}/{QueueName}"
+        with self._condition:
+            if url not in self._queues:
+                self._queues[url] = FakeQueue(url, attributes)
+        return self._response({"QueueUrl": url})
+
+    def get_queue_url(self, QueueName: str, **kwargs) -> dict:
+        self._wait_latency()
+        url = f"{self.endpoint_url}/{self.account_id}/{QueueName}"
+        self._get_queue(url, "GetQueueUrl")
+        return self._response({"QueueUrl": url})
+
+    def delete_queue(self, QueueUrl: str) -> dict:
+        self._wait_latency()
+        with self._condition:
+            self._get_queue(QueueUrl, "DeleteQueue")
+            del self._queues[QueueUrl]
+            self._condition.notify_all()
+        return self._response({})
+
+    def purge_queue(self, QueueUrl: str) -> dict:
+        self._wait_latency()
+        with self._condition:
+            self._get_queue(QueueUrl, "PurgeQueue").messages.clear()
+        return self._response({})
+
+    def get_queue_attributes(self, QueueUrl: str, AttributeNames: Optional[list] = None) -> dict:
+        self._wait_latency()
+        now = time.monotonic()
+        with self._condition:
+            queue = self._get_queue(QueueUrl, "GetQueueAttributes")
+            visible = sum(1 for message in queue.messages.values() if message["visible_at"] <= now)
+            attributes = {
+                **queue.attributes,
+                "ApproximateNumberOfMessages": str(visible),
+                "ApproximateNumberOfMessagesNotVisible": str(len(queue.messages) - visible),
+                "VisibilityTimeout": str(queue.visibility_timeout),
+            }
+        if AttributeNames and "All" not in AttributeNames:
+            attributes = {name: value for name, value in attributes.items() if name in AttributeNames}
+        return self._response({"Attributes": attributes})
+
+    def send_message(self, QueueUrl: str, MessageBody: str, **kwargs) -> dict:
+        self._wait_latency()
+        with self._condition:
+            queue = self._get_queue(QueueUrl, "SendMessage")
+            return self._response(self._send(queue, {"MessageBody": MessageBody, **kwargs}, "SendMessage"))
+
+    def send_message_batch(self, QueueUrl: str, Entries: list[dict]) -> dict:
+        self._wait_latency()
+        self._check_batch(Entries, "SendMessageBatch")
+        if sum(message_entry_size(entry) for entry in Entries) > MAX_BATCH_PAYLOAD_BYTES:
+            raise self._error(
+                "BatchRequestTooLong", "Batch requests cannot be longer than 262144 bytes", "SendMessageBatch"
+            )
+
+        successful, failed = [], []
+        with self._condition:
+            queue = self._get_queue(QueueUrl, "SendMessageBatch")
+            for entry in Entries:
+                try:
+                    result = self._send(queue, entry, "SendMessageBatch")
+                except ClientError as exc:
+                    failed.append({"Id": entry["Id"], "SenderFault": True, **self._error_details(exc)})
+                else:
+                    successful.append({"Id": entry["Id"], **result})
+        return self._response({"Successful": successful, "Failed": failed})
+
+    def receive_message(
+        self,
+        QueueUrl: str,
+        MaxNumberOfMessages: int = 1,
+        WaitTimeSeconds: int = 0,
+        VisibilityTimeout: Optional[int] = None,
+        AttributeNames: Optional[list] = None,
+        MessageAttributeNames: Optional[list] = None,
+        **kwargs,
+    ) -> dict:
+        self._wait_latency()
+        deadline = time.monotonic() + WaitTimeSeconds
+        with self._condition:
+            while True:
+                queue = self._get_queue(QueueUrl, "ReceiveMessage")
+                now = time.monotonic()
+                messages = self._receive(queue, now, MaxNumberOfMessages, VisibilityTimeout)
+                if messages or now >= deadline:
+                    break
+                self._condition.wait(min(deadline - now, self._next_visible_seconds(queue, now)))
+
+        response_messages = [
+            self._message_response(message, AttributeNames, MessageAttributeNames) for message in messages
+        ]
+        return self._response({"Messages": response_messages} if response_messages else {})
+
+    def delete_message(self, QueueUrl: str, ReceiptHandle: str) -> dict:
+        self._wait_latency()
+        with self._condition:
+            queue = self._get_queue(QueueUrl, "DeleteMessage")
+            self._delete(queue, ReceiptHandle)
+            self._condition.notify_all()
+        return self._response({})
+
+    def delete_message_batch(self, QueueUrl: str, Entries: list[dict]) -> dict:
+        self._wait_latency()
+        self._check_batch(Entries, "DeleteMessageBatch")
+        with self._condition:
+            queue = self._get_queue(QueueUrl, "DeleteMessageBatch")
+            for entry in Entries:
+                self._delete(queue, entry["ReceiptHandle"])
+            self._condition.notify_all()
+        return self._response({"Successful": [{"Id": entry["Id"]} for entry in Entries], "Failed": []})
+
+    def change_message_visibility(self, QueueUrl: str, ReceiptHandle: str, VisibilityTimeout: int) -> dict:
+        self._wait_latency()
+        with self._condition:
+            queue = self._get_queue(QueueUrl, "ChangeMessageVisibility")
+            self._change_visibility(queue, ReceiptHandle, VisibilityTimeout, "ChangeMessageVisibility")
+            self._condition.notify_all()
+        return self._response({})
+
+    def change_message_visibility_batch(self, QueueUrl: str, Entries: list[dict]) -> dict:
+        self._wait_latency()
+        self._check_batch(Entries, "ChangeMessageVisibilityBatch")
+        successful, failed = [], []
+        with self._condition:
+            queue = self._get_queue(QueueUrl, "ChangeMessageVisibilityBatch")
+            for entry in Entries:
+                try:
+                    self._change_visibility(
+                        queue,
+                        entry["ReceiptHandle"],
+                        entry["VisibilityTimeout"],
+                        "ChangeMessageVisibilityBatch",
+                    )
+                except ClientError as exc:
+                    failed.append({"Id": entry["Id"], "SenderFault": True, **self._error_details(exc)})
+                else:
+                    successful.append({"Id": entry["Id"]})
+            self._condition.notify_all()
+        return self._response({"Successful": successful, "Failed": failed})
+
+    def _response(self, response: dict) -> dict:
+        return {**response, "ResponseMetadata": {"HTTPStatusCode": 200}}
+
+    def _wait_latency(self) -> None:
+        latency_seconds = self.latency_seconds() if callable(self.latency_seconds) else self.latency_seconds
+        if latency_seconds > 0:
+            time.sleep(latency_seconds)
+
+    def _get_queue(self, url: str, operation_name: str) -> FakeQueue:
+        queue = self._queues.get(url)
+        if queue is None:
+            raise self._error(
+                "AWS.SimpleQueueService.NonExistentQueue",
+                "The specified queue does not exist.",
+                operation_name,
+            )
+        return queue
+
+    def _send(self, queue: FakeQueue, entry: dict, operation_name: str) -> dict:
+        if message_entry_size(entry) > MAX_BATCH_PAYLOAD_BYTES:
+            raise self._error(
+                "InvalidParameterValue", "Message must be shorter than 262144 bytes.", operation_name
+            )
+
+        now = time.monotonic()
+        message_id = str(uuid.uuid4())
+        md5_of_body = hashlib.md5(entry["MessageBody"].encode()).hexdigest()
+        message: dict[str, Any] = {
+            "MessageId": message_id,
+            "Body": entry["MessageBody"],
+            "MD5OfBody": md5_of_body,
+            "MessageAttributes": entry.get("MessageAttributes") or {},
+            "SentTimestamp": str(int(time.time() * 1000)),
+            "ReceiveCount": 0,
+            "FirstReceiveTimestamp": None,
+            "ReceiptHandle": None,
+            "visible_at": now + entry.get("DelaySeconds", 0),
+        }
+        result = {"MessageId": message_id, "MD5OfMessageBody": md5_of_body}
+        if message["MessageAttributes"]:
+            message["MD5OfMessageAttributes"] = md5_of_message_attributes(message["MessageAttributes"])
+            result["MD5OfMessageAttributes"] = message["MD5OfMessageAttributes"]
+
+        if queue.fifo:
+            if "MessageGroupId" not in entry:
+                raise self._error(
+                    "MissingParameter",
+                    "The request must contain the parameter MessageGroupId.",
+                    operation_name,
+                )
+            deduplication_id = entry.get("MessageDeduplicationId")
+            if deduplication_id is None:
+                if queue.attributes.get("ContentBasedDeduplication") != "true":
+                    raise self._error(
+                        "InvalidParameterValue",
+                        "The queue should either have ContentBasedDeduplication enabled or MessageDeduplicationId provided explicitly",
+                        operation_name,
+                    )
+                deduplication_id = hashlib.sha256(entry["MessageBody"].encode()).hexdigest()
+            queue.deduplication_ids = {
+                key: expires_at for key, expires_at in queue.deduplication_ids.items() if expires_at > now
+            }
+            if deduplication_id in queue.deduplication_ids:
+                return result
+            queue.deduplication_ids[deduplication_id] = now + 300
+            queue.sequence_number += 1
+            message["MessageGroupId"] = entry["MessageGroupId"]
+            message["MessageDeduplicationId"] = deduplication_id
+            message["SequenceNumber"] = str(queue.sequence_number)
+            result["SequenceNumber"] = message["SequenceNumber"]
+
+        queue.messages[message_id] = message
+        self._condition.notify_all()
+        return result
+
+    def _receive(
+        self, queue: FakeQueue, now: float, max_number_of_messages: int, visibility_timeout: Optional[int]
+    ) -> list[dict]:
+        messages: list[dict] = []
+        blocked_message_group_ids = set()
+        for message in queue.messages.values():
+            if len(messages) >= max_number_of_messages:
+                break
+            message_group_id = message.get("MessageGroupId")
+            if message_group_id in blocked_message_group_ids:
+                continue
+            if message["visible_at"] > now:
+                if queue.fifo:
+                    blocked_message_group_ids.add(message_group_id)
+                continue
+
+            message["ReceiveCount"] += 1
+            if message["FirstReceiveTimestamp"] is None:
+                message["FirstReceiveTimestamp"] = str(int(time.time() * 1000))
+            message["ReceiptHandle"] = f"{message['MessageId']}#{uuid.uuid4()}"
+            message["visible_at"] = now + (
+                visibility_timeout if visibility_timeout is not None else queue.visibility_timeout
+            )
+            messages.append(dict(message))
+        return messages
+
+    def _message_response(
+        self, message: dict, attribute_names: Optional[list], message_attribute_names: Optional[list]
+    ) -> dict:
+        response = {
+            "MessageId": message["MessageId"],
+            "ReceiptHandle": message["ReceiptHandle"],
+            "MD5OfBody": message["MD5OfBody"],
+            "Body": message["Body"],
+        }
+        if "MD5OfMessageAttributes" in message:
+            response["MD5OfMessageAttributes"] = message["MD5OfMessageAttributes"]
+        if attribute_names:
+            attributes = {
+                "SenderId": "127.0.0.1",
+                "SentTimestamp": message["SentTimestamp"],
+                "ApproximateReceiveCount": str(message["ReceiveCount"]),
+                "ApproximateFirstReceiveTimestamp": message["FirstReceiveTimestamp"],
+            }
+            for name in ("MessageGroupId", "MessageDeduplicationId", "SequenceNumber"):
+                if name in message:
+                    attributes[name] = message[name]
+            if "All" not in attribute_names:
+                attributes = {name: value for name, value in attributes.items() if name in attribute_names}
+            response["Attributes"] = attributes
+        message_attributes = {
+            name: value
+            for name, value in message["MessageAttributes"].items()
+            if message_attribute_names
+            and ("All" in message_attribute_names or name in message_attribute_names)
+        }
+        if message_attributes:
+            response["MessageAttributes"] = message_attributes
+        return response
+
+    def _delete(self, queue: FakeQueue, receipt_handle: str) -> None:
+        message_id = receipt_handle.split("#", 1)[0]
+        queue.messages.pop(message_id, None)
+
+    def _change_visibility(
+        self, queue: FakeQueue, receipt_handle: str, visibility_timeout: int, operation_name: str
+    ) -> None:
+        message = queue.messages.get(receipt_handle.split("#", 1)[0])
+        if message is None or message["ReceiptHandle"] != receipt_handle:
+            raise self._error(
+                "ReceiptHandleIsInvalid",
+                f"The input receipt handle {receipt_handle} is not valid.",
+                operation_name,
+            )
+        message["visible_at"] = time.monotonic() + visibility_timeout
+
+    def _next_visible_seconds(self, queue: FakeQueue, now: float) -> float:
+        visible_ats = [
+            message["visible_at"] for message in queue.messages.values() if message["visible_at"] > now
+        ]
+        return max(min(visible_ats) - now, 0.001) if visible_ats else 1
+
+    def _check_batch(self, entries: list[dict], operation_name: str) -> None:
+        if not entries:
+            raise self._error(
+                "AWS.SimpleQueueService.EmptyBatchRequest",
+                "There should be at least one entry in the request.",
+                operation_name,
+            )
+        if len(entries) > MAX_BATCH_ENTRIES:
+            raise self._error(
+                "AWS.SimpleQueueService.TooManyEntriesInBatchRequest",
+                f"Maximum number of entries per request are {MAX_BATCH_ENTRIES}.",
+                operation_name,
+            )
+
+    def _error(self, code: str, message: str, operation_name: str) -> ClientError:
+        return ClientError({"Error": {"Code": code, "Message": message}}, operation_name)
+
+    def _error_details(self, exc: ClientError) -> dict:
+        return {"Code": exc.response["Error"]["Code"], "Message": exc.response["Error"]["Message"]}
@@ -1,11 +1,16 @@
+import os
+
 import boto3
 import pytest
 
 from sqsx.queue import Queue, RawQueue
+from sqsx.testing import FakeSQSClient
 
 
 @pytest.fixture
 def sqs_client():
+    if os.environ.get("SQSX_FAKE_SQS"):
+        return FakeSQSClient()
     return boto3.client(
         "sqs",
         endpoint_url="http://localhost:9324",
@@ -0,0 +1,210 @@
+import asyncio
+import os
+import signal
+from unittest import mock
+
+import pytest
+
+from sqsx.async_queue import AsyncQueue, AsyncRawQueue
+from sqsx.exceptions import NoRetry, Retry
+
+
+class AsyncSQSClient:
+    def __init__(self, sqs_client):
+        self.sqs_client = sqs_client
+
+    def __getattr__(self, name):
+        method = getattr(self.sqs_client, name)
+
+        async def async_method(**kwargs):
+            return await asyncio.to_thread(method, **kwargs)
+
+        return async_method
+
+
+class SumHandler:
+    result_sum = 0
+    concurrency = 0
+    max_concurrency = 0
+
+    async def __call__(self, context, a, b, c):
+        self.concurrency += 1
+        self.max_concurrency = max(self.max_concurrency, self.concurrency)
+        await asyncio.sleep(0.05)
+        self.concurrency -= 1
+        self.result_sum += a + b + c
+
+
+async def exception_handler(context, a, b, c):
+    raise Exception("BOOM!")
+
+
+async def retry_exception_handler(context, a, b, c):
+    raise Retry(min_backoff_seconds=100, max_backoff_seconds=200)
+
+
+async def no_retry_exception_handler(context, a, b, c):
+    raise NoRetry()
+
+
+@pytest.fixture
+def async_queue(sqs_client, queue_url, caplog):
+    caplog.set_level("INFO")
+    sqs_client.create_queue(QueueName=queue_url.split("/")[-1])
+    yield AsyncQueue(url=queue_url, sqs_client=AsyncSQSClient(sqs_client))
+    sqs_client.delete_queue(QueueUrl=queue_url)
+
+
+@pytest.fixture
+def async_raw_queue(sqs_client, raw_queue_url, caplog):
+    async def message_handler_function(queue_url, sqs_message):
+        print(f"queue_url={queue_url}, sqs_message={sqs_message}")
+
+    caplog.set_level("INFO")
+    sqs_client.create_queue(QueueName=raw_queue_url.split("/")[-1])
+    yield AsyncRawQueue(
+        url=raw_queue_url,
+        message_handler_function=message_handler_function,
+        sqs_client=AsyncSQSClient(sqs_client),
+    )
+    sqs_client.delete_queue(QueueUrl=raw_queue_url)
+
+
+def test_async_queue_consume_messages(async_queue):
+    handler = SumHandler()
+    async_queue.add_task_handler("my_task", handler)
+
+    async def run():
+        for _ in range(5):
+            await async_queue.add_task("my_task", a=1, b=2, c=3)
+        await async_queue.consume_messages(
+            max_messages=5, max_concurrency=5, run_forever=False, enable_signal_to_exit_gracefully=False
+        )
+
+    asyncio.run(run())
+
+    assert handler.result_sum == 30
+    assert handler.max_concurrency > 1
+
+
+def test_async_queue_consume_messages_with_max_concurrency(async_queue, sqs_message):
+    handler = SumHandler()
+    async_queue.add_task_handler("my_task", handler)
+    messages = [
+        {**sqs_message, "Body": "eyJrd2FyZ3MiOiB7ImEiOiAxLCAiYiI6IDIsICJjIjogM319"} for _ in range(10)
+    ]
+
+    class FakeSQSClient:
+        receive_message_calls = []
+
+        async def receive_message(self, **kwargs):
+            self.receive_message_calls.append(kwargs["MaxNumberOfMessages"])
+            return {"Messages": messages[: kwargs["MaxNumberOfMessages"]]}
+
+        async def delete_message(self, **kwargs):
+            pass
+
+    async_queue.sqs_client = FakeSQSClient()
+    asyncio.run(
+        async_queue.consume_messages(
+            max_messages=10, max_concurrency=3, run_forever=False, enable_signal_to_exit_gracefully=False
+        )
+    )
+
+    assert async_queue.sqs_client.receive_message_calls == [3]
+    assert handler.result_sum == 18
+
+
+@pytest.mark.parametrize(
+    "task_handler,expected_level,expected_message",
+    [
+        (exception_handler, 40, "Error while processing"),
+        (retry_exception_handler, 20, "Received an sqsx.Retry, setting a custom backoff policy"),
+        (no_retry_exception_handler, 20, "Received an sqsx.NoRetry, removing the task"),
+    ],
+)
+def test_async_queue_consume_messages_with_task_handler_exceptions(
+    async_queue, caplog, task_handler, expected_level, expected_message
+):
+    async_queue.add_task_handler("my_task", task_handler)
+
+    async def run():
+        await async_queue.add_task("my_task", a=1, b=2, c=3)
+        await async_queue.consume_messages(run_forever=False, enable_signal_to_exit_gracefully=False)
+
+    asyncio.run(run())
+
+    assert caplog.record_tuples[1][0] == "sqsx.async_queue"
+    assert caplog.record_tuples[1][1] == expected_level
+    assert expected_message in caplog.record_tuples[1][2]
+
+
+def test_async_queue_exit_gracefully(async_queue):
+    handler = SumHandler()
+    async_queue.add_task_handler("my_task", handler)
+
+    async def trigger_signal():
+        await asyncio.sleep(0.2)
+        os.kill(os.getpid(), signal.SIGINT)
+
+    async def run():
+        await async_queue.add_task("my_task", a=1, b=2, c=3)
+        signal_task = asyncio.create_task(trigger_signal())
+        await async_queue.consume_messages(wait_seconds=1, polling_wait_seconds=0)
+        await signal_task
+
+    asyncio.run(run())
+
+    assert handler.result_sum == 6
+
+
+def test_async_raw_queue_consume_messages(async_raw_queue):
+    received_messages = []
+
+    async def message_handler_function(queue_url, sqs_message):
+        received_messages.append(sqs_message["Body"])
+
+    async_raw_queue.message_handler_function = message_handler_function
+
+    async def run():
+        await async_raw_queue.add_message(message_body="Message Body")
+        await async_raw_queue.add_message(message_body="Message Body")
+        await async_raw_queue.consume_messages(
+            max_messages=2, run_forever=False, enable_signal_to_exit_gracefully=False
+        )
+
+    asyncio.run(run())
+
+    assert received_messages == ["Message Body", "Message Body"]
+
+
+def test_async_raw_queue_consume_messages_with_receive_errors(async_raw_queue, sqs_message, caplog):
+    received_messages = []
+
+    async def message_handler_function(queue_url, sqs_message):
+        received_messages.append(sqs_message["Body"])
+
+    class FakeSQSClient:
+        receive_message_calls = 0
+
+        async def receive_message(self, **kwargs):
+            self.receive_message_calls += 1
+            if self.receive_message_calls <= 2:
+                raise ConnectionError("Connection reset")
+            return {"Messages": [sqs_message]}
+
+        async def delete_message(self, **kwargs):
+            pass
+
+    async_raw_queue.message_handler_function = message_handler_function
+    async_raw_queue.sqs_client = FakeSQSClient()
+    with mock.patch("sqsx.async_queue.RECEIVE_ERROR_MIN_BACKOFF_SECONDS", 0):
+        asyncio.run(
+            async_raw_queue.consume_messages(
+                max_messages=1, run_forever=False, receivers=2, enable_signal_to_exit_gracefully=False
+            )
+        )
+
+    assert async_raw_queue.sqs_client.receive_message_calls == 4
+    assert received_messages == [sqs_message["Body"]] * 2
+    assert caplog.text.count("Error while receiving messages") == 2
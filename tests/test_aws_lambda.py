@@ -0,0 +1,188 @@
+import base64
+import subprocess
+import sys
+from unittest import mock
+
+import pytest
+
+from sqsx.aws_lambda import handle_sqs_event, record_to_sqs_message
+from sqsx.blob import LocalBlobStore
+from sqsx.exceptions import NoRetry, Retry
+from sqsx.helper import dict_to_base64
+from sqsx.queue import Queue, RawQueue
+
+
+def lambda_record(index, task_name="my_task", message_group_id=None, **task_kwargs):
+    attributes = {
+        "ApproximateReceiveCount": "1",
+        "SentTimestamp": "1702512255653",
+        "SenderId": "127.0.0.1",
+        "ApproximateFirstReceiveTimestamp": "1702512255660",
+    }
+    if message_group_id is not None:
+        attributes["MessageGroupId"] = message_group_id
+    return {
+        "messageId": f"message-{index}",
+        "receiptHandle": f"receipt-handle-{index}",
+        "body": dict_to_base64({"kwargs": task_kwargs}),
+        "attributes": attributes,
+        "messageAttributes": {
+            "TaskName": {
+                "stringValue": task_name,
+                "stringListValues": [],
+                "binaryListValues": [],
+                "dataType": "String",
+            }
+        },
+        "md5OfBody": "8087eb7436895841c5d646156a8a469f",
+        "eventSource": "aws:sqs",
+        "eventSourceARN": "arn:aws:sqs:us-east-1:000000000000:tests",
+        "awsRegion": "us-east-1",
+    }
+
+
+@pytest.fixture
+def lambda_queue(queue_url):
+    return Queue(url=queue_url, sqs_client=mock.MagicMock())
+
+
+def test_record_to_sqs_message():
+    record = lambda_record(1, a=1)
+    record["messageAttributes"]["Payload"] = {
+        "binaryValue": base64.b64encode(b"data").decode(),
+        "stringListValues": [],
+        "binaryListValues": [],
+        "dataType": "Binary",
+    }
+
+    sqs_message = record_to_sqs_message(record)
+
+    assert sqs_message["MessageId"] == "message-1"
+    assert sqs_message["ReceiptHandle"] == "receipt-handle-1"
+    assert sqs_message["Body"] == record["body"]
+    assert sqs_message["Attributes"]["ApproximateReceiveCount"] == "1"
+    assert sqs_message["MessageAttributes"] == {
+        "TaskName": {"DataType": "String", "StringValue": "my_task"},
+        "Payload": {"DataType": "Binary", "BinaryValue": b"data"},
+    }
+
+
+def test_handle_sqs_event(lambda_queue, caplog):
+    caplog.set_level("INFO")
+
+    def task_handler(context, value):
+        if value == "error":
+            raise Exception("BOOM!")
+        if value == "retry":
+            raise Retry(min_backoff_seconds=10, max_backoff_seconds=100)
+        if value == "no_retry":
+            raise NoRetry()
+
+    lambda_queue.add_task_handler("my_task", task_handler)
+    event = {
+        "Records": [
+            lambda_record(index, value=value)
+            for index, value in enumerate(["ok", "error", "retry", "no_retry", "ok"])
+        ]
+        + [lambda_record(5, task_name="unknown_task")]
+    }
+
+    response = handle_sqs_event(lambda_queue, event, max_threads=3)
+
+    assert response == {
+        "batchItemFailures": [
+            {"itemIdentifier": "message-1"},
+            {"itemIdentifier": "message-2"},
+            {"itemIdentifier": "message-5"},
+        ]
+    }
+    assert "Received an sqsx.Retry, setting a custom backoff policy, message_id=message-2" in caplog.text
+    assert "Error while processing, message_id=message-2" not in caplog.text
+    assert lambda_queue.sqs_client.method_calls == []
+
+
+def test_handle_sqs_event_keeps_the_blobs(queue_url, tmp_path):
+    blob_store = LocalBlobStore(directory=str(tmp_path))
+    blob_store.put("blob-key", dict_to_base64({"kwargs": {"value": "ok"}}).encode())
+    lambda_queue = Queue(url=queue_url, sqs_client=mock.MagicMock(), blob_store=blob_store)
+    values = []
+    lambda_queue.add_task_handler("my_task", lambda context, value: values.append(value))
+    record = lambda_record(0)
+    record["body"] = "{}"
+    record["messageAttributes"]["BlobKey"] = {"stringValue": "blob-key", "dataType": "String"}
+
+    response = handle_sqs_event(lambda_queue, {"Records": [record]})
+
+    assert response == {"batchItemFailures": []}
+    assert values == ["ok"]
+    assert blob_store.get("blob-key") == dict_to_base64({"kwargs": {"value": "ok"}}).encode()
+    assert lambda_queue._delete_acked_blobs is True
+
+
+def test_handle_sqs_event_with_batch_task_handler(lambda_queue):
+    batches = []
+
+    def batch_task_handler(context, tasks):
+        batches.append([task["kwargs"]["value"] for task in tasks])
+        return [None if task["kwargs"]["value"] % 2 else Exception("BOOM!") for task in tasks]
+
+    lambda_queue.add_batch_task_handler("my_task", batch_task_handler)
+    event = {"Records": [lambda_record(index, value=index) for index in range(4)]}
+
+    response = handle_sqs_event(lambda_queue, event)
+
+    assert batches == [[0, 1, 2, 3]]
+    assert response == {
+        "batchItemFailures": [{"itemIdentifier": "message-0"}, {"itemIdentifier": "message-2"}]
+    }
+
+
+def test_handle_sqs_event_from_fifo_queue():
+    calls = []
+
+    def task_handler(context, value):
+        calls.append(value)
+        if value == "a-1":
+            raise Exception("BOOM!")
+
+    lambda_queue = Queue(url="http://localhost:9324/000000000000/tests.fifo", sqs_client=mock.MagicMock())
+    lambda_queue.add_task_handler("my_task", task_handler)
+    values = [("a-0", "a"), ("b-0", "b"), ("a-1", "a"), ("a-2", "a"), ("b-1", "b")]
+    event = {
+        "Records": [
+            lambda_record(index, message_group_id=message_group_id, value=value)
+            for index, (value, message_group_id) in enumerate(values)
+        ]
+    }
+
+    response = handle_sqs_event(lambda_queue, event, max_threads=2)
+
+    assert sorted(calls) == ["a-0", "a-1", "b-0", "b-1"]
+    assert response == {
+        "batchItemFailures": [{"itemIdentifier": "message-2"}, {"itemIdentifier": "message-3"}]
+    }
+
+
+def test_handle_sqs_event_with_raw_queue(raw_queue_url):
+    def message_handler(queue_url, sqs_message):
+        if sqs_message["MessageId"] == "message-1":
+            raise Exception("BOOM!")
+
+    lambda_queue = RawQueue(
+        url=raw_queue_url, message_handler_function=message_handler, sqs_client=mock.MagicMock()
+    )
+    event = {"Records": [lambda_record(index) for index in range(3)]}
+
+    assert handle_sqs_event(lambda_queue, event) == {"batchItemFailures": [{"itemIdentifier": "message-1"}]}
+
+
+def test_import_skips_the_optional_subsystems():
+    code = (
+        "import sys, sqsx.aws_lambda; "
+        "modules = ['asyncio', 'multiprocessing', 'sqlite3', 'sqsx.consumer', 'sqsx.sharding']; "
+        "print(','.join(module for module in modules if module in sys.modules))"
+    )
+
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, check=True, text=True).stdout
+
+    assert output.strip() == ""
@@ -0,0 +1,149 @@
+import time
+from unittest import mock
+
+import pytest
+
+from sqsx.batcher import ChangeMessageVisibilityBatcher, DeleteMessageBatcher, MessageBatcher
+
+queue_url = "http://localhost:9324/000000000000/tests"
+
+
+@pytest.fixture
+def sqs_client():
+    sqs_client = mock.MagicMock()
+    sqs_client.delete_message_batch.return_value = {"Successful": [], "Failed": []}
+    sqs_client.change_message_visibility_batch.return_value = {"Successful": [], "Failed": []}
+    return sqs_client
+
+
+def test_message_batcher_requires_the_send_methods(sqs_client):
+    class IncompleteBatcher(MessageBatcher):
+        def _send_batch(self, entries):
+            return {}
+
+    with pytest.raises(TypeError):
+        IncompleteBatcher(sqs_client, queue_url)
+
+
+def test_delete_message_batcher_flush_on_size(sqs_client):
+    batcher = DeleteMessageBatcher(sqs_client, queue_url, linger_seconds=60)
+
+    for index in range(12):
+        batcher.add({"ReceiptHandle": f"receipt-handle-{index}"})
+
+    sqs_client.delete_message_batch.assert_called_once_with(
+        QueueUrl=queue_url,
+        Entries=[{"Id": str(index), "ReceiptHandle": f"receipt-handle-{index}"} for index in range(10)],
+    )
+
+    batcher.close()
+
+    assert sqs_client.delete_message_batch.call_count == 2
+    assert sqs_client.delete_message_batch.call_args.kwargs["Entries"] == [
+        {"Id": "0", "ReceiptHandle": "receipt-handle-10"},
+        {"Id": "1", "ReceiptHandle": "receipt-handle-11"},
+    ]
+
+
+def test_delete_message_batcher_flush_on_linger(sqs_client):
+    batcher = DeleteMessageBatcher(sqs_client, queue_url, linger_seconds=0.05)
+
+    batcher.add({"ReceiptHandle": "receipt-handle"})
+    time.sleep(0.3)
+
+    sqs_client.delete_message_batch.assert_called_once_with(
+        QueueUrl=queue_url, Entries=[{"Id": "0", "ReceiptHandle": "receipt-handle"}]
+    )
+    batcher.close()
+    sqs_client.delete_message_batch.assert_called_once()
+
+
+def test_delete_message_batcher_add_after_close(sqs_client):
+    batcher = DeleteMessageBatcher(sqs_client, queue_url, linger_seconds=60)
+    batcher.close()
+
+    batcher.add({"ReceiptHandle": "receipt-handle"})
+
+    sqs_client.delete_message_batch.assert_called_once_with(
+        QueueUrl=queue_url, Entries=[{"Id": "0", "ReceiptHandle": "receipt-handle"}]
+    )
+
+
+def test_delete_message_batcher_retry_failed_entries(sqs_client, caplog):
+    sqs_client.delete_message_batch.return_value = {
+        "Successful": [{"Id": "0"}],
+        "Failed": [{"Id": "1", "SenderFault": False, "Code": "InternalError"}],
+    }
+    sqs_client.delete_message.side_effect = Exception("BOOM!")
+    batcher = DeleteMessageBatcher(sqs_client, queue_url, linger_seconds=60)
+
+    batcher.add({"ReceiptHandle": "receipt-handle-0"})
+    batcher.add({"ReceiptHandle": "receipt-handle-1"})
+    batcher.close()
+
+    sqs_client.delete_message.assert_called_once_with(QueueUrl=queue_url, ReceiptHandle="receipt-handle-1")
+    assert caplog.record_tuples == [
+        (
+            "sqsx.batcher",
+            40,
+            f"Error while sending entry, queue_url={queue_url}, receipt_handle=receipt-handle-1",
+        )
+    ]
+
+
+def test_delete_message_batcher_on_sent(sqs_client):
+    sqs_client.delete_message_batch.return_value = {
+        "Successful": [{"Id": "0"}],
+        "Failed": [
+            {"Id": "1", "SenderFault": False, "Code": "InternalError"},
+            {"Id": "2", "SenderFault": False, "Code": "InternalError"},
+        ],
+    }
+    sqs_client.delete_message.side_effect = [None, Exception("BOOM!")]
+    on_sent = mock.MagicMock()
+    batcher = DeleteMessageBatcher(sqs_client, queue_url, linger_seconds=60, on_sent=on_sent)
+
+    for index in range(3):
+        batcher.add({"ReceiptHandle": f"receipt-handle-{index}"})
+    batcher.close()
+
+    on_sent.assert_called_once_with(
+        [{"ReceiptHandle": "receipt-handle-0"}, {"ReceiptHandle": "receipt-handle-1"}]
+    )
+
+
+def test_delete_message_batcher_retry_entries_when_batch_call_fails(sqs_client):
+    sqs_client.delete_message_batch.side_effect = Exception("BOOM!")
+    batcher = DeleteMessageBatcher(sqs_client, queue_url, linger_seconds=60)
+
+    batcher.add({"ReceiptHandle": "receipt-handle-0"})
+    batcher.add({"ReceiptHandle": "receipt-handle-1"})
+    batcher.close()
+
+    assert sqs_client.delete_message.call_args_list == [
+        mock.call(QueueUrl=queue_url, ReceiptHandle="receipt-handle-0"),
+        mock.call(QueueUrl=queue_url, ReceiptHandle="receipt-handle-1"),
+    ]
+
+
+def test_change_message_visibility_batcher(sqs_client):
+    sqs_client.change_message_visibility_batch.return_value = {
+        "Successful": [{"Id": "0"}],
+        "Failed": [{"Id": "1", "SenderFault": False, "Code": "InternalError"}],
+    }
+    batcher = ChangeMessageVisibilityBatcher(sqs_client, queue_url, linger_seconds=60)
+
+    batcher.add({"ReceiptHandle": "receipt-handle-0", "VisibilityTimeout": 30})
+    batcher.add({"ReceiptHandle": "receipt-handle-1", "VisibilityTimeout": 120})
+    batcher.close()
+
+    sqs_client.change_message_visibility_batch.assert_called_once_with(
+        QueueUrl=queue_url,
+        Entries=[
+            {"Id": "0", "ReceiptHandle": "receipt-handle-0", "VisibilityTimeout": 30},
+            {"Id": "1", "ReceiptHandle": "receipt-handle-1", "VisibilityTimeout": 120},
+        ],
+    )
+    sqs_client.change_message_visibility.assert_called_once_with(
+        QueueUrl=queue_url, ReceiptHandle="receipt-handle-1", VisibilityTimeout=120
+    )
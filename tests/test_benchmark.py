@@ -0,0 +1,22 @@
+import pytest
+
+from sqsx.benchmark import main, run_benchmark
+
+
+@pytest.mark.parametrize("queue_type", ["queue", "raw_queue"])
+def test_run_benchmark(queue_type):
+    result = run_benchmark(queue_type=queue_type, messages=50, max_messages=10, max_threads=5)
+
+    assert result.messages == 50
+    assert result.messages_per_second > 0
+    assert 0 < result.p50_latency_seconds <= result.p99_latency_seconds
+
+
+def test_benchmark_main(capsys):
+    main(
+        ["--queue-types", "queue", "--messages", "20", "--max-threads", "1,2", "--latency-profiles", "local"]
+    )
+
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 3
+    assert lines[1].startswith("queue      local")
@@ -0,0 +1,76 @@
+import io
+from unittest import mock
+
+import pytest
+
+from sqsx.blob import BlobStore, CachedBlobStore, LocalBlobStore, S3BlobStore
+
+
+def test_local_blob_store(tmp_path):
+    blob_store = LocalBlobStore(directory=str(tmp_path / "blobs"))
+
+    blob_store.put("blob-key", b"data")
+    assert blob_store.get("blob-key") == b"data"
+
+    blob_store.delete("blob-key")
+    blob_store.delete("blob-key")
+    with pytest.raises(FileNotFoundError):
+        blob_store.get("blob-key")
+
+
+@pytest.mark.parametrize("blob_key", ["", "..", "../secret", "/etc/passwd", "nested/blob-key"])
+def test_local_blob_store_rejects_keys_outside_the_directory(tmp_path, blob_key):
+    secret_path = tmp_path / "secret"
+    secret_path.write_bytes(b"secret")
+    blob_store = LocalBlobStore(directory=str(tmp_path / "blobs"))
+
+    with pytest.raises(ValueError, match="Invalid blob key"):
+        blob_store.get(blob_key)
+    with pytest.raises(ValueError, match="Invalid blob key"):
+        blob_store.delete(blob_key)
+    with pytest.raises(ValueError, match="Invalid blob key"):
+        blob_store.put(blob_key, b"data")
+    assert secret_path.read_bytes() == b"secret"
+
+
+def test_blob_store_requires_all_methods():
+    class IncompleteBlobStore(BlobStore):
+        def put(self, key, data):
+            pass
+
+    with pytest.raises(TypeError):
+        IncompleteBlobStore()
+
+
+def test_s3_blob_store():
+    s3_client = mock.MagicMock()
+    s3_client.get_object.return_value = {"Body": io.BytesIO(b"data")}
+    blob_store = S3BlobStore(s3_client=s3_client, bucket="bucket")
+
+    blob_store.put("blob-key", b"data")
+    assert blob_store.get("blob-key") == b"data"
+    blob_store.delete("blob-key")
+
+    s3_client.put_object.assert_called_once_with(Bucket="bucket", Key="sqsx/blob-key", Body=b"data")
+    s3_client.get_object.assert_called_once_with(Bucket="bucket", Key="sqsx/blob-key")
+    s3_client.delete_object.assert_called_once_with(Bucket="bucket", Key="sqsx/blob-key")
+
+
+def test_cached_blob_store(tmp_path):
+    local_blob_store = LocalBlobStore(directory=str(tmp_path))
+    blob_store = CachedBlobStore(blob_store=local_blob_store, max_size=1)
+    blob_store.put("blob-key-1", b"data-1")
+    blob_store.put("blob-key-2", b"data-2")
+
+    with mock.patch.object(LocalBlobStore, "get", wraps=local_blob_store.get) as get:
+        assert blob_store.get("blob-key-1") == b"data-1"
+        assert blob_store.get("blob-key-1") == b"data-1"
+        assert get.call_count == 1
+
+        assert blob_store.get("blob-key-2") == b"data-2"
+        assert blob_store.get("blob-key-1") == b"data-1"
+        assert get.call_count == 3
+
+    blob_store.delete("blob-key-1")
+    with pytest.raises(FileNotFoundError):
+        blob_store.get("blob-key-1")
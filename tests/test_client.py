@@ -0,0 +1,144 @@
+from unittest import mock
+
+import boto3
+import pytest
+from botocore.config import Config
+
+from sqsx.client import pool_connections, SQSClientFactory
+from sqsx.queue import Queue, RawQueue
+
+queue_url = "http://localhost:9324/000000000000/tests"
+
+
+@pytest.fixture
+def sqs_client_factory():
+    return SQSClientFactory(
+        client_kwargs={
+            "endpoint_url": "http://localhost:9324",
+            "region_name": "elasticmq",
+            "aws_secret_access_key": "x",
+            "aws_access_key_id": "x",
+            "use_ssl": False,
+        }
+    )
+
+
+def test_sqs_client_factory_create(sqs_client_factory):
+    assert pool_connections(sqs_client_factory.create()) == 10
+    assert pool_connections(sqs_client_factory.create(25)) == 25
+
+
+def test_sqs_client_factory_create_with_config():
+    sqs_client_factory = SQSClientFactory(
+        client_kwargs={"region_name": "us-east-1"},
+        config=Config(connect_timeout=7, max_pool_connections=3),
+        session=boto3.session.Session(aws_access_key_id="x", aws_secret_access_key="x"),
+    )
+
+    sqs_client = sqs_client_factory.create(30)
+
+    assert pool_connections(sqs_client) == 30
+    assert sqs_client.meta.config.connect_timeout == 7
+
+
+def test_pool_connections_without_boto3_client():
+    assert pool_connections(mock.MagicMock()) is None
+
+
+def test_queue_with_sqs_client_factory(sqs_client_factory):
+    queue = Queue(url=queue_url, sqs_client_factory=sqs_client_factory)
+
+    assert pool_connections(queue.sqs_client) == 10
+
+
+@pytest.mark.parametrize("queue_class", [Queue, RawQueue])
+def test_queue_without_sqs_client_and_factory(queue_class):
+    with pytest.raises(ValueError, match="sqs_client or sqs_client_factory is required"):
+        queue_class(url=queue_url, message_handler_function=print)
+
+
+def test_queue_dedicated_sqs_clients_without_factory():
+    with pytest.raises(ValueError, match="sqs_client_factory is required"):
+        RawQueue(
+            url=queue_url,
+            message_handler_function=print,
+            sqs_client=mock.MagicMock(),
+            dedicated_sqs_clients=True,
+        )
+
+
+def test_prepare_sqs_clients_resizes_the_factory_client(sqs_client_factory, caplog):
+    caplog.set_level("INFO")
+    queue = Queue(url=queue_url, sqs_client_factory=sqs_client_factory)
+    queue.add_task_handler("my_task", print, max_concurrency=4, dedicated_pool=True)
+
+    queue._prepare_sqs_clients(20, 2, batch_linger_seconds=0.1, heartbeat_visibility_timeout_seconds=30)
+
+    assert pool_connections(queue.sqs_client) == 20 + 4 + 2 + 2 + 1
+    assert "Resizing the sqs client connection pool, max_pool_connections=29" in caplog.text
+
+
+def test_prepare_sqs_clients_with_dedicated_sqs_clients(sqs_client_factory):
+    queue = Queue(url=queue_url, sqs_client_factory=sqs_client_factory, dedicated_sqs_clients=True)
+
+    queue._prepare_sqs_clients(12, 4, batch_linger_seconds=0.1, heartbeat_visibility_timeout_seconds=None)
+
+    assert pool_connections(queue.sqs_client) == 12
+
+
+def test_prepare_sqs_clients_warns_about_injected_client(sqs_client_factory, caplog):
+    sqs_client = sqs_client_factory.create()
+    queue = Queue(url=queue_url, sqs_client=sqs_client)
+
+    queue._prepare_sqs_clients(20, 1, batch_linger_seconds=None, heartbeat_visibility_timeout_seconds=None)
+
+    assert queue.sqs_client is sqs_client
+    assert (
+        "The sqs client connection pool is smaller than the consumption concurrency, max_pool_connections=10, "
+        "required_connections=21"
+    ) in caplog.text
+
+
+def test_prepare_sqs_clients_keeps_large_enough_client(sqs_client_factory, caplog):
+    sqs_client = sqs_client_factory.create(50)
+    queue = Queue(url=queue_url, sqs_client=sqs_client)
+
+    queue._prepare_sqs_clients(20, 1, batch_linger_seconds=None, heartbeat_visibility_timeout_seconds=None)
+
+    assert queue.sqs_client is sqs_client
+    assert "connection pool" not in caplog.text
+
+
+def test_consume_messages_with_dedicated_sqs_clients(sqs_client_factory):
+    queue_sqs_client = mock.MagicMock()
+    receiver_sqs_client = mock.MagicMock()
+    batcher_sqs_client = mock.MagicMock()
+    queue = Queue(
+        url=queue_url,
+        sqs_client=queue_sqs_client,
+        sqs_client_factory=sqs_client_factory,
+        dedicated_sqs_clients=True,
+    )
+
+    def receive_message(**kwargs):
+        queue.exit_gracefully()
+        return {"Messages": []}
+
+    receiver_sqs_client.receive_message.side_effect = receive_message
+
+    with mock.patch.object(
+        SQSClientFactory, "create", side_effect=[batcher_sqs_client, receiver_sqs_client]
+    ) as create:
+        queue.consume_messages(
+            max_threads=8,
+            wait_seconds=0,
+            polling_wait_seconds=0,
+            enable_signal_to_exit_gracefully=False,
+            batch_linger_seconds=0.1,
+        )
+
+    # the batcher client has a connection for each handler thread and each flusher thread
+    assert create.call_args_list == [mock.call(8 + 2), mock.call(1)]
+    receiver_sqs_client.receive_message.assert_called_once()
+    queue_sqs_client.receive_message.assert_not_called()
+    assert queue._ack_batcher is None
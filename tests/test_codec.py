@@ -0,0 +1,64 @@
+import pytest
+
+from sqsx.codec import decode_task_body, decode_task_message, encode_task_body, TaskCodec
+
+data = {"kwargs": {"a": 1, "b": "text", "c": [1, 2, 3]}}
+
+
+def test_encode_task_body_without_codec():
+    message_body, codec_name = encode_task_body(data, None)
+
+    assert codec_name is None
+    assert decode_task_body(message_body, None) == data
+
+
+def test_json_codec():
+    message_body, codec_name = TaskCodec().encode(data)
+
+    assert codec_name == "json"
+    assert message_body == '{"kwargs":{"a":1,"b":"text","c":[1,2,3]}}'
+    assert decode_task_body(message_body, codec_name) == data
+
+
+@pytest.mark.parametrize(
+    "serializer,compression",
+    [("json", "zlib"), ("json", "zstd"), ("msgpack", None), ("msgpack", "zlib"), ("msgpack", "zstd")],
+)
+def test_task_codec(serializer, compression):
+    if serializer == "msgpack":
+        pytest.importorskip("msgpack")
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    codec = TaskCodec(serializer=serializer, compression=compression, compression_threshold_bytes=0)
+
+    message_body, codec_name = codec.encode(data)
+
+    assert codec_name == f"{serializer}+{compression}" if compression else serializer
+    assert decode_task_body(message_body, codec_name) == data
+
+
+def test_task_codec_compression_threshold():
+    codec = TaskCodec(compression="zlib", compression_threshold_bytes=1024)
+    large_data = {"kwargs": {"text": "x" * 4096}}
+
+    small_message_body, small_codec_name = codec.encode(data)
+    large_message_body, large_codec_name = codec.encode(large_data)
+
+    assert small_codec_name == "json"
+    assert large_codec_name == "json+zlib"
+    assert len(large_message_body) < 1024
+    assert decode_task_body(large_message_body, large_codec_name) == large_data
+
+
+def test_decode_task_message(sqs_message):
+    assert decode_task_message(sqs_message) == {"kwargs": {"a": 1, "b": 2, "c": 3}}
+
+    sqs_message["Body"] = '{"kwargs":{"a":1}}'
+    sqs_message["MessageAttributes"]["Codec"] = {"DataType": "String", "StringValue": "json"}
+    assert decode_task_message(sqs_message) == {"kwargs": {"a": 1}}
+
+
+@pytest.mark.parametrize("codec_name", ["xml", "json+lzma"])
+def test_decode_task_body_with_unknown_codec(codec_name):
+    with pytest.raises(ValueError):
+        decode_task_body("Zv", codec_name)
@@ -0,0 +1,65 @@
+import pytest
+
+from sqsx.consumer import MultiQueueConsumer
+from sqsx.idle import ExponentialIdleStrategy
+
+
+class SumHandler:
+    result_sum = 0
+
+    def __call__(self, context, a, b, c):
+        self.result_sum += a + b + c
+
+
+class CallCountHandler:
+    call_count = 0
+
+    def __call__(self, queue_url, sqs_message):
+        self.call_count += 1
+
+
+def test_multi_queue_consumer_consume_messages(queue, raw_queue):
+    handler = SumHandler()
+    raw_handler = CallCountHandler()
+    queue.add_task_handler("my_task", handler)
+    raw_queue.message_handler_function = raw_handler
+    queue.add_task("my_task", a=1, b=2, c=3)
+    queue.add_task("my_task", a=1, b=2, c=3)
+    raw_queue.add_message(message_body="Message Body")
+
+    consumer = MultiQueueConsumer(queues=[queue, raw_queue], weights=[3, 1])
+    consumer.consume_messages(
+        max_messages=2, max_threads=2, run_forever=False, enable_signal_to_exit_gracefully=False
+    )
+
+    assert handler.result_sum == 12
+    assert raw_handler.call_count == 1
+
+
+def test_multi_queue_consumer_exit_gracefully(queue, raw_queue):
+    raw_handler = CallCountHandler()
+    raw_queue.message_handler_function = raw_handler
+    raw_queue.add_message(message_body="Message Body")
+
+    def exit_after_first_message(queue_url, sqs_message):
+        raw_handler(queue_url, sqs_message)
+        consumer.exit_gracefully()
+
+    raw_queue.message_handler_function = exit_after_first_message
+    consumer = MultiQueueConsumer(queues=[queue, raw_queue], strict_priority=True)
+    consumer.consume_messages(
+        polling_wait_seconds=0,
+        idle_strategy=ExponentialIdleStrategy(min_seconds=0.1, max_seconds=1),
+        enable_signal_to_exit_gracefully=False,
+    )
+
+    assert raw_handler.call_count == 1
+    assert queue._should_consume_tasks_stop is True
+
+
+def test_multi_queue_consumer_with_invalid_weights(queue, raw_queue):
+    with pytest.raises(ValueError):
+        MultiQueueConsumer(queues=[queue, raw_queue], weights=[1])
+
+    with pytest.raises(ValueError):
+        MultiQueueConsumer(queues=[queue, raw_queue], weights=[1, 0])
@@ -0,0 +1,108 @@
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from sqsx.heartbeat import VisibilityHeartbeat
+
+queue_url = "http://localhost:9324/000000000000/tests"
+
+
+@pytest.fixture
+def sqs_client():
+    sqs_client = mock.MagicMock()
+    sqs_client.change_message_visibility_batch.return_value = {"Successful": [], "Failed": []}
+    return sqs_client
+
+
+def test_visibility_heartbeat_beat(sqs_client):
+    heartbeat = VisibilityHeartbeat(
+        sqs_client, queue_url, visibility_timeout_seconds=30, interval_seconds=3600
+    )
+    heartbeat.track({"ReceiptHandle": "receipt-handle-0"})
+    heartbeat.track({"ReceiptHandle": "receipt-handle-1"})
+    heartbeat.untrack({"ReceiptHandle": "receipt-handle-1"})
+
+    heartbeat.beat()
+
+    sqs_client.change_message_visibility_batch.assert_called_once_with(
+        QueueUrl=queue_url,
+        Entries=[{"Id": "0", "ReceiptHandle": "receipt-handle-0", "VisibilityTimeout": 30}],
+    )
+    assert heartbeat.tracked_messages == 1
+    heartbeat.close()
+
+
+def test_visibility_heartbeat_skip_recently_extended_messages(sqs_client):
+    heartbeat = VisibilityHeartbeat(sqs_client, queue_url, visibility_timeout_seconds=30, interval_seconds=5)
+    heartbeat.track({"ReceiptHandle": "receipt-handle"})
+
+    heartbeat.beat()
+
+    sqs_client.change_message_visibility_batch.assert_not_called()
+    heartbeat.close()
+
+
+def test_visibility_heartbeat_max_extension(sqs_client, caplog):
+    heartbeat = VisibilityHeartbeat(
+        sqs_client, queue_url, visibility_timeout_seconds=30, max_extension_seconds=10, interval_seconds=3600
+    )
+    heartbeat.track({"ReceiptHandle": "receipt-handle"})
+
+    heartbeat.beat()
+    assert sqs_client.change_message_visibility_batch.call_args.kwargs["Entries"][0]["VisibilityTimeout"] == 9
+
+    with mock.patch("sqsx.heartbeat.time.monotonic", return_value=time.monotonic() + 3600):
+        heartbeat.beat()
+
+    assert sqs_client.change_message_visibility_batch.call_count == 1
+    assert heartbeat.tracked_messages == 0
+    assert caplog.record_tuples == [
+        (
+            "sqsx.heartbeat",
+            30,
+            f"Max visibility extension reached, queue_url={queue_url}, receipt_handle=receipt-handle",
+        )
+    ]
+    heartbeat.close()
+
+
+def test_visibility_heartbeat_background_thread(sqs_client):
+    heartbeat = VisibilityHeartbeat(sqs_client, queue_url, visibility_timeout_seconds=1, interval_seconds=0.4)
+    heartbeat.track({"ReceiptHandle": "receipt-handle"})
+
+    time.sleep(0.6)
+    heartbeat.close()
+
+    assert sqs_client.change_message_visibility_batch.call_count >= 1
+
+
+def test_visibility_heartbeat_untrack_waits_for_the_extension_being_sent(sqs_client):
+    sending = threading.Event()
+    resume = threading.Event()
+
+    def change_message_visibility_batch(**kwargs):
+        sending.set()
+        resume.wait(1)
+        return {"Successful": [], "Failed": []}
+
+    sqs_client.change_message_visibility_batch.side_effect = change_message_visibility_batch
+    heartbeat = VisibilityHeartbeat(
+        sqs_client, queue_url, visibility_timeout_seconds=30, interval_seconds=3600
+    )
+    heartbeat.track({"ReceiptHandle": "receipt-handle"})
+    beat_thread = threading.Thread(target=heartbeat.beat)
+    beat_thread.start()
+    sending.wait(1)
+    untrack_thread = threading.Thread(target=heartbeat.untrack, args=({"ReceiptHandle": "receipt-handle"},))
+    untrack_thread.start()
+
+    untrack_thread.join(0.1)
+    assert untrack_thread.is_alive()
+    resume.set()
+    untrack_thread.join(1)
+    assert not untrack_thread.is_alive()
+    assert heartbeat.tracked_messages == 0
+    beat_thread.join()
+    heartbeat.close()
@@ -1,6 +1,21 @@
+import time
+
 import pytest
 
-from sqsx.helper import backoff_calculator_seconds, base64_to_dict, dict_to_base64
+from sqsx.helper import (
+    backoff_calculator_seconds,
+    base64_to_dict,
+    chunk_message_entries,
+    deduplication_id,
+    dict_to_base64,
+    error_code,
+    InFlightLimiter,
+    message_entry_size,
+    MessageDrain,
+    MessageGroupLimiter,
+    PriorityInFlightLimiter,
+    TaskConcurrencyLimiter,
+)
 
 
 def test_dict_to_base64():
@@ -29,3 +44,151 @@ def test_base64_to_dict():
 )
 def test_backoff_calculator(retries, minimum, maximum, expected):
     assert backoff_calculator_seconds(retries, minimum, maximum) == expected
+
+
+def test_error_code():
+    exc = Exception("Throttled")
+    exc.response = {"Error": {"Code": "RequestThrottled"}}
+
+    assert error_code(exc) == "RequestThrottled"
+    assert error_code(ValueError("Invalid")) == "ValueError"
+
+
+def test_in_flight_limiter():
+    limiter = InFlightLimiter(3)
+
+    assert limiter.acquire(2) == 2
+    assert limiter.acquire(2) == 1
+    assert limiter.in_flight == 3
+    assert limiter.acquire(1, timeout=0.01) == 0
+
+    limiter.release(2)
+    assert limiter.in_flight == 1
+    assert limiter.acquire(5) == 2
+
+
+def test_priority_in_flight_limiter():
+    limiter = PriorityInFlightLimiter(3, weights=[1, 1])
+    queue_limiter = limiter.limiter(1)
+
+    assert queue_limiter.acquire(2) == 2
+    assert limiter.acquire(0, 2) == 1
+    assert limiter.in_flight == 3
+    assert limiter.acquire(0, 1, timeout=0.01) == 0
+
+    queue_limiter.release(2)
+    assert queue_limiter.in_flight == 1
+
+
+@pytest.mark.parametrize(
+    "weights,strict_priority,expected",
+    [
+        ([3, 1], False, [0, 0, 1, 0, 0, 0, 1, 0]),
+        ([3, 1], True, [0, 0, 0, 0, 0, 0, 0, 0]),
+    ],
+)
+def test_priority_in_flight_limiter_next_index(weights, strict_priority, expected):
+    limiter = PriorityInFlightLimiter(1, weights=weights, strict_priority=strict_priority)
+    limiter._waiting = [1, 1]
+
+    assert [limiter._next_index() for _ in expected] == expected
+
+
+def test_task_concurrency_limiter():
+    limiter = TaskConcurrencyLimiter(1)
+
+    assert limiter.acquire_or_wait("message-1") == "acquired"
+    assert limiter.acquire_or_wait("message-2") == "waiting"
+    assert limiter.try_acquire() is False
+    assert limiter.running == 1
+    assert limiter.waiting == 1
+
+    assert limiter.release_or_next() == "message-2"
+    assert limiter.release_or_next() is None
+    assert limiter.running == 0
+    assert limiter.try_acquire() is True
+
+
+def test_task_concurrency_limiter_with_max_waiting():
+    limiter = TaskConcurrencyLimiter(1)
+
+    assert limiter.acquire_or_wait("message-1", max_waiting=1) == "acquired"
+    assert limiter.acquire_or_wait("message-2", max_waiting=1) == "waiting"
+    assert limiter.acquire_or_wait("message-3", max_waiting=1) == "rejected"
+    assert limiter.waiting == 1
+
+
+def test_message_entry_size():
+    entry = {
+        "MessageBody": "body",
+        "MessageAttributes": {
+            "TaskName": {"DataType": "String", "StringValue": "my_task"},
+            "Data": {"DataType": "Binary", "BinaryValue": b"data"},
+        },
+    }
+
+    assert message_entry_size(entry) == 4 + (8 + 6 + 7) + (4 + 6 + 4)
+
+
+def test_chunk_message_entries():
+    entries = ({"MessageBody": "x" * 100} for _ in range(25))
+
+    chunks = list(chunk_message_entries(entries))
+
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+
+
+def test_chunk_message_entries_with_payload_limit():
+    entries = [{"MessageBody": "x" * 100} for _ in range(5)]
+
+    chunks = list(chunk_message_entries(entries, max_payload_bytes=250))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+
+
+def test_deduplication_id():
+    assert deduplication_id(["my_task", {"a": 1, "b": 2}]) == deduplication_id(["my_task", {"b": 2, "a": 1}])
+    assert deduplication_id(["my_task", {"a": 1}]) != deduplication_id(["my_task", {"a": 2}])
+
+
+def test_message_group_limiter():
+    limiter = MessageGroupLimiter()
+
+    assert limiter.acquire_or_wait("group-1", "message-1") is True
+    assert limiter.acquire_or_wait("group-1", "message-2") is False
+    assert limiter.acquire_or_wait("group-2", "message-3") is True
+    assert limiter.running_groups == 2
+
+    assert limiter.release_or_next("group-1") == "message-2"
+    assert limiter.release_or_next("group-1") is None
+    assert limiter.running_groups == 1
+
+    assert limiter.acquire_or_wait("group-1", "message-4", ["message-5", "message-6"]) is True
+    assert limiter.acquire_or_wait("group-1", "message-7", ["message-8"]) is False
+    assert [limiter.release_or_next("group-1") for _ in range(5)] == [
+        "message-5",
+        "message-6",
+        "message-7",
+        "message-8",
+        None,
+    ]
+
+
+def test_message_drain():
+    sqs_messages = [{"ReceiptHandle": f"receipt-handle-{index}"} for index in range(3)]
+    message_drain = MessageDrain(timeout_seconds=0.1)
+    message_drain.track(sqs_messages)
+
+    assert message_drain.draining is False
+    message_drain.start()
+    message_drain.untrack(sqs_messages[:1])
+    message_drain.release(sqs_messages[1:2])
+    message_drain.release(sqs_messages[:1])
+
+    started_at = time.monotonic()
+    assert message_drain.wait() == sqs_messages[1:]
+    assert time.monotonic() - started_at >= 0.09
+    assert message_drain.draining is True
+    assert message_drain.released(sqs_messages[0]) is False
+    assert message_drain.released(sqs_messages[2]) is True
+    assert message_drain.wait() == []
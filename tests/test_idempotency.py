@@ -0,0 +1,71 @@
+from unittest import mock
+
+import pytest
+
+from sqsx.idempotency import (
+    CachedIdempotencyStore,
+    IdempotencyStore,
+    MemoryIdempotencyStore,
+    SQLiteIdempotencyStore,
+)
+
+
+def test_idempotency_store_requires_all_methods():
+    class IncompleteIdempotencyStore(IdempotencyStore):
+        def is_completed(self, key):
+            return False
+
+    with pytest.raises(TypeError):
+        IncompleteIdempotencyStore()
+
+
+def test_memory_idempotency_store():
+    idempotency_store = MemoryIdempotencyStore(max_size=2)
+
+    assert idempotency_store.is_completed("key-1") is False
+    idempotency_store.mark_completed("key-1")
+    idempotency_store.mark_completed("key-2")
+    assert idempotency_store.is_completed("key-1") is True
+
+    idempotency_store.mark_completed("key-3")
+    assert idempotency_store.is_completed("key-1") is True
+    assert idempotency_store.is_completed("key-2") is False
+    assert idempotency_store.is_completed("key-3") is True
+
+
+def test_memory_idempotency_store_ttl():
+    idempotency_store = MemoryIdempotencyStore(ttl_seconds=10)
+    idempotency_store.mark_completed("key")
+
+    with mock.patch("sqsx.idempotency.time.monotonic", return_value=10**9):
+        assert idempotency_store.is_completed("key") is False
+
+
+def test_sqlite_idempotency_store(tmp_path):
+    path = str(tmp_path / "idempotency.db")
+    idempotency_store = SQLiteIdempotencyStore(path=path, ttl_seconds=10)
+
+    assert idempotency_store.is_completed("key") is False
+    idempotency_store.mark_completed("key")
+    assert idempotency_store.is_completed("key") is True
+    assert SQLiteIdempotencyStore(path=path).is_completed("key") is True
+
+    with mock.patch("sqsx.idempotency.time.time", return_value=10**10):
+        assert idempotency_store.is_completed("key") is False
+    idempotency_store.close()
+
+
+def test_cached_idempotency_store(tmp_path):
+    shared_idempotency_store = SQLiteIdempotencyStore(path=str(tmp_path / "idempotency.db"))
+    idempotency_store = CachedIdempotencyStore(idempotency_store=shared_idempotency_store)
+    shared_idempotency_store.mark_completed("key-1")
+
+    with mock.patch.object(
+        SQLiteIdempotencyStore, "is_completed", wraps=shared_idempotency_store.is_completed
+    ) as is_completed:
+        assert idempotency_store.is_completed("key-1") is True
+        assert idempotency_store.is_completed("key-1") is True
+        assert is_completed.call_count == 1
+
+    idempotency_store.mark_completed("key-2")
+    assert shared_idempotency_store.is_completed("key-2") is True
@@ -0,0 +1,35 @@
+from unittest import mock
+
+import pytest
+
+from sqsx.idle import ExponentialIdleStrategy, FixedIdleStrategy, IdleStrategy
+
+
+def test_idle_strategy_requires_seconds():
+    with pytest.raises(TypeError):
+        IdleStrategy()
+
+
+def test_fixed_idle_strategy():
+    idle_strategy = FixedIdleStrategy(wait_seconds=5)
+
+    assert [idle_strategy.seconds(empty_receives) for empty_receives in range(1, 4)] == [5, 5, 5]
+
+
+@pytest.mark.parametrize(
+    "empty_receives,expected",
+    [(0, 0), (1, 0.5), (2, 1), (3, 2), (4, 4), (5, 5), (10, 5)],
+)
+def test_exponential_idle_strategy(empty_receives, expected):
+    idle_strategy = ExponentialIdleStrategy(min_seconds=0.5, max_seconds=5, jitter=False)
+
+    assert idle_strategy.seconds(empty_receives) == expected
+
+
+def test_exponential_idle_strategy_with_jitter():
+    idle_strategy = ExponentialIdleStrategy(min_seconds=1, max_seconds=60)
+
+    with mock.patch("sqsx.idle.random.uniform", return_value=3) as uniform:
+        assert idle_strategy.seconds(3) == 3
+
+    uniform.assert_called_once_with(2, 4)
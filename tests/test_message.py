@@ -0,0 +1,50 @@
+import pytest
+
+from sqsx.message import Message, TaskContext
+
+
+def test_message(sqs_message):
+    sqs_message["MessageAttributes"]["Payload"] = {"BinaryValue": b"data", "DataType": "Binary"}
+    message = Message(sqs_message)
+
+    assert message.message_id == sqs_message["MessageId"]
+    assert message.receipt_handle == sqs_message["ReceiptHandle"]
+    assert message.body == sqs_message["Body"]
+    assert message.attributes == sqs_message["Attributes"]
+    assert message.receive_count == 1
+    assert message.message_attributes == {"TaskName": "my_task", "Payload": b"data"}
+    assert message.message_attributes is message.message_attributes
+    assert message["Body"] == sqs_message["Body"]
+    assert dict(message) == sqs_message
+    assert repr(message) == f"Message(message_id={sqs_message['MessageId']!r})"
+
+
+def test_message_without_attributes(sqs_message):
+    del sqs_message["Attributes"]
+    del sqs_message["MessageAttributes"]
+    message = Message(sqs_message)
+
+    assert message.attributes == {}
+    assert message.receive_count == 1
+    assert message.message_attributes == {}
+    assert message.get("MessageAttributes") is None
+
+
+def test_task_context(sqs_message):
+    context = TaskContext("http://localhost:9324/000000000000/tests", "my_task", sqs_message)
+
+    assert context._sqs_message is None
+    assert context.task_name == "my_task"
+    assert context["task_name"] == "my_task"
+    message = context["sqs_message"]
+    assert isinstance(message, Message)
+    assert message.raw is sqs_message
+    assert context.sqs_message is message
+    assert dict(context) == {
+        "queue_url": "http://localhost:9324/000000000000/tests",
+        "task_name": "my_task",
+        "sqs_message": message,
+    }
+    assert not hasattr(context, "__dict__")
+    with pytest.raises(KeyError):
+        context["invalid"]
@@ -0,0 +1,47 @@
+from sqsx.metrics import InMemoryMetrics, Metrics
+
+labels = {"queue_url": "http://localhost:9324/000000000000/tests", "task_name": "my_task"}
+
+
+def test_metrics_does_nothing():
+    metrics = Metrics()
+
+    metrics.increment("sqsx_acks_total", labels)
+    metrics.observe("sqsx_task_duration_seconds", labels, 0.1)
+    metrics.set_gauge("sqsx_in_flight_messages", labels, 1)
+
+
+def test_in_memory_metrics():
+    metrics = InMemoryMetrics(max_samples=100)
+
+    metrics.increment("sqsx_tasks_total", labels)
+    metrics.increment("sqsx_tasks_total", labels, 2)
+    metrics.set_gauge("sqsx_in_flight_messages", labels, 3)
+    for value in range(1, 201):
+        metrics.observe("sqsx_task_duration_seconds", labels, value)
+
+    assert metrics.counter("sqsx_tasks_total", labels) == 3
+    assert metrics.counter("sqsx_tasks_total") == 0
+    assert metrics.gauge("sqsx_in_flight_messages", labels) == 3
+    assert metrics.count("sqsx_task_duration_seconds", labels) == 200
+    assert metrics.percentile("sqsx_task_duration_seconds", 0.5, labels) == 150
+    assert metrics.percentile("sqsx_task_duration_seconds", 0.99, labels) == 199
+    assert metrics.percentile("sqsx_task_duration_seconds", 0.5) is None
+
+
+def test_in_memory_metrics_prometheus_text():
+    metrics = InMemoryMetrics()
+    metrics.increment("sqsx_acks_total", {"queue_url": 'queue "1"'})
+    metrics.set_gauge("sqsx_in_flight_messages", {}, 2)
+    metrics.observe("sqsx_task_duration_seconds", {"task_name": "my_task"}, 0.5)
+
+    assert metrics.prometheus_text(quantiles=(0.5,)) == (
+        "# TYPE sqsx_acks_total counter\n"
+        'sqsx_acks_total{queue_url="queue \\"1\\""} 1\n'
+        "# TYPE sqsx_in_flight_messages gauge\n"
+        "sqsx_in_flight_messages 2\n"
+        "# TYPE sqsx_task_duration_seconds summary\n"
+        'sqsx_task_duration_seconds{task_name="my_task",quantile="0.5"} 0.5\n'
+        'sqsx_task_duration_seconds_sum{task_name="my_task"} 0.5\n'
+        'sqsx_task_duration_seconds_count{task_name="my_task"} 1\n'
+    )
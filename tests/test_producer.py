@@ -0,0 +1,173 @@
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from sqsx.exceptions import BufferFullError
+from sqsx.producer import BufferedProducer
+
+
+def send_message_batch(QueueUrl, Entries):
+    return {
+        "Successful": [{"Id": entry["Id"], "MessageId": f"message-id-{entry['Id']}"} for entry in Entries]
+    }
+
+
+def test_buffered_producer_add_task(queue, sqs_client):
+    with BufferedProducer(queue, linger_seconds=60) as producer:
+        for index in range(15):
+            producer.add_task("my_task", a=index, b=0, c=0)
+
+    attributes = sqs_client.get_queue_attributes(
+        QueueUrl=queue.url, AttributeNames=["ApproximateNumberOfMessages"]
+    )["Attributes"]
+    assert attributes["ApproximateNumberOfMessages"] == "15"
+
+
+def test_buffered_producer_add_message(raw_queue):
+    raw_queue.sqs_client = mock.MagicMock()
+    raw_queue.sqs_client.send_message_batch.side_effect = send_message_batch
+    producer = BufferedProducer(raw_queue, linger_seconds=60)
+
+    producer.add_message("Message Body", {"Attr1": {"DataType": "String", "StringValue": "Attr1"}})
+    producer.flush()
+
+    raw_queue.sqs_client.send_message_batch.assert_called_once_with(
+        QueueUrl=raw_queue.url,
+        Entries=[
+            {
+                "Id": "0",
+                "MessageAttributes": {"Attr1": {"DataType": "String", "StringValue": "Attr1"}},
+                "MessageBody": "Message Body",
+            }
+        ],
+    )
+    producer.close()
+
+
+def test_buffered_producer_flush_on_linger(queue):
+    queue.sqs_client = mock.MagicMock()
+    queue.sqs_client.send_message_batch.side_effect = send_message_batch
+    producer = BufferedProducer(queue, linger_seconds=0.05)
+
+    producer.add_task("my_task", a=1, b=2, c=3)
+    time.sleep(0.3)
+
+    queue.sqs_client.send_message_batch.assert_called_once()
+    producer.close()
+
+
+def test_buffered_producer_raise_when_full(queue):
+    release_send = threading.Event()
+
+    def blocking_send_message_batch(QueueUrl, Entries):
+        release_send.wait(timeout=5)
+        return send_message_batch(QueueUrl, Entries)
+
+    queue.sqs_client = mock.MagicMock()
+    queue.sqs_client.send_message_batch.side_effect = blocking_send_message_batch
+    producer = BufferedProducer(queue, max_buffer_size=2, linger_seconds=0, block_when_full=False)
+
+    producer.add_task("my_task", a=1, b=2, c=3)
+    time.sleep(0.1)
+    producer.add_task("my_task", a=1, b=2, c=3)
+    producer.add_task("my_task", a=1, b=2, c=3)
+    with pytest.raises(BufferFullError):
+        producer.add_task("my_task", a=1, b=2, c=3)
+
+    release_send.set()
+    producer.close()
+    assert queue.sqs_client.send_message_batch.call_count == 2
+
+
+def blocked_producer(queue, release_send):
+    def blocking_send_message_batch(QueueUrl, Entries):
+        release_send.wait(timeout=5)
+        return send_message_batch(QueueUrl, Entries)
+
+    queue.sqs_client = mock.MagicMock()
+    queue.sqs_client.send_message_batch.side_effect = blocking_send_message_batch
+    producer = BufferedProducer(queue, max_buffer_size=2, linger_seconds=0)
+    producer.add_task("my_task", a=1, b=2, c=3)
+    time.sleep(0.1)
+    producer.add_task("my_task", a=1, b=2, c=3)
+    producer.add_task("my_task", a=1, b=2, c=3)
+    return producer
+
+
+def test_buffered_producer_block_when_full(queue):
+    release_send = threading.Event()
+    producer = blocked_producer(queue, release_send)
+    add_thread = threading.Thread(
+        target=producer.add_task, args=("my_task",), kwargs={"a": 1, "b": 2, "c": 3}
+    )
+
+    add_thread.start()
+    add_thread.join(0.1)
+    assert add_thread.is_alive()
+
+    release_send.set()
+    add_thread.join(1)
+    assert not add_thread.is_alive()
+    producer.close()
+    sent_entries = sum(
+        len(call.kwargs["Entries"]) for call in queue.sqs_client.send_message_batch.call_args_list
+    )
+    assert sent_entries == 4
+
+
+def test_buffered_producer_close_while_blocked(queue):
+    release_send = threading.Event()
+    producer = blocked_producer(queue, release_send)
+    errors = []
+
+    def add_task():
+        try:
+            producer.add_task("my_task", a=1, b=2, c=3)
+        except RuntimeError as exc:
+            errors.append(str(exc))
+
+    add_thread = threading.Thread(target=add_task)
+    add_thread.start()
+    add_thread.join(0.1)
+    close_thread = threading.Thread(target=producer.close)
+    close_thread.start()
+    add_thread.join(1)
+
+    assert errors == ["BufferedProducer is closed"]
+    release_send.set()
+    close_thread.join(1)
+    sent_entries = sum(
+        len(call.kwargs["Entries"]) for call in queue.sqs_client.send_message_batch.call_args_list
+    )
+    assert sent_entries == 3
+
+
+def test_buffered_producer_log_failed_messages(queue, caplog):
+    queue.sqs_client = mock.MagicMock()
+    queue.sqs_client.send_message_batch.return_value = {
+        "Successful": [],
+        "Failed": [{"Id": "0", "SenderFault": True, "Code": "InvalidParameterValue", "Message": "Invalid"}],
+    }
+    producer = BufferedProducer(queue, linger_seconds=60)
+
+    producer.add_task("my_task", a=1, b=2, c=3)
+    producer.close()
+
+    assert caplog.record_tuples == [
+        (
+            "sqsx.producer",
+            40,
+            f"Error while sending buffered message, queue_url={queue.url}, "
+            "error_code=InvalidParameterValue, error_message=Invalid",
+        )
+    ]
+
+
+def test_buffered_producer_with_wrong_queue_type(queue, raw_queue):
+    with BufferedProducer(queue) as producer, pytest.raises(TypeError):
+        producer.add_message("Message Body")
+
+    with BufferedProducer(raw_queue) as producer, pytest.raises(TypeError):
+        producer.add_task("my_task", a=1, b=2, c=3)
@@ -7,8 +7,16 @@ from unittest import mock
 
 import pytest
 
+from sqsx.blob import LocalBlobStore
+from sqsx.codec import TaskCodec
 from sqsx.exceptions import NoRetry, Retry
-from sqsx.queue import queue_url_regex
+from sqsx.helper import dict_to_base64
+from sqsx.idempotency import MemoryIdempotencyStore
+from sqsx.idle import ExponentialIdleStrategy
+from sqsx.message import Message, TaskContext
+from sqsx.metrics import InMemoryMetrics
+from sqsx.queue import Queue, queue_url_regex, RawQueue
+from sqsx.ratelimit import AdaptiveConcurrencyLimiter
 
 
 def task_handler(context, a, b, c):
@@ -27,6 +35,10 @@ def no_retry_exception_handler(context, a, b, c):
     raise NoRetry()
 
 
+def batch_exception_handler(context, tasks):
+    raise Exception("BOOM!")
+
+
 def raw_exception_handler(queue_url, sqs_message):
     raise Exception("BOOM!")
 
@@ -98,6 +110,190 @@ def test_queue_add_task(queue):
     assert response["MD5OfMessageAttributes"] == expected_md5_message_attribute
 
 
+def test_queue_add_tasks(queue, sqs_client):
+    tasks = (("my_task", {"a": index, "b": 0, "c": 0}) for index in range(25))
+
+    results = queue.add_tasks(tasks, max_threads=2)
+
+    assert [result.index for result in results] == list(range(25))
+    assert all(result.success and result.message_id for result in results)
+    attributes = sqs_client.get_queue_attributes(
+        QueueUrl=queue.url, AttributeNames=["ApproximateNumberOfMessages"]
+    )["Attributes"]
+    assert attributes["ApproximateNumberOfMessages"] == "25"
+
+
+def test_queue_add_tasks_retry_failed_entries(queue):
+    queue.sqs_client = mock.MagicMock()
+    queue.sqs_client.send_message_batch.side_effect = [
+        {
+            "Successful": [{"Id": "0", "MessageId": "message-id-0"}],
+            "Failed": [
+                {"Id": "1", "SenderFault": False, "Code": "InternalError"},
+                {"Id": "2", "SenderFault": True, "Code": "InvalidParameterValue", "Message": "Invalid"},
+            ],
+        },
+        {"Successful": [{"Id": "1", "MessageId": "message-id-1"}], "Failed": []},
+    ]
+
+    with mock.patch("sqsx.queue.time.sleep") as sleep:
+        results = queue.add_tasks([("my_task", {"a": 1}), ("my_task", {"a": 2}), ("my_task", {"a": 3})])
+
+    sleep.assert_called_once()
+    assert 0.05 <= sleep.call_args.args[0] <= 0.1
+    assert queue.sqs_client.send_message_batch.call_count == 2
+    assert [entry["Id"] for entry in queue.sqs_client.send_message_batch.call_args.kwargs["Entries"]] == ["1"]
+    assert [(result.index, result.success, result.message_id, result.error_code) for result in results] == [
+        (0, True, "message-id-0", None),
+        (1, True, "message-id-1", None),
+        (2, False, None, "InvalidParameterValue"),
+    ]
+
+
+def test_queue_add_tasks_with_message_too_long(queue):
+    queue.sqs_client = mock.MagicMock()
+
+    results = queue.add_tasks([("my_task", {"a": "x" * 262144})])
+
+    queue.sqs_client.send_message_batch.assert_not_called()
+    assert results[0].success is False
+    assert results[0].error_code == "MessageTooLong"
+
+
+def test_queue_add_task_with_codec(queue, sqs_client):
+    handler = SumHandler()
+    producer_queue = queue.model_copy(
+        update={"codec": TaskCodec(compression="zlib", compression_threshold_bytes=0)}
+    )
+
+    producer_queue.add_task("my_task", a=1, b=2, c=3)
+    queue.add_task("my_task", a=1, b=2, c=3)
+
+    queue.add_task_handler("my_task", handler)
+    queue.consume_messages(max_messages=2, max_threads=2, run_forever=False)
+
+    assert handler.result_sum == 12
+
+
+def test_queue_add_task_with_blob_store(queue, tmp_path):
+    handler = SumHandler()
+    queue.blob_store = LocalBlobStore(directory=str(tmp_path))
+    queue.blob_threshold_bytes = 100
+
+    queue.add_task("my_task", a=1, b=2, c=3, padding="x" * 200)
+    queue.add_task("my_task", a=1, b=2, c=3)
+    assert len(os.listdir(tmp_path)) == 1
+
+    queue.add_task_handler("my_task", lambda context, a, b, c, **kwargs: handler(context, a, b, c))
+    queue.consume_messages(max_messages=2, max_threads=2, run_forever=False)
+
+    assert handler.result_sum == 12
+    assert os.listdir(tmp_path) == []
+
+
+def test_queue_ack_deletes_blob_after_the_message(queue, sqs_message, tmp_path):
+    queue.blob_store = LocalBlobStore(directory=str(tmp_path))
+    queue.blob_store.put("blob-key", b"body")
+    queue.sqs_client = mock.MagicMock()
+    queue.sqs_client.delete_message.side_effect = Exception("Connection reset")
+    sqs_message["MessageAttributes"]["BlobKey"] = {"DataType": "String", "StringValue": "blob-key"}
+
+    with pytest.raises(Exception, match="Connection reset"):
+        queue._message_ack(sqs_message)
+    assert os.listdir(tmp_path) == ["blob-key"]
+
+    queue.sqs_client.delete_message.side_effect = None
+    queue._message_ack(sqs_message)
+    assert os.listdir(tmp_path) == []
+
+
+def test_queue_ack_with_batcher_deletes_blob_after_the_batch(queue, sqs_message, tmp_path):
+    queue.blob_store = LocalBlobStore(directory=str(tmp_path))
+    queue.blob_store.put("blob-key", b"body")
+    queue.sqs_client = mock.MagicMock()
+    queue.sqs_client.delete_message_batch.return_value = {
+        "Successful": [],
+        "Failed": [{"Id": "0", "SenderFault": False, "Code": "InternalError"}],
+    }
+    queue.sqs_client.delete_message.side_effect = Exception("Connection reset")
+    sqs_message["MessageAttributes"]["BlobKey"] = {"DataType": "String", "StringValue": "blob-key"}
+    queue._start_background_threads(3600, None, 0)
+
+    queue._message_ack(sqs_message)
+    queue._ack_batcher.flush()
+    assert os.listdir(tmp_path) == ["blob-key"]
+
+    queue.sqs_client.delete_message_batch.return_value = {"Successful": [{"Id": "0"}], "Failed": []}
+    queue._message_ack(sqs_message)
+    queue._stop_background_threads()
+    assert os.listdir(tmp_path) == []
+
+
+def test_queue_consume_blob_message_without_blob_store(queue, sqs_message, caplog):
+    queue.add_task_handler("my_task", SumHandler())
+    queue._message_nack = mock.MagicMock()
+    sqs_message["MessageAttributes"]["BlobKey"] = {"DataType": "String", "StringValue": "blob-key"}
+
+    queue._consume_message(sqs_message)
+
+    queue._message_nack.assert_called_once_with(sqs_message)
+    assert any(message.startswith("Invalid message body") for _, _, message in caplog.record_tuples)
+
+
+def test_queue_consume_message_with_idempotency_store(queue, sqs_message, caplog):
+    handler = SumHandler()
+    queue._message_ack = mock.MagicMock()
+    queue.idempotency_store = MemoryIdempotencyStore()
+    queue.add_task_handler("my_task", handler)
+
+    queue._consume_message(sqs_message)
+    queue._consume_message(sqs_message)
+
+    assert handler.result_sum == 6
+    assert queue._message_ack.call_count == 2
+    assert caplog.record_tuples[-1] == (
+        "sqsx.queue",
+        20,
+        f"Task already completed, removing the duplicated task, message_id={sqs_message['MessageId']}, "
+        f"task_name=my_task, idempotency_key={sqs_message['MessageId']}",
+    )
+
+
+def test_queue_consume_duplicated_blob_message_with_idempotency_store(queue, sqs_message, tmp_path):
+    handler = SumHandler()
+    queue.sqs_client = mock.MagicMock()
+    queue.blob_store = LocalBlobStore(directory=str(tmp_path))
+    queue.blob_store.put("blob-key", dict_to_base64({"kwargs": {"a": 1, "b": 2, "c": 3}}).encode())
+    queue.idempotency_store = MemoryIdempotencyStore()
+    queue.add_task_handler("my_task", handler)
+    sqs_message["MessageAttributes"]["BlobKey"] = {"DataType": "String", "StringValue": "blob-key"}
+
+    queue._consume_message(sqs_message)
+    assert os.listdir(tmp_path) == []
+    queue._consume_message(sqs_message)
+
+    assert handler.result_sum == 6
+    assert queue.sqs_client.delete_message.call_count == 2
+    queue.sqs_client.change_message_visibility.assert_not_called()
+
+
+def test_queue_consume_messages_with_idempotency_key_function(queue):
+    handler = SumHandler()
+    queue.idempotency_store = MemoryIdempotencyStore()
+    queue.idempotency_key_function = lambda task_name, task_kwargs: f"{task_name}:{task_kwargs['a']}"
+    queue.add_task_handler("my_task", handler)
+    queue.add_task("my_task", a=1, b=2, c=3)
+    queue.add_task("my_task", a=1, b=2, c=3)
+
+    queue.consume_messages(max_messages=2, max_threads=1, run_forever=False)
+
+    assert handler.result_sum == 6
+    assert queue.sqs_client.get_queue_attributes(
+        QueueUrl=queue.url,
+        AttributeNames=["ApproximateNumberOfMessages", "ApproximateNumberOfMessagesNotVisible"],
+    )["Attributes"] == {"ApproximateNumberOfMessages": "0", "ApproximateNumberOfMessagesNotVisible": "0"}
+
+
 def test_queue_consume_message_without_task_name_attribute(queue, sqs_message, caplog):
     queue._message_nack = mock.MagicMock()
     sqs_message["MessageAttributes"].pop("TaskName")
@@ -207,6 +403,610 @@ def test_queue_consume_messages_with_task_handler_no_retry_exception(queue, capl
     assert "Received an sqsx.NoRetry, removing the task" in caplog.record_tuples[1][2]
 
 
+def test_queue_consume_messages_with_batch_task_handler(queue):
+    handler = SumHandler()
+    batches = []
+
+    def batch_task_handler(context, tasks):
+        assert all(set(task) == {"sqs_message", "kwargs"} for task in tasks)
+        batches.append((context["task_name"], len(tasks)))
+
+    queue.add_batch_task_handler("my_batch_task", batch_task_handler)
+    queue.add_task_handler("my_task", handler)
+    queue.add_tasks(
+        [("my_batch_task", {"a": index}) for index in range(3)] + [("my_task", {"a": 1, "b": 2, "c": 3})]
+    )
+
+    queue.consume_messages(max_messages=10, max_threads=2, run_forever=False)
+
+    assert sum(tasks for _, tasks in batches) == 3
+    assert all(task_name == "my_batch_task" for task_name, _ in batches)
+    assert handler.result_sum == 6
+
+
+def test_queue_consume_message_batch_with_outcomes(queue, sqs_message):
+    queue._message_ack = mock.MagicMock()
+    queue._message_nack = mock.MagicMock()
+    sqs_messages = [{**sqs_message, "MessageId": str(index)} for index in range(4)]
+    retry = Retry(min_backoff_seconds=100, max_backoff_seconds=200)
+    queue.add_batch_task_handler(
+        "my_task", lambda context, tasks: [None, retry, NoRetry(), Exception("BOOM!")]
+    )
+
+    queue._consume_message_batch("my_task", sqs_messages)
+
+    assert queue._message_ack.call_args_list == [mock.call(sqs_messages[0]), mock.call(sqs_messages[2])]
+    assert queue._message_nack.call_args_list == [
+        mock.call(sqs_messages[1], min_backoff_seconds=100, max_backoff_seconds=200),
+        mock.call(sqs_messages[3]),
+    ]
+
+
+@pytest.mark.parametrize("outcomes", [True, [None, None], "x"])
+def test_queue_consume_message_batch_with_invalid_outcomes(queue, sqs_message, outcomes, caplog):
+    queue._message_ack = mock.MagicMock()
+    queue._message_nack = mock.MagicMock()
+    queue.add_batch_task_handler("my_task", lambda context, tasks: outcomes)
+
+    queue._consume_message_batch("my_task", [sqs_message])
+
+    queue._message_ack.assert_not_called()
+    queue._message_nack.assert_called_once_with(sqs_message)
+    assert "Batch task handler returned" in caplog.text
+
+
+def test_queue_consume_message_batch_with_task_handler_exception(queue, sqs_message, caplog):
+    queue._message_nack = mock.MagicMock()
+    queue.add_batch_task_handler("my_task", batch_exception_handler)
+
+    queue._consume_message_batch("my_task", [sqs_message])
+
+    queue._message_nack.assert_called_once_with(sqs_message)
+    assert caplog.record_tuples[0] == (
+        "sqsx.queue",
+        40,
+        "Error while processing batch, task_name=my_task, tasks=1",
+    )
+
+
+class ConcurrencyHandler:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.call_count = 0
+        self.thread_names = set()
+
+    def __call__(self, context, a, b, c):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            self.thread_names.add(threading.current_thread().name)
+        time.sleep(0.1)
+        with self.lock:
+            self.running -= 1
+            self.call_count += 1
+
+
+def test_queue_consume_messages_with_task_max_concurrency(queue):
+    handler = ConcurrencyHandler()
+    queue.add_task_handler("my_task", handler, max_concurrency=1)
+    queue.add_tasks([("my_task", {"a": 1, "b": 2, "c": 3})] * 4)
+
+    queue.consume_messages(max_messages=4, max_threads=4, run_forever=False)
+
+    assert handler.call_count == 4
+    assert handler.max_running == 1
+
+
+def test_queue_consume_messages_with_task_max_concurrency_doesnt_starve_other_tasks(queue, sqs_message):
+    other_task_done = threading.Event()
+    queue.sqs_client = mock.MagicMock()
+    queue.add_task_handler("my_task", lambda context, a, b, c: other_task_done.wait(2), max_concurrency=1)
+    queue.add_task_handler("my_other_task", lambda context, a, b, c: other_task_done.set())
+    sqs_messages = [
+        {**sqs_message, "MessageId": str(index), "ReceiptHandle": f"receipt-handle-{index}"}
+        for index in range(4)
+    ]
+    other_sqs_message = {
+        **sqs_message,
+        "MessageId": "other",
+        "MessageAttributes": {"TaskName": {"DataType": "String", "StringValue": "my_other_task"}},
+    }
+
+    def receive_message(MaxNumberOfMessages, **kwargs):
+        if sqs_messages:
+            received_sqs_messages = sqs_messages[:MaxNumberOfMessages]
+            del sqs_messages[:MaxNumberOfMessages]
+            return {"Messages": received_sqs_messages}
+        queue.exit_gracefully()
+        return {"Messages": [other_sqs_message]}
+
+    queue.sqs_client.receive_message.side_effect = receive_message
+
+    started_at = time.monotonic()
+    queue.consume_messages(
+        max_messages=2, max_threads=2, wait_seconds=0, enable_signal_to_exit_gracefully=False
+    )
+
+    # the waiting my_task messages gave their in-flight slots back, so my_other_task was received right away
+    assert other_task_done.is_set()
+    assert time.monotonic() - started_at < 2
+    assert queue.sqs_client.delete_message.call_count == 5
+
+
+def test_queue_consume_messages_with_task_max_waiting(queue, sqs_message):
+    handler = ConcurrencyHandler()
+    queue.sqs_client = mock.MagicMock()
+    sqs_messages = [{**sqs_message, "ReceiptHandle": f"receipt-handle-{index}"} for index in range(3)]
+    queue.sqs_client.receive_message.return_value = {"Messages": sqs_messages}
+    queue.add_task_handler("my_task", handler, max_concurrency=1, max_waiting=1)
+
+    queue.consume_messages(max_messages=3, max_threads=3, run_forever=False)
+
+    assert handler.call_count == 2
+    queue.sqs_client.change_message_visibility.assert_called_once_with(
+        QueueUrl=queue.url, ReceiptHandle="receipt-handle-2", VisibilityTimeout=5
+    )
+
+
+def test_queue_consume_messages_with_task_dedicated_pool(queue):
+    handler = ConcurrencyHandler()
+    queue.add_task_handler("my_task", handler, max_concurrency=2, dedicated_pool=True)
+    queue.add_tasks([("my_task", {"a": 1, "b": 2, "c": 3})] * 4)
+
+    queue.consume_messages(max_messages=4, max_threads=4, run_forever=False)
+
+    assert handler.call_count == 4
+    assert handler.max_running <= 2
+    assert all(thread_name.startswith("my_task") for thread_name in handler.thread_names)
+
+
+def test_queue_consume_messages_with_task_saturated_visibility_timeout(queue, sqs_message):
+    handler = ConcurrencyHandler()
+    queue.sqs_client = mock.MagicMock()
+    sqs_messages = [{**sqs_message, "ReceiptHandle": f"receipt-handle-{index}"} for index in range(2)]
+    queue.sqs_client.receive_message.return_value = {"Messages": sqs_messages}
+    queue.add_task_handler("my_task", handler, max_concurrency=1, saturated_visibility_timeout_seconds=5)
+
+    queue.consume_messages(max_messages=2, max_threads=2, run_forever=False)
+
+    assert handler.call_count == 1
+    queue.sqs_client.change_message_visibility.assert_called_once_with(
+        QueueUrl=queue.url, ReceiptHandle="receipt-handle-1", VisibilityTimeout=5
+    )
+
+
+def test_queue_consume_messages_with_task_saturated_release_error(queue, sqs_message, caplog):
+    handler = ConcurrencyHandler()
+    queue.sqs_client = mock.MagicMock()
+    sqs_messages = [{**sqs_message, "ReceiptHandle": f"receipt-handle-{index}"} for index in range(2)]
+    queue.sqs_client.receive_message.return_value = {"Messages": sqs_messages}
+    queue.sqs_client.change_message_visibility.side_effect = Exception("Connection reset")
+    queue.add_task_handler("my_task", handler, max_concurrency=1, saturated_visibility_timeout_seconds=5)
+
+    queue.consume_messages(max_messages=2, max_threads=2, run_forever=False)
+
+    assert handler.call_count == 1
+    assert (
+        f"Error while releasing message, message_id={sqs_message['MessageId']}, task_name=my_task"
+        in caplog.text
+    )
+
+
+def test_queue_consume_messages_with_task_rate_limit(queue):
+    handler = ConcurrencyHandler()
+    queue.add_task_handler("my_task", handler, rate_limit_per_second=2)
+    queue.add_task_handler("my_other_task", task_handler)
+    queue.add_tasks(
+        [("my_task", {"a": 1, "b": 2, "c": 3})] * 3 + [("my_other_task", {"a": 1, "b": 2, "c": 3})]
+    )
+
+    started_at = time.monotonic()
+    queue.consume_messages(max_messages=4, max_threads=4, run_forever=False)
+
+    assert handler.call_count == 3
+    assert time.monotonic() - started_at >= 0.4
+
+
+def test_queue_consume_messages_with_rate_limit(raw_queue, sqs_message):
+    raw_queue.sqs_client = mock.MagicMock()
+    raw_queue.sqs_client.receive_message.return_value = {"Messages": [sqs_message] * 3}
+
+    started_at = time.monotonic()
+    raw_queue.consume_messages(max_messages=3, max_threads=3, run_forever=False, rate_limit_per_second=2)
+
+    assert raw_queue.sqs_client.delete_message.call_count == 3
+    assert time.monotonic() - started_at >= 0.4
+    assert raw_queue._rate_limiter is None
+
+
+def test_queue_consume_messages_with_concurrency_limiter(queue):
+    handler = ConcurrencyHandler()
+    metrics = InMemoryMetrics()
+    queue.metrics = metrics
+    queue.add_task_handler("my_task", handler)
+    queue.add_tasks([("my_task", {"a": 1, "b": 2, "c": 3})] * 4)
+    concurrency_limiter = AdaptiveConcurrencyLimiter(max_limit=4, initial_limit=2, window_size=4)
+
+    queue.consume_messages(
+        max_messages=4, max_threads=4, run_forever=False, concurrency_limiter=concurrency_limiter
+    )
+
+    assert handler.call_count == 4
+    assert handler.max_running == 2
+    assert concurrency_limiter.limit == 3
+    assert concurrency_limiter.running == 0
+    assert metrics.gauge("sqsx_concurrency_limit", {"queue_url": queue.url}) == 2
+
+
+def test_queue_consume_messages_with_concurrency_limiter_and_errors(queue):
+    queue.add_task_handler("my_task", exception_handler)
+    queue.add_task_handler("my_other_task", no_retry_exception_handler)
+    queue.add_tasks(
+        [("my_task", {"a": 1, "b": 2, "c": 3})] * 2 + [("my_other_task", {"a": 1, "b": 2, "c": 3})] * 2
+    )
+    concurrency_limiter = AdaptiveConcurrencyLimiter(max_limit=4, max_error_rate=0.4, window_size=4)
+
+    queue.consume_messages(
+        max_messages=4, max_threads=4, run_forever=False, concurrency_limiter=concurrency_limiter
+    )
+
+    assert concurrency_limiter.limit == 2
+
+
+def test_queue_add_task_handler_with_invalid_options(queue):
+    with pytest.raises(ValueError):
+        queue.add_task_handler("my_task", task_handler, dedicated_pool=True)
+
+
+@pytest.fixture
+def fifo_queue(sqs_client, caplog):
+    caplog.set_level("INFO")
+    queue_url = sqs_client.create_queue(QueueName="tests.fifo", Attributes={"FifoQueue": "true"})["QueueUrl"]
+    yield Queue(url=queue_url, sqs_client=sqs_client)
+    sqs_client.delete_queue(QueueUrl=queue_url)
+
+
+def test_queue_add_task_to_fifo_queue(fifo_queue):
+    fifo_queue.sqs_client = mock.MagicMock()
+
+    fifo_queue.add_task("my_task", a=1, b=2, c=3)
+    fifo_queue.message_group_id_function = lambda task_name, task_kwargs: f"group-{task_kwargs['a']}"
+    fifo_queue.message_deduplication_id_function = lambda task_name, task_kwargs: "deduplication-id"
+    fifo_queue.add_task("my_task", a=1, b=2, c=3)
+
+    first_call, second_call = fifo_queue.sqs_client.send_message.call_args_list
+    assert first_call.kwargs["MessageGroupId"] == "my_task"
+    assert len(first_call.kwargs["MessageDeduplicationId"]) == 64
+    assert second_call.kwargs["MessageGroupId"] == "group-1"
+    assert second_call.kwargs["MessageDeduplicationId"] == "deduplication-id"
+
+
+def test_queue_consume_messages_from_fifo_queue(fifo_queue):
+    processed = []
+
+    def ordered_handler(context, group, index):
+        time.sleep(0.05)
+        processed.append((group, index))
+
+    fifo_queue.message_group_id_function = lambda task_name, task_kwargs: task_kwargs["group"]
+    fifo_queue.add_task_handler("my_task", ordered_handler)
+    fifo_queue.add_tasks(
+        [("my_task", {"group": group, "index": index}) for index in range(3) for group in "ab"]
+    )
+
+    fifo_queue.consume_messages(max_messages=6, max_threads=4, run_forever=False)
+
+    assert len(processed) == 6
+    for group in "ab":
+        assert [index for task_group, index in processed if task_group == group] == [0, 1, 2]
+
+
+def test_queue_consume_messages_from_fifo_queue_with_task_handler_exception(fifo_queue, sqs_message):
+    handler = CallCountHandler()
+    fifo_queue.sqs_client = mock.MagicMock()
+    sqs_messages = [
+        {
+            **sqs_message,
+            "ReceiptHandle": f"receipt-handle-{index}",
+            "Attributes": {**sqs_message["Attributes"], "MessageGroupId": "group"},
+        }
+        for index in range(3)
+    ]
+    fifo_queue.sqs_client.receive_message.return_value = {"Messages": sqs_messages}
+
+    def failing_handler(context, a, b, c):
+        handler(fifo_queue.url, context["sqs_message"])
+        raise Exception("BOOM!")
+
+    fifo_queue.add_task_handler("my_task", failing_handler)
+    fifo_queue.consume_messages(max_messages=3, max_threads=3, run_forever=False)
+
+    assert handler.call_count == 1
+    assert [
+        (call.kwargs["ReceiptHandle"], call.kwargs["VisibilityTimeout"])
+        for call in fifo_queue.sqs_client.change_message_visibility.call_args_list
+    ] == [("receipt-handle-0", 30), ("receipt-handle-1", 0), ("receipt-handle-2", 0)]
+
+
+def test_queue_consume_messages_from_fifo_queue_when_releasing_the_group_fails(
+    fifo_queue, sqs_message, caplog
+):
+    fifo_queue.sqs_client = mock.MagicMock()
+    fifo_queue.sqs_client.change_message_visibility.side_effect = Exception("Connection reset")
+    sqs_messages = [
+        {
+            **sqs_message,
+            "ReceiptHandle": f"receipt-handle-{index}",
+            "Attributes": {**sqs_message["Attributes"], "MessageGroupId": "group"},
+        }
+        for index in range(3)
+    ]
+    fifo_queue.sqs_client.receive_message.return_value = {"Messages": sqs_messages}
+    fifo_queue.add_task_handler("my_task", exception_handler)
+
+    fifo_queue.consume_messages(max_messages=3, max_threads=3, run_forever=False)
+
+    assert fifo_queue.sqs_client.change_message_visibility.call_count == 3
+    assert fifo_queue._message_group_limiter.running_groups == 0
+    assert caplog.text.count("Error while releasing message") == 2
+
+
+def test_raw_queue_add_message_to_fifo_queue(raw_queue):
+    raw_fifo_queue = RawQueue(
+        url=f"{raw_queue.url}.fifo", message_handler_function=task_handler, sqs_client=mock.MagicMock()
+    )
+
+    raw_fifo_queue.add_message(message_body="Message Body")
+    raw_fifo_queue.add_message(
+        message_body="Message Body", message_group_id="group", message_deduplication_id="deduplication-id"
+    )
+
+    first_call, second_call = raw_fifo_queue.sqs_client.send_message.call_args_list
+    assert first_call.kwargs["MessageGroupId"] == "default"
+    assert len(first_call.kwargs["MessageDeduplicationId"]) == 64
+    assert second_call.kwargs["MessageGroupId"] == "group"
+    assert second_call.kwargs["MessageDeduplicationId"] == "deduplication-id"
+
+
+def test_queue_consume_messages_with_metrics(queue):
+    metrics = InMemoryMetrics()
+    queue.metrics = metrics
+    queue.add_task_handler("my_task", task_handler)
+    queue.add_task_handler("my_other_task", retry_exception_handler)
+    queue.add_tasks(
+        [("my_task", {"a": 1, "b": 2, "c": 3})] * 2 + [("my_other_task", {"a": 1, "b": 2, "c": 3})]
+    )
+
+    queue.consume_messages(max_messages=3, max_threads=3, run_forever=False)
+
+    queue_labels = {"queue_url": queue.url}
+    task_labels = {"queue_url": queue.url, "task_name": "my_task"}
+    assert metrics.count("sqsx_receive_duration_seconds", queue_labels) == 1
+    assert metrics.percentile("sqsx_received_messages", 1, queue_labels) == 3
+    assert metrics.gauge("sqsx_in_flight_limit", queue_labels) == 6
+    assert metrics.count("sqsx_task_duration_seconds", task_labels) == 2
+    assert metrics.counter("sqsx_tasks_total", {**task_labels, "outcome": "success"}) == 2
+    assert (
+        metrics.counter(
+            "sqsx_tasks_total", {**queue_labels, "task_name": "my_other_task", "outcome": "retry"}
+        )
+        == 1
+    )
+    assert metrics.counter("sqsx_acks_total", queue_labels) == 2
+    assert metrics.counter("sqsx_nacks_total", queue_labels) == 1
+
+
+def test_queue_consume_messages_without_head_of_line_blocking(queue):
+    release_slow_task = threading.Event()
+    fast_task_calls = []
+
+    def slow_task_handler(context, a, b, c):
+        release_slow_task.wait(timeout=5)
+
+    def fast_task_handler(context, a, b, c):
+        fast_task_calls.append(a)
+
+    queue.add_task_handler("slow_task", slow_task_handler)
+    queue.add_task_handler("fast_task", fast_task_handler)
+    queue.add_task("slow_task", a=1, b=2, c=3)
+    for _ in range(3):
+        queue.add_task("fast_task", a=1, b=2, c=3)
+
+    thread = threading.Thread(
+        target=queue.consume_messages,
+        kwargs={
+            "max_messages": 1,
+            "max_threads": 2,
+            "wait_seconds": 0,
+            "polling_wait_seconds": 0,
+            "enable_signal_to_exit_gracefully": False,
+        },
+    )
+    thread.start()
+
+    deadline = time.monotonic() + 5
+    while len(fast_task_calls) < 3 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    slow_task_still_running = not release_slow_task.is_set()
+
+    release_slow_task.set()
+    queue.exit_gracefully()
+    thread.join(timeout=5)
+
+    assert len(fast_task_calls) == 3
+    assert slow_task_still_running
+
+
+def test_queue_consume_messages_with_batched_acks(queue, sqs_client):
+    handler = SumHandler()
+    queue.sqs_client = mock.MagicMock(wraps=sqs_client)
+
+    queue.add_task_handler("my_task", handler)
+    for _ in range(3):
+        queue.add_task("my_task", a=1, b=2, c=3)
+
+    queue.consume_messages(max_messages=3, max_threads=3, run_forever=False, batch_linger_seconds=60)
+
+    assert handler.result_sum == 18
+    queue.sqs_client.delete_message.assert_not_called()
+    queue.sqs_client.delete_message_batch.assert_called_once()
+    assert len(queue.sqs_client.delete_message_batch.call_args.kwargs["Entries"]) == 3
+    assert queue._ack_batcher is None
+
+
+def test_queue_consume_messages_with_batched_nacks(queue, sqs_client):
+    queue.sqs_client = mock.MagicMock(wraps=sqs_client)
+
+    queue.add_task_handler("my_task", exception_handler)
+    queue.add_task_handler("my_retry_task", retry_exception_handler)
+    queue.add_task("my_task", a=1, b=2, c=3)
+    queue.add_task("my_retry_task", a=1, b=2, c=3)
+
+    queue.consume_messages(max_messages=2, max_threads=2, run_forever=False, batch_linger_seconds=60)
+
+    queue.sqs_client.change_message_visibility.assert_not_called()
+    queue.sqs_client.change_message_visibility_batch.assert_called_once()
+    entries = queue.sqs_client.change_message_visibility_batch.call_args.kwargs["Entries"]
+    assert sorted(entry["VisibilityTimeout"] for entry in entries) == [30, 100]
+    assert queue._nack_batcher is None
+
+
+def test_queue_consume_messages_with_visibility_heartbeat(queue, sqs_client):
+    handler = SumHandler()
+
+    def slow_task_handler(context, a, b, c):
+        time.sleep(3)
+        handler(context, a, b, c)
+
+    queue.sqs_client = mock.MagicMock(wraps=sqs_client)
+    queue.add_task_handler("my_task", slow_task_handler)
+    queue.add_task("my_task", a=1, b=2, c=3)
+
+    queue.consume_messages(run_forever=False, heartbeat_visibility_timeout_seconds=2)
+
+    assert handler.result_sum == 6
+    assert queue.sqs_client.receive_message.call_args.kwargs["VisibilityTimeout"] == 2
+    assert queue.sqs_client.change_message_visibility_batch.call_count >= 1
+    queue.sqs_client.delete_message.assert_called_once()
+    assert queue._heartbeat is None
+
+
+def test_queue_consume_messages_with_lean_mode(queue):
+    contexts = []
+    queue.lean = True
+    queue.message_attribute_names = ["TraceId"]
+    queue.add_task_handler("my_task", lambda context, a, b, c: contexts.append(context))
+    queue.add_task("my_task", a=1, b=2, c=3)
+    receive_message = mock.Mock(wraps=queue.sqs_client.receive_message)
+
+    with mock.patch.object(queue.sqs_client, "receive_message", receive_message):
+        queue.consume_messages(run_forever=False)
+
+    (context,) = contexts
+    assert isinstance(context, TaskContext)
+    assert context["task_name"] == "my_task"
+    assert context["sqs_message"].message_attributes == {"TaskName": "my_task"}
+    assert context.sqs_message.receive_count == 1
+    assert receive_message.call_args.kwargs["AttributeNames"] == ["ApproximateReceiveCount"]
+    assert receive_message.call_args.kwargs["MessageAttributeNames"] == [
+        "TaskName",
+        "Codec",
+        "BlobKey",
+        "TraceId",
+    ]
+
+
+def test_raw_queue_consume_messages_with_drain(raw_queue, sqs_message, caplog):
+    handled_messages = []
+    release_slow_handler = threading.Event()
+    slow_handler_started = threading.Event()
+    sqs_messages = [{**sqs_message, "ReceiptHandle": f"receipt-handle-{index}"} for index in range(4)]
+    raw_queue.sqs_client = mock.MagicMock()
+    raw_queue.sqs_client.receive_message.side_effect = lambda **kwargs: (
+        {"Messages": sqs_messages} if raw_queue.sqs_client.receive_message.call_count == 1 else {}
+    )
+
+    def message_handler(queue_url, sqs_message):
+        handled_messages.append(sqs_message["ReceiptHandle"])
+        if sqs_message["ReceiptHandle"] == "receipt-handle-0":
+            slow_handler_started.wait(1)
+            raw_queue.exit_gracefully()
+        else:
+            slow_handler_started.set()
+            release_slow_handler.wait(5)
+
+    raw_queue.message_handler_function = message_handler
+    # the slow handler finishes after the drain released its message
+    threading.Timer(0.5, release_slow_handler.set).start()
+    raw_queue.consume_messages(
+        max_messages=4,
+        max_threads=2,
+        wait_seconds=0,
+        enable_signal_to_exit_gracefully=False,
+        drain_timeout_seconds=0.2,
+    )
+
+    assert release_slow_handler.is_set()
+    assert handled_messages == ["receipt-handle-0", "receipt-handle-1"]
+    assert "Message already released by the drain, skipping the ack" in caplog.text
+    raw_queue.sqs_client.delete_message.assert_called_once_with(
+        QueueUrl=raw_queue.url, ReceiptHandle="receipt-handle-0"
+    )
+    raw_queue.sqs_client.change_message_visibility_batch.assert_called_once_with(
+        QueueUrl=raw_queue.url,
+        Entries=[
+            {"Id": str(index), "ReceiptHandle": receipt_handle, "VisibilityTimeout": 0}
+            for index, receipt_handle in enumerate(
+                ["receipt-handle-2", "receipt-handle-3", "receipt-handle-1"]
+            )
+        ],
+    )
+    assert raw_queue._drain is None
+
+
+def test_queue_consume_messages_with_drain_skips_the_late_nack(queue, sqs_message, caplog):
+    queue.sqs_client = mock.MagicMock()
+    queue.sqs_client.receive_message.side_effect = lambda **kwargs: (
+        {"Messages": [sqs_message]} if queue.sqs_client.receive_message.call_count == 1 else {}
+    )
+
+    def task_handler(context, a, b, c):
+        queue.exit_gracefully()
+        time.sleep(0.3)
+        raise Exception("BOOM!")
+
+    queue.add_task_handler("my_task", task_handler)
+    queue.consume_messages(wait_seconds=0, enable_signal_to_exit_gracefully=False, drain_timeout_seconds=0.1)
+
+    queue.sqs_client.change_message_visibility.assert_not_called()
+    queue.sqs_client.change_message_visibility_batch.assert_called_once_with(
+        QueueUrl=queue.url,
+        Entries=[{"Id": "0", "ReceiptHandle": sqs_message["ReceiptHandle"], "VisibilityTimeout": 0}],
+    )
+    assert "Message already released by the drain, skipping the nack" in caplog.text
+
+
+def test_queue_consume_messages_with_drain_releases_received_messages(queue, sqs_message):
+    queue.sqs_client = mock.MagicMock()
+    queue.add_task_handler("my_task", task_handler)
+
+    def receive_message(**kwargs):
+        queue.exit_gracefully()
+        return {"Messages": [sqs_message]}
+
+    queue.sqs_client.receive_message.side_effect = receive_message
+
+    queue.consume_messages(enable_signal_to_exit_gracefully=False, drain_timeout_seconds=1)
+
+    queue.sqs_client.delete_message.assert_not_called()
+    queue.sqs_client.change_message_visibility_batch.assert_called_once_with(
+        QueueUrl=queue.url,
+        Entries=[{"Id": "0", "ReceiptHandle": sqs_message["ReceiptHandle"], "VisibilityTimeout": 0}],
+    )
+
+
 def test_queue_exit_gracefully(queue):
     thread = threading.Thread(target=trigger_signal)
     thread.daemon = True
@@ -236,6 +1036,23 @@ def test_raw_queue_add_message(raw_queue):
     assert response["MD5OfMessageAttributes"] == expected_md5_message_attribute
 
 
+def test_raw_queue_add_messages(raw_queue):
+    handler = CallCountHandler()
+    raw_queue.message_handler_function = handler
+    messages = [
+        ("Message Body", None),
+        ("Message Body", {"Attr1": {"DataType": "String", "StringValue": "Attr1"}}),
+    ]
+
+    results = raw_queue.add_messages(messages)
+
+    assert [result.success for result in results] == [True, True]
+
+    raw_queue.consume_messages(max_messages=2, max_threads=2, run_forever=False)
+
+    assert handler.call_count == 2
+
+
 def test_raw_queue_consume_messages(raw_queue):
     handler = CallCountHandler()
     raw_queue.message_handler_function = handler
@@ -282,6 +1099,89 @@ def test_raw_queue_consume_messages_with_message_handler_no_retry_exception(raw_
     assert "Received an sqsx.NoRetry, removing the message" in caplog.record_tuples[1][2]
 
 
+def test_raw_queue_consume_messages_with_parallel_receivers(raw_queue, sqs_message):
+    handler = CallCountHandler()
+    raw_queue.message_handler_function = handler
+    raw_queue.sqs_client = mock.MagicMock()
+    raw_queue.sqs_client.receive_message.return_value = {"Messages": [sqs_message] * 10}
+
+    raw_queue.consume_messages(max_messages=30, max_threads=5, run_forever=False, receivers=3)
+
+    assert raw_queue.sqs_client.receive_message.call_count == 3
+    for call in raw_queue.sqs_client.receive_message.call_args_list:
+        assert call.kwargs["MaxNumberOfMessages"] == 10
+    assert handler.call_count == 30
+
+
+def test_raw_queue_consume_messages_with_receive_errors(raw_queue, sqs_message, caplog):
+    handler = CallCountHandler()
+    raw_queue.message_handler_function = handler
+    raw_queue.sqs_client = mock.MagicMock()
+    lock = threading.Lock()
+    receive_calls = []
+
+    def receive_message(**kwargs):
+        with lock:
+            receive_calls.append(kwargs)
+            if len(receive_calls) <= 2:
+                raise Exception("Connection reset")
+        return {"Messages": [sqs_message]}
+
+    raw_queue.sqs_client.receive_message.side_effect = receive_message
+
+    with mock.patch("sqsx.queue.RECEIVE_ERROR_MIN_BACKOFF_SECONDS", 0):
+        raw_queue.consume_messages(max_messages=10, max_threads=2, run_forever=False, receivers=3)
+
+    assert len(receive_calls) == 5
+    assert handler.call_count == 3
+    assert caplog.text.count("Error while receiving messages") == 2
+
+
+def test_raw_queue_consume_messages_with_idle_strategy(raw_queue, sqs_message):
+    handler = CallCountHandler()
+    raw_queue.message_handler_function = handler
+    raw_queue.sqs_client = mock.MagicMock()
+    raw_queue.sqs_client.receive_message.side_effect = [{}, {}, {"Messages": [sqs_message]}, {}]
+    sleeps = []
+
+    def sleep_unless_stopped(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 3:
+            raw_queue.exit_gracefully()
+
+    raw_queue._sleep_unless_stopped = sleep_unless_stopped
+    raw_queue.consume_messages(
+        idle_strategy=ExponentialIdleStrategy(min_seconds=1, max_seconds=60, jitter=False),
+        enable_signal_to_exit_gracefully=False,
+    )
+
+    assert sleeps == [1, 2, 1]
+    assert handler.call_count == 1
+
+
+def test_raw_queue_consume_messages_with_lean_mode(raw_queue, sqs_message):
+    sqs_messages = []
+    raw_queue.lean = True
+    raw_queue.attribute_names = ["SentTimestamp"]
+    raw_queue.message_handler_function = lambda queue_url, sqs_message: sqs_messages.append(sqs_message)
+    raw_queue.sqs_client = mock.MagicMock()
+    raw_queue.sqs_client.receive_message.return_value = {"Messages": [sqs_message]}
+
+    raw_queue.consume_messages(run_forever=False)
+
+    (message,) = sqs_messages
+    assert isinstance(message, Message)
+    assert message["Body"] == sqs_message["Body"]
+    assert raw_queue.sqs_client.receive_message.call_args.kwargs["AttributeNames"] == [
+        "ApproximateReceiveCount",
+        "SentTimestamp",
+    ]
+    assert raw_queue.sqs_client.receive_message.call_args.kwargs["MessageAttributeNames"] == []
+    raw_queue.sqs_client.delete_message.assert_called_once_with(
+        QueueUrl=raw_queue.url, ReceiptHandle=sqs_message["ReceiptHandle"]
+    )
+
+
 def test_raw_queue_exit_gracefully(raw_queue):
     thread = threading.Thread(target=trigger_signal)
     thread.daemon = True
@@ -0,0 +1,104 @@
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from sqsx.ratelimit import AdaptiveConcurrencyLimiter, TokenBucket
+
+
+def test_token_bucket():
+    token_bucket = TokenBucket(rate_per_second=20, burst=2)
+
+    started_at = time.monotonic()
+    assert all(token_bucket.acquire() for _ in range(4))
+
+    assert 0.09 <= time.monotonic() - started_at < 0.5
+
+
+def test_token_bucket_with_timeout():
+    token_bucket = TokenBucket(rate_per_second=1)
+
+    assert token_bucket.acquire(timeout=0) is True
+    assert token_bucket.acquire(timeout=0.05) is False
+
+
+def test_token_bucket_with_tokens_above_the_burst():
+    token_bucket = TokenBucket(rate_per_second=10, burst=1)
+
+    assert token_bucket.acquire(5, timeout=0) is True
+    assert token_bucket.acquire(timeout=0.2) is False
+
+
+def test_token_bucket_with_invalid_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(rate_per_second=0)
+
+
+def test_adaptive_concurrency_limiter_additive_increase():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=3, initial_limit=1, window_size=2)
+
+    for _ in range(6):
+        limiter.record(0.1, failed=False)
+
+    assert limiter.limit == 3
+
+
+def test_adaptive_concurrency_limiter_multiplicative_decrease_on_errors(caplog):
+    caplog.set_level("INFO")
+    limiter = AdaptiveConcurrencyLimiter(max_limit=8, min_limit=2, max_error_rate=0.2, window_size=4)
+
+    limiter.record(0.1, failed=True)
+    for _ in range(3):
+        limiter.record(0.1, failed=False)
+    assert limiter.limit == 4
+
+    for _ in range(8):
+        limiter.record(0.1, failed=True)
+    assert limiter.limit == 2
+    assert "Concurrency limit changed, limit=4, previous_limit=8" in caplog.text
+
+
+def test_adaptive_concurrency_limiter_multiplicative_decrease_on_latency():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=10, target_latency_seconds=0.5, window_size=2)
+
+    limiter.record(0.1, failed=False)
+    limiter.record(1, failed=False)
+
+    assert limiter.limit == 5
+
+
+def test_adaptive_concurrency_limiter_acquire():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=2, initial_limit=1, window_size=1)
+
+    assert limiter.acquire(timeout=0) is True
+    assert limiter.acquire(timeout=0) is False
+
+    timer = threading.Timer(0.05, limiter.record, args=(0.1, False))
+    timer.start()
+    assert limiter.acquire(timeout=1) is True
+    assert limiter.running == 2
+
+    limiter.release()
+    assert limiter.running == 1
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{"max_limit": 1, "min_limit": 2}, {"max_limit": 0}, {"max_limit": 2, "decrease_ratio": 1}],
+)
+def test_adaptive_concurrency_limiter_with_invalid_arguments(kwargs):
+    with pytest.raises(ValueError):
+        AdaptiveConcurrencyLimiter(**kwargs)
+
+
+def test_token_bucket_sleeps_until_the_next_token():
+    token_bucket = TokenBucket(rate_per_second=4, burst=1)
+    token_bucket.acquire()
+
+    with mock.patch("sqsx.ratelimit.time.sleep", side_effect=lambda seconds: None) as sleep:
+        with mock.patch("sqsx.ratelimit.time.monotonic", side_effect=[10, 10.25]):
+            token_bucket._updated_at = 10
+            assert token_bucket.acquire() is True
+
+    sleep.assert_called_once_with(0.25)
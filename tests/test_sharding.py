@@ -0,0 +1,172 @@
+from unittest import mock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from sqsx.queue import Queue
+from sqsx.sharding import ShardedQueue
+
+
+def throttling_error(operation_name="SendMessage"):
+    return ClientError({"Error": {"Code": "RequestThrottled", "Message": "Throttled"}}, operation_name)
+
+
+@pytest.fixture
+def shard_queues(sqs_client, caplog):
+    caplog.set_level("INFO")
+    queue_urls = [sqs_client.create_queue(QueueName=f"shard_{index}")["QueueUrl"] for index in range(3)]
+    yield [Queue(url=queue_url, sqs_client=sqs_client) for queue_url in queue_urls]
+    for queue_url in queue_urls:
+        sqs_client.delete_queue(QueueUrl=queue_url)
+
+
+def approximate_number_of_messages(queue):
+    return int(
+        queue.sqs_client.get_queue_attributes(
+            QueueUrl=queue.url, AttributeNames=["ApproximateNumberOfMessages"]
+        )["Attributes"]["ApproximateNumberOfMessages"]
+    )
+
+
+def test_sharded_queue_add_task_with_round_robin(shard_queues):
+    sharded_queue = ShardedQueue(queues=shard_queues)
+
+    for index in range(6):
+        sharded_queue.add_task("my_task", a=index)
+
+    assert [approximate_number_of_messages(queue) for queue in shard_queues] == [2, 2, 2]
+
+
+def test_sharded_queue_add_tasks_with_hash(shard_queues):
+    sharded_queue = ShardedQueue(
+        queues=shard_queues,
+        strategy="hash",
+        routing_key_function=lambda task_name, task_kwargs: str(task_kwargs["customer_id"]),
+    )
+
+    results = sharded_queue.add_tasks([("my_task", {"customer_id": index % 2}) for index in range(10)])
+
+    assert [result.index for result in results] == list(range(10))
+    assert all(result.success for result in results)
+    assert sorted(approximate_number_of_messages(queue) for queue in shard_queues) in ([0, 0, 10], [0, 5, 5])
+
+    sharded_queues = [
+        ShardedQueue(queues=queues, strategy="hash")
+        for queues in (shard_queues, list(reversed(shard_queues)))
+    ]
+    assert len({queue.queues[queue._shard_indexes("my_task", {})[0]].url for queue in sharded_queues}) == 1
+
+
+def test_sharded_queue_add_task_with_failover(shard_queues):
+    sharded_queue = ShardedQueue(queues=shard_queues, strategy="least_throttled")
+    throttled_queue = shard_queues[0]
+    throttled_queue.sqs_client = mock.MagicMock()
+    throttled_queue.sqs_client.send_message.side_effect = throttling_error()
+
+    for index in range(4):
+        sharded_queue.add_task("my_task", a=index)
+
+    assert throttled_queue.sqs_client.send_message.call_count == 1
+    assert sum(approximate_number_of_messages(queue) for queue in shard_queues[1:]) == 4
+    assert sharded_queue._shard_indexes("my_task", {})[-1] == 0
+
+
+def test_sharded_queue_add_task_without_failover(shard_queues):
+    sharded_queue = ShardedQueue(queues=shard_queues, failover=False)
+    shard_queues[0].sqs_client = mock.MagicMock()
+    shard_queues[0].sqs_client.send_message.side_effect = throttling_error()
+
+    with pytest.raises(ClientError):
+        sharded_queue.add_task("my_task", a=1)
+
+
+def test_sharded_queue_add_task_with_hash_without_failover_by_default(shard_queues):
+    sharded_queue = ShardedQueue(queues=shard_queues, strategy="hash")
+    shard_index = sharded_queue._shard_indexes("my_task", {})[0]
+    throttled_url = shard_queues[shard_index].url
+    shard_queues[shard_index].sqs_client = mock.MagicMock()
+    shard_queues[shard_index].sqs_client.send_message.side_effect = throttling_error()
+
+    with pytest.raises(ClientError):
+        sharded_queue.add_task("my_task", a=1)
+
+    assert sharded_queue._shard_indexes("my_task", {}) == [shard_index]
+    assert (
+        sum(approximate_number_of_messages(queue) for queue in shard_queues if queue.url != throttled_url)
+        == 0
+    )
+
+
+def test_sharded_queue_add_task_with_hash_and_failover(shard_queues):
+    sharded_queue = ShardedQueue(queues=shard_queues, strategy="hash", failover=True)
+    shard_index = sharded_queue._shard_indexes("my_task", {})[0]
+    throttled_url = shard_queues[shard_index].url
+    shard_queues[shard_index].sqs_client = mock.MagicMock()
+    shard_queues[shard_index].sqs_client.send_message.side_effect = throttling_error()
+
+    sharded_queue.add_task("my_task", a=1)
+
+    assert (
+        sum(approximate_number_of_messages(queue) for queue in shard_queues if queue.url != throttled_url)
+        == 1
+    )
+
+
+def test_sharded_queue_hash_failover_with_fifo_shards():
+    queues = [
+        Queue(url=f"http://localhost:9324/000000000000/shard_{index}.fifo", sqs_client=mock.MagicMock())
+        for index in range(2)
+    ]
+
+    with pytest.raises(ValueError, match="failover can't be used with the hash strategy on FIFO shards"):
+        ShardedQueue(queues=queues, strategy="hash", failover=True)
+
+    assert ShardedQueue(queues=queues, strategy="hash")._shard_indexes("my_task", {})[1:] == []
+
+
+def test_sharded_queue_add_task_with_other_error(shard_queues):
+    sharded_queue = ShardedQueue(queues=shard_queues)
+    shard_queues[0].sqs_client = mock.MagicMock()
+    shard_queues[0].sqs_client.send_message.side_effect = ClientError(
+        {"Error": {"Code": "InvalidParameterValue", "Message": "Invalid"}}, "SendMessage"
+    )
+
+    with pytest.raises(ClientError):
+        sharded_queue.add_task("my_task", a=1)
+
+
+def test_sharded_queue_add_tasks_with_failover(shard_queues):
+    sharded_queue = ShardedQueue(queues=shard_queues[:2])
+    shard_queues[0].sqs_client = mock.MagicMock()
+    shard_queues[0].sqs_client.send_message_batch.side_effect = throttling_error("SendMessageBatch")
+
+    results = sharded_queue.add_tasks([("my_task", {"a": index}) for index in range(4)], max_retries=0)
+
+    assert [(result.index, result.success) for result in results] == [(index, True) for index in range(4)]
+    assert approximate_number_of_messages(shard_queues[1]) == 4
+
+
+def test_sharded_queue_consume_messages(shard_queues):
+    calls = []
+    sharded_queue = ShardedQueue(queues=shard_queues)
+    sharded_queue.add_task_handler("my_task", lambda context, a: calls.append(context["queue_url"]))
+    sharded_queue.add_tasks([("my_task", {"a": index}) for index in range(3)])
+
+    sharded_queue.consume_messages(max_threads=3, run_forever=False, enable_signal_to_exit_gracefully=False)
+
+    assert sorted(calls) == sorted(queue.url for queue in shard_queues)
+
+
+def test_sharded_queue_exit_gracefully(shard_queues):
+    sharded_queue = ShardedQueue(queues=shard_queues)
+
+    def task_handler(context, a):
+        sharded_queue.exit_gracefully()
+
+    sharded_queue.add_task_handler("my_task", task_handler)
+    sharded_queue.add_task("my_task", a=1)
+    sharded_queue.consume_messages(
+        polling_wait_seconds=0, wait_seconds=0, enable_signal_to_exit_gracefully=False
+    )
+
+    assert all(queue._should_consume_tasks_stop for queue in shard_queues)
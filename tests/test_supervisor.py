@@ -0,0 +1,109 @@
+import functools
+import os
+import signal
+import threading
+import time
+from unittest import mock
+
+import boto3
+import pytest
+
+from sqsx.queue import Queue
+from sqsx.supervisor import run_worker, Supervisor, TaskCounter
+
+pytestmark = pytest.mark.skipif(
+    bool(os.environ.get("SQSX_FAKE_SQS")), reason="the workers connect to elasticmq with their own clients"
+)
+
+
+def create_queue(queue_url, output_path):
+    def task_handler(context, a, b, c):
+        with open(output_path, "a") as output_file:
+            output_file.write(f"{a + b + c}\n")
+
+    sqs_client = boto3.client(
+        "sqs",
+        endpoint_url="http://localhost:9324",
+        region_name="elasticmq",
+        aws_secret_access_key="x",
+        aws_access_key_id="x",
+        use_ssl=False,
+    )
+    queue = Queue(url=queue_url, sqs_client=sqs_client)
+    queue.add_task_handler("my_task", task_handler)
+    return queue
+
+
+def test_run_worker_with_max_tasks(queue, tmp_path):
+    output_path = tmp_path / "output.txt"
+    for _ in range(5):
+        queue.add_task("my_task", a=1, b=2, c=3)
+
+    with mock.patch("signal.signal") as signal_mock:
+        run_worker(
+            functools.partial(create_queue, queue.url, output_path),
+            {"wait_seconds": 0, "polling_wait_seconds": 0, "enable_signal_to_exit_gracefully": False},
+            max_tasks=2,
+        )
+
+    assert signal_mock.call_args_list == [
+        mock.call(signal.SIGINT, signal.SIG_DFL),
+        mock.call(signal.SIGTERM, signal.SIG_DFL),
+    ]
+    # the messages already prefetched when the limit is reached are still processed
+    assert 2 <= len(output_path.read_text().splitlines()) < 5
+
+
+def test_task_counter_from_many_threads():
+    queue = mock.MagicMock()
+    task_counter = TaskCounter(queue, max_tasks=400)
+    threads = [threading.Thread(target=lambda: [task_counter(1) for _ in range(100)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert task_counter.consumed_tasks == 400
+    queue.exit_gracefully.assert_called_once()
+
+
+def test_task_counter_counts_batch_tasks_once(sqs_message):
+    queue = Queue(url="http://localhost:9324/000000000000/tests", sqs_client=mock.MagicMock())
+    queue.sqs_client.receive_message.return_value = {"Messages": [sqs_message, dict(sqs_message)]}
+    queue.add_batch_task_handler("my_task", lambda context, tasks: None)
+    task_counter = TaskCounter(queue, max_tasks=10)
+    queue._messages_done_callback = task_counter
+
+    queue.consume_messages(max_messages=2, run_forever=False, enable_signal_to_exit_gracefully=False)
+
+    assert task_counter.consumed_tasks == 2
+
+
+def test_supervisor(queue, tmp_path, caplog):
+    output_path = tmp_path / "output.txt"
+    for _ in range(8):
+        queue.add_task("my_task", a=1, b=2, c=3)
+
+    supervisor = Supervisor(
+        queue_factory=functools.partial(create_queue, queue.url, output_path),
+        workers=2,
+        max_tasks_per_worker=1,
+        consume_messages_kwargs={"wait_seconds": 0, "polling_wait_seconds": 0},
+        check_interval_seconds=0.05,
+    )
+    thread = threading.Thread(target=supervisor.run, kwargs={"enable_signal_to_exit_gracefully": False})
+    thread.start()
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        if output_path.exists() and len(output_path.read_text().splitlines()) == 8:
+            break
+        time.sleep(0.05)
+
+    supervisor.exit_gracefully()
+    thread.join(timeout=10)
+
+    assert not thread.is_alive()
+    assert output_path.read_text().splitlines() == ["6"] * 8
+    assert any("Worker finished, starting a new one" in message for _, _, message in caplog.record_tuples)
+    assert all(not process.is_alive() for process in supervisor._processes)
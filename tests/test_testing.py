@@ -0,0 +1,154 @@
+import threading
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+
+from sqsx.testing import FakeSQSClient
+
+
+@pytest.fixture
+def sqs_client():
+    return FakeSQSClient()
+
+
+@pytest.fixture
+def queue_url(sqs_client):
+    return sqs_client.create_queue(QueueName="tests")["QueueUrl"]
+
+
+def test_fake_sqs_client_send_and_receive_message(sqs_client, queue_url):
+    message_attributes = {"TaskName": {"DataType": "String", "StringValue": "my_task"}}
+    response = sqs_client.send_message(
+        QueueUrl=queue_url,
+        MessageBody="eyJrd2FyZ3MiOiB7ImEiOiAxLCAiYiI6IDIsICJjIjogM319",
+        MessageAttributes=message_attributes,
+    )
+
+    assert response["MD5OfMessageBody"] == "8087eb7436895841c5d646156a8a469f"
+    assert response["MD5OfMessageAttributes"] == "5346f2cd7c539a880febaf9112a86921"
+
+    (message,) = sqs_client.receive_message(
+        QueueUrl=queue_url, AttributeNames=["All"], MessageAttributeNames=["All"]
+    )["Messages"]
+    assert message["MessageId"] == response["MessageId"]
+    assert message["MessageAttributes"] == message_attributes
+    assert message["Attributes"]["ApproximateReceiveCount"] == "1"
+    assert sqs_client.receive_message(QueueUrl=queue_url) == {"ResponseMetadata": {"HTTPStatusCode": 200}}
+
+    sqs_client.delete_message(QueueUrl=queue_url, ReceiptHandle=message["ReceiptHandle"])
+    assert (
+        sqs_client.get_queue_attributes(QueueUrl=queue_url, AttributeNames=["All"])["Attributes"][
+            "ApproximateNumberOfMessagesNotVisible"
+        ]
+        == "0"
+    )
+
+
+def test_fake_sqs_client_visibility_timeout(sqs_client, queue_url):
+    sqs_client.send_message(QueueUrl=queue_url, MessageBody="body")
+
+    (message,) = sqs_client.receive_message(QueueUrl=queue_url, VisibilityTimeout=1)["Messages"]
+    sqs_client.change_message_visibility(
+        QueueUrl=queue_url, ReceiptHandle=message["ReceiptHandle"], VisibilityTimeout=0
+    )
+    (message,) = sqs_client.receive_message(QueueUrl=queue_url, VisibilityTimeout=0, AttributeNames=["All"])[
+        "Messages"
+    ]
+
+    assert message["Attributes"]["ApproximateReceiveCount"] == "2"
+    (message,) = sqs_client.receive_message(QueueUrl=queue_url, AttributeNames=["All"])["Messages"]
+    with pytest.raises(ClientError):
+        sqs_client.change_message_visibility(
+            QueueUrl=queue_url, ReceiptHandle="invalid#receipt-handle", VisibilityTimeout=0
+        )
+
+
+def test_fake_sqs_client_long_polling(sqs_client, queue_url):
+    timer = threading.Timer(0.1, lambda: sqs_client.send_message(QueueUrl=queue_url, MessageBody="body"))
+    timer.start()
+
+    started_at = time.monotonic()
+    response = sqs_client.receive_message(QueueUrl=queue_url, WaitTimeSeconds=5)
+
+    assert len(response["Messages"]) == 1
+    assert time.monotonic() - started_at < 1
+
+
+def test_fake_sqs_client_batch_operations(sqs_client, queue_url):
+    response = sqs_client.send_message_batch(
+        QueueUrl=queue_url,
+        Entries=[{"Id": str(index), "MessageBody": f"body-{index}"} for index in range(3)],
+    )
+    assert [entry["Id"] for entry in response["Successful"]] == ["0", "1", "2"]
+    assert response["Failed"] == []
+
+    messages = sqs_client.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=10)["Messages"]
+    response = sqs_client.change_message_visibility_batch(
+        QueueUrl=queue_url,
+        Entries=[
+            {"Id": "0", "ReceiptHandle": messages[0]["ReceiptHandle"], "VisibilityTimeout": 0},
+            {"Id": "1", "ReceiptHandle": "invalid#receipt-handle", "VisibilityTimeout": 0},
+        ],
+    )
+    assert response["Failed"][0]["Id"] == "1"
+
+    response = sqs_client.delete_message_batch(
+        QueueUrl=queue_url,
+        Entries=[
+            {"Id": str(index), "ReceiptHandle": message["ReceiptHandle"]}
+            for index, message in enumerate(messages)
+        ],
+    )
+    assert len(response["Successful"]) == 3
+
+    with pytest.raises(ClientError):
+        sqs_client.send_message_batch(QueueUrl=queue_url, Entries=[])
+    with pytest.raises(ClientError):
+        sqs_client.send_message_batch(QueueUrl=queue_url, Entries=[{"Id": "0", "MessageBody": "x" * 262145}])
+    with pytest.raises(ClientError):
+        sqs_client.delete_message_batch(
+            QueueUrl=queue_url, Entries=[{"Id": str(index), "ReceiptHandle": "x"} for index in range(11)]
+        )
+
+
+def test_fake_sqs_client_fifo_queue(sqs_client):
+    queue_url = sqs_client.create_queue(QueueName="tests.fifo")["QueueUrl"]
+    for index in range(3):
+        sqs_client.send_message(
+            QueueUrl=queue_url,
+            MessageBody=f"a-{index}",
+            MessageGroupId="a",
+            MessageDeduplicationId=f"a-{index}",
+        )
+    sqs_client.send_message(
+        QueueUrl=queue_url, MessageBody="a-0", MessageGroupId="a", MessageDeduplicationId="a-0"
+    )
+    sqs_client.send_message(
+        QueueUrl=queue_url, MessageBody="b-0", MessageGroupId="b", MessageDeduplicationId="b-0"
+    )
+
+    messages = sqs_client.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=2)["Messages"]
+    assert [message["Body"] for message in messages] == ["a-0", "a-1"]
+
+    messages = sqs_client.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=10)["Messages"]
+    assert [message["Body"] for message in messages] == ["b-0"]
+
+    with pytest.raises(ClientError):
+        sqs_client.send_message(QueueUrl=queue_url, MessageBody="body")
+
+
+def test_fake_sqs_client_nonexistent_queue(sqs_client, queue_url):
+    sqs_client.delete_queue(QueueUrl=queue_url)
+
+    with pytest.raises(ClientError):
+        sqs_client.receive_message(QueueUrl=queue_url)
+
+
+def test_fake_sqs_client_latency():
+    sqs_client = FakeSQSClient(latency_seconds=0.05)
+
+    started_at = time.monotonic()
+    sqs_client.create_queue(QueueName="tests")
+
+    assert time.monotonic() - started_at >= 0.05